@@ -10,13 +10,35 @@ CREATE TABLE IF NOT EXISTS chunk (
     id UUID,
     emb Array(Float32),
     text String,
-    paragraph_id UUID
-) ENGINE = MergeTree() ORDER BY id;
+    paragraph_id UUID,
+    duplicate_paragraph_ids Array(UUID) DEFAULT [],
+    collection String DEFAULT 'default',
+    emb_bits_0 UInt256 DEFAULT 0,
+    emb_bits_1 UInt256 DEFAULT 0,
+    emb_reduced Array(Float32) DEFAULT [],
+    pca_version UInt32 DEFAULT 0,
+    INDEX duplicate_paragraph_idx duplicate_paragraph_ids TYPE bloom_filter GRANULARITY 1
+) ENGINE = MergeTree() PARTITION BY collection ORDER BY (paragraph_id, id);
 
 CREATE TABLE IF NOT EXISTS paragraph (
     id UUID,
     name String,
     text String,
     num String,
-    images Map(String, String) -- the image path | image text
-)ENGINE = MergeTree() ORDER BY id;
\ No newline at end of file
+    images Map(String, String), -- the image path | image text
+    collection String DEFAULT 'default'
+)ENGINE = MergeTree() PARTITION BY collection ORDER BY id;
+
+CREATE TABLE IF NOT EXISTS paragraph_centroid (
+    paragraph_id UUID,
+    emb Array(Float32),
+    collection String DEFAULT 'default'
+) ENGINE = MergeTree() PARTITION BY collection ORDER BY paragraph_id;
+
+CREATE TABLE IF NOT EXISTS pca_projection (
+    version UInt32,
+    mean Array(Float32),
+    components Array(Array(Float32)),
+    explained_variance Float32,
+    created_at DateTime DEFAULT now()
+) ENGINE = MergeTree() ORDER BY version;
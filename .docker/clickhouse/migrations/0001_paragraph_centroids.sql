@@ -0,0 +1,34 @@
+-- Иерархический поиск: центроиды параграфов и таблица chunk, упорядоченная по paragraph_id.
+-- Для баз, созданных до появления paragraph_centroid; новые базы создаются init-clickhouse.sql.
+
+USE rag;
+
+CREATE TABLE IF NOT EXISTS paragraph_centroid (
+    paragraph_id UUID,
+    emb Array(Float32)
+) ENGINE = MergeTree() ORDER BY paragraph_id;
+
+-- Ключ сортировки MergeTree нельзя заменить на месте, поэтому таблица пересоздается.
+CREATE TABLE chunk_by_paragraph (
+    id UUID,
+    emb Array(Float32),
+    text String,
+    paragraph_id UUID
+) ENGINE = MergeTree() ORDER BY (paragraph_id, id);
+
+INSERT INTO chunk_by_paragraph SELECT id, emb, text, paragraph_id FROM chunk;
+
+EXCHANGE TABLES chunk AND chunk_by_paragraph;
+
+DROP TABLE chunk_by_paragraph;
+
+-- Центроиды уже проиндексированных параграфов: среднее нормированных эмбеддингов чанков.
+INSERT INTO paragraph_centroid
+SELECT paragraph_id, arrayMap(x -> x / sqrt(arraySum(y -> y * y, centroid)), centroid)
+FROM (
+    SELECT paragraph_id,
+        avgForEach(arrayMap(x -> x / sqrt(arraySum(y -> y * y, emb)), emb)) AS centroid
+    FROM chunk
+    WHERE arraySum(y -> y * y, emb) != 0
+    GROUP BY paragraph_id
+);
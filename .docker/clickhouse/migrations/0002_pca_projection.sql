@@ -0,0 +1,16 @@
+-- Поиск через проекцию PCA: компактный emb_reduced с версией проекции и таблица проекций.
+-- Сами значения emb_reduced заполняет python -m ml.pca fit.
+
+USE rag;
+
+ALTER TABLE chunk
+    ADD COLUMN IF NOT EXISTS emb_reduced Array(Float32) DEFAULT [],
+    ADD COLUMN IF NOT EXISTS pca_version UInt32 DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS pca_projection (
+    version UInt32,
+    mean Array(Float32),
+    components Array(Array(Float32)),
+    explained_variance Float32,
+    created_at DateTime DEFAULT now()
+) ENGINE = MergeTree() ORDER BY version;
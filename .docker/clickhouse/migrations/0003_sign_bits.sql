@@ -0,0 +1,8 @@
+-- Префильтр по знаковому хэшу эмбеддинга: 512 бит в двух колонках UInt256.
+-- Хэши уже проиндексированных чанков заполняет python -m ml.quantization backfill.
+
+USE rag;
+
+ALTER TABLE chunk
+    ADD COLUMN IF NOT EXISTS emb_bits_0 UInt256 DEFAULT 0 AFTER paragraph_id,
+    ADD COLUMN IF NOT EXISTS emb_bits_1 UInt256 DEFAULT 0 AFTER emb_bits_0;
@@ -0,0 +1,58 @@
+-- Коллекции документов: таблицы партиционируются по collection, чтобы поиск с фильтром
+-- читал только части нужной коллекции, а удаление коллекции было DROP PARTITION.
+-- Уже проиндексированные документы попадают в коллекцию 'default'.
+-- Их изображения остаются в MinIO по старым путям images/{paragraph_id}/...: пути
+-- хранятся в paragraph.images, и удаление коллекции 'default' удаляет их по этим путям.
+
+USE rag;
+
+-- Ключ партиционирования нельзя изменить на месте, поэтому таблицы пересоздаются.
+CREATE TABLE chunk_by_collection (
+    id UUID,
+    emb Array(Float32),
+    text String,
+    paragraph_id UUID,
+    collection String DEFAULT 'default',
+    emb_bits_0 UInt256 DEFAULT 0,
+    emb_bits_1 UInt256 DEFAULT 0,
+    emb_reduced Array(Float32) DEFAULT [],
+    pca_version UInt32 DEFAULT 0
+) ENGINE = MergeTree() PARTITION BY collection ORDER BY (paragraph_id, id);
+
+INSERT INTO chunk_by_collection
+    (id, emb, text, paragraph_id, emb_bits_0, emb_bits_1, emb_reduced, pca_version)
+SELECT id, emb, text, paragraph_id, emb_bits_0, emb_bits_1, emb_reduced, pca_version
+FROM chunk;
+
+EXCHANGE TABLES chunk AND chunk_by_collection;
+
+DROP TABLE chunk_by_collection;
+
+CREATE TABLE paragraph_by_collection (
+    id UUID,
+    name String,
+    text String,
+    num String,
+    images Map(String, String),
+    collection String DEFAULT 'default'
+) ENGINE = MergeTree() PARTITION BY collection ORDER BY id;
+
+INSERT INTO paragraph_by_collection (id, name, text, num, images)
+SELECT id, name, text, num, images FROM paragraph;
+
+EXCHANGE TABLES paragraph AND paragraph_by_collection;
+
+DROP TABLE paragraph_by_collection;
+
+CREATE TABLE paragraph_centroid_by_collection (
+    paragraph_id UUID,
+    emb Array(Float32),
+    collection String DEFAULT 'default'
+) ENGINE = MergeTree() PARTITION BY collection ORDER BY paragraph_id;
+
+INSERT INTO paragraph_centroid_by_collection (paragraph_id, emb)
+SELECT paragraph_id, emb FROM paragraph_centroid;
+
+EXCHANGE TABLES paragraph_centroid AND paragraph_centroid_by_collection;
+
+DROP TABLE paragraph_centroid_by_collection;
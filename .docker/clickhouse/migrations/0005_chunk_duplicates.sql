@@ -0,0 +1,12 @@
+-- Дедупликация чанков при индексации: чанк хранится один раз, а параграфы его
+-- дубликатов - в duplicate_paragraph_ids. Индекс bloom_filter позволяет находить чанки
+-- по параграфу дубликата (has/hasAny) без чтения всей таблицы.
+-- У уже проиндексированных чанков дубликатов нет, массив остается пустым.
+
+USE rag;
+
+ALTER TABLE chunk
+    ADD COLUMN IF NOT EXISTS duplicate_paragraph_ids Array(UUID) DEFAULT [] AFTER paragraph_id;
+
+ALTER TABLE chunk
+    ADD INDEX IF NOT EXISTS duplicate_paragraph_idx duplicate_paragraph_ids TYPE bloom_filter GRANULARITY 1;
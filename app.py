@@ -1,15 +1,60 @@
 import sys
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from configs.Environment import get_environment_variables
+from configs.Minio import minio_client, base_bucket
+from configs.Models import preload_models
+from configs.Profiling import (
+    max_profiles,
+    profile_dir,
+    profiling_enabled,
+    profiling_mode,
+    profiling_token,
+    sample_rate,
+    sampling_interval,
+)
 from errors.handlers import init_exception_handlers
+from ml.indexing import shutdown_chunking_pool
+from ml.lifespan import load_models
 
+from routing.metrics import router as metrics_router
+from routing.v1.admin import router as admin_router
 from routing.v1.ml import router as ml_router
+from services.minio import MinioService
+from utils.metrics import (
+    HTTP_REQUEST_SECONDS,
+    server_timing_header,
+    stage,
+    start_request_timings,
+)
+from utils.profiling import (
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    finish_profile,
+    should_profile,
+    start_profile,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with stage("startup", "lifespan"):
+        if preload_models:
+            await run_in_threadpool(load_models)
+        MinioService(minio_client()).create_bucket(base_bucket)
+    yield
+    shutdown_chunking_pool()
 
-app = FastAPI(openapi_url="/core/openapi.json", docs_url="/core/docs")
+
+app = FastAPI(
+    openapi_url="/core/openapi.json", docs_url="/core/docs", lifespan=lifespan
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +66,58 @@ app.add_middleware(
 
 init_exception_handlers(app)
 
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=str(response.status_code),
+    )
+
+    timings["total"] = elapsed
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+if profiling_enabled:
+    # Регистрируется только при включенном профилировании, чтобы в обычном режиме
+    # запросы не проходили через лишний слой middleware.
+    @app.middleware("http")
+    async def profiling(request: Request, call_next):
+        if not should_profile(
+            request.url.path,
+            request.headers.get(PROFILE_HEADER),
+            profiling_token,
+            sample_rate,
+        ):
+            return await call_next(request)
+
+        profile = start_profile(profiling_mode, sampling_interval)
+        if profile is None:
+            return await call_next(request)
+
+        try:
+            response = await call_next(request)
+        finally:
+            name = finish_profile(
+                profile,
+                profile_dir,
+                f"{request.method} {request.url.path}",
+                max_profiles,
+            )
+
+        response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+
 env = get_environment_variables()
 
 if not env.DEBUG:
@@ -28,3 +125,5 @@ if not env.DEBUG:
     logger.add(sys.stdout, level="INFO")
 
 app.include_router(ml_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
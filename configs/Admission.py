@@ -0,0 +1,14 @@
+from configs.Environment import get_environment_variables
+
+env = get_environment_variables()
+
+# Одновременные вызовы CLIP (эмбеддинги вопросов и изображений, метрика ответа);
+# 0 - без ограничения.
+clip_concurrency = env.ADMISSION_CLIP_CONCURRENCY
+
+clip_queue = env.ADMISSION_CLIP_QUEUE
+
+# Одновременные вызовы модерации (классификатор токсичности и бранных слов).
+toxic_concurrency = env.ADMISSION_TOXIC_CONCURRENCY
+
+toxic_queue = env.ADMISSION_TOXIC_QUEUE
@@ -0,0 +1,20 @@
+from configs.Environment import get_environment_variables
+
+env = get_environment_variables()
+
+batch_max_size = env.ANSWER_BATCH_MAX_SIZE
+
+batch_llm_concurrency = env.ANSWER_BATCH_LLM_CONCURRENCY
+
+coalescing = env.ANSWER_COALESCING
+
+# Бюджет контекста промпта в токенах; 0 - весь параграф без сокращения.
+context_token_budget = env.ANSWER_CONTEXT_TOKENS
+
+# Бюджеты времени маршрутов в секундах; 0 - без ограничения.
+answer_deadline = env.ANSWER_DEADLINE_SECONDS
+
+batch_answer_deadline = env.ANSWER_BATCH_DEADLINE_SECONDS
+
+# Оценка длительности вызова LLM: повтор не начинается, если на него не хватает времени.
+llm_estimate = env.ANSWER_LLM_ESTIMATE_SECONDS
@@ -1,9 +1,18 @@
-import clickhouse_connect
+from functools import lru_cache
 
 from configs.Environment import get_environment_variables
 
 env = get_environment_variables()
 
-client = clickhouse_connect.get_client(
-    host=env.CLICKHOUSE_HOST, port=env.CLICKHOUSE_PORT, database=env.CLICKHOUSE_DATABASE
-)
+
+@lru_cache
+def get_clickhouse_client():
+    # Клиент создается при первом обращении: clickhouse_connect подключается к серверу
+    # уже в конструкторе, а импорт репозитория не должен требовать живой ClickHouse.
+    import clickhouse_connect
+
+    return clickhouse_connect.get_client(
+        host=env.CLICKHOUSE_HOST,
+        port=env.CLICKHOUSE_PORT,
+        database=env.CLICKHOUSE_DATABASE,
+    )
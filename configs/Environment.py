@@ -16,16 +16,58 @@ class EnvironmentSettings(BaseSettings):
     MINIO_ACCESS: str
     MINIO_SECRET: str
     MINIO_BASE_BUCKET: str
+    MINIO_LINK_MODE: str = "presigned"
+    MINIO_PUBLIC_URL: str | None = None
+    MINIO_LINK_EXPIRES: int = 7 * 24 * 60 * 60
+    MINIO_LINK_MIN_TTL: int = 60 * 60
+    MINIO_REGION: str = "us-east-1"
+    MINIO_POOL_SIZE: int = 10
 
     CLICKHOUSE_HOST: str
     CLICKHOUSE_PORT: str
     CLICKHOUSE_DATABASE: str
 
+    RETRIEVAL_MODE: str = "flat"
+    RETRIEVAL_TOP_PARAGRAPHS: int = 8
+    RETRIEVAL_RERANK_CANDIDATES: int = 100
+    RETRIEVAL_HAMMING_CANDIDATES: int = 300
+
+    INDEXING_DEDUP_MODE: str = "minhash"
+    INDEXING_DEDUP_MINHASH_THRESHOLD: float = 0.85
+    INDEXING_DEDUP_EMBEDDING_THRESHOLD: float = 0.98
+
+    ANSWER_BATCH_MAX_SIZE: int = 256
+    ANSWER_BATCH_LLM_CONCURRENCY: int = 4
+    ANSWER_COALESCING: bool = True
+    ANSWER_CONTEXT_TOKENS: int = 1024
+    ANSWER_DEADLINE_SECONDS: float = 30.0
+    ANSWER_BATCH_DEADLINE_SECONDS: float = 300.0
+    ANSWER_LLM_ESTIMATE_SECONDS: float = 5.0
+
+    MODELS_PRELOAD: bool = True
+
+    ADMISSION_CLIP_CONCURRENCY: int = 2
+    ADMISSION_CLIP_QUEUE: int = 32
+    ADMISSION_TOXIC_CONCURRENCY: int = 2
+    ADMISSION_TOXIC_QUEUE: int = 32
+
     YANDEX_FOLDER_ID: str
     YANDEX_TOKEN: str
+    YANDEX_GPT_TIMEOUT: float = 60.0
 
     ENV: str
 
+    PROFILING_TOKEN: str | None = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_MODE: str = "cprofile"
+    PROFILING_INTERVAL: float = 0.005
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 200
+
+    MEMORY_PROFILING: bool = False
+    MEMORY_PROFILING_TOP: int = 10
+    MEMORY_PROFILING_FRAMES: int = 1
+
     class Config:
         env_file = "configs/.env"
         env_file_encoding = "utf-8"
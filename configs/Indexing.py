@@ -0,0 +1,15 @@
+from configs.Environment import get_environment_variables
+from utils.types import DedupMode
+
+env = get_environment_variables()
+
+# Дедупликация чанков при индексации: exact - только точные совпадения, minhash -
+# также почти одинаковые тексты (до генерации эмбеддингов), embedding - чанки с
+# близкими эмбеддингами.
+dedup_mode = DedupMode(env.INDEXING_DEDUP_MODE)
+
+# Минимальная оценка сходства Жаккара шинглов текста для режима minhash.
+minhash_threshold = env.INDEXING_DEDUP_MINHASH_THRESHOLD
+
+# Минимальная косинусная близость эмбеддингов для режима embedding.
+embedding_threshold = env.INDEXING_DEDUP_EMBEDDING_THRESHOLD
@@ -1,17 +1,50 @@
+from datetime import timedelta
+from functools import lru_cache
+
+import urllib3
 from minio import Minio
 from configs.Environment import get_environment_variables
+from utils.types import MinioLinkMode
 
 env = get_environment_variables()
 
 base_bucket = env.MINIO_BASE_BUCKET
 
-minio_client = Minio(
-    env.MINIO_HOST,
-    access_key=env.MINIO_ACCESS,
-    secret_key=env.MINIO_SECRET,
-    secure=False if env.ENV == "LOCAL" else True,
-)
+secure = False if env.ENV == "LOCAL" else True
+
+link_mode = MinioLinkMode(env.MINIO_LINK_MODE)
+
+link_expires = timedelta(seconds=env.MINIO_LINK_EXPIRES)
+
+link_min_ttl = timedelta(seconds=env.MINIO_LINK_MIN_TTL)
+
+public_url = (
+    env.MINIO_PUBLIC_URL or f"{'https' if secure else 'http'}://{env.MINIO_HOST}"
+).rstrip("/")
+
+
+@lru_cache
+def minio_client() -> Minio:
+    # Клиент создается при первом обращении, как и клиент ClickHouse.
+    # Один пул HTTP-соединений на процесс: клиент переиспользует keep-alive соединения,
+    # а явный регион избавляет от запроса GetBucketLocation перед подписью ссылок.
+    http_client = urllib3.PoolManager(
+        maxsize=env.MINIO_POOL_SIZE,
+        timeout=urllib3.Timeout(connect=5, read=60),
+        retries=urllib3.Retry(
+            total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+        ),
+    )
+
+    return Minio(
+        env.MINIO_HOST,
+        access_key=env.MINIO_ACCESS,
+        secret_key=env.MINIO_SECRET,
+        secure=secure,
+        region=env.MINIO_REGION,
+        http_client=http_client,
+    )
 
 
 def get_minio_client() -> Minio:
-    yield minio_client
+    yield minio_client()
@@ -0,0 +1,7 @@
+from configs.Environment import get_environment_variables
+
+env = get_environment_variables()
+
+# Загружать модели в lifespan приложения; без предзагрузки модель загружается при
+# первом запросе, которому она нужна.
+preload_models = env.MODELS_PRELOAD
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from configs.Environment import get_environment_variables
+from utils.types import ProfilingMode
+
+env = get_environment_variables()
+
+profiling_token = env.PROFILING_TOKEN or None
+
+sample_rate = min(max(env.PROFILING_SAMPLE_RATE, 0.0), 1.0)
+
+profiling_mode = ProfilingMode(env.PROFILING_MODE)
+
+sampling_interval = env.PROFILING_INTERVAL
+
+profile_dir = Path(env.PROFILING_DIR)
+
+max_profiles = env.PROFILING_MAX_FILES
+
+# Без токена и без семплирования middleware профилирования не подключается вовсе.
+profiling_enabled = profiling_token is not None or sample_rate > 0
+
+memory_profiling = env.MEMORY_PROFILING
+
+memory_top = env.MEMORY_PROFILING_TOP
+
+memory_frames = max(env.MEMORY_PROFILING_FRAMES, 1)
@@ -0,0 +1,12 @@
+from configs.Environment import get_environment_variables
+from utils.types import RetrievalMode
+
+env = get_environment_variables()
+
+retrieval_mode = RetrievalMode(env.RETRIEVAL_MODE)
+
+top_paragraphs = env.RETRIEVAL_TOP_PARAGRAPHS
+
+rerank_candidates = env.RETRIEVAL_RERANK_CANDIDATES
+
+hamming_candidates = env.RETRIEVAL_HAMMING_CANDIDATES
@@ -1,9 +1,21 @@
-from yandex_cloud_ml_sdk import YCloudML
+from functools import lru_cache
 
 from configs.Environment import get_environment_variables
 
 env = get_environment_variables()
 
-sdk = YCloudML(folder_id=env.YANDEX_FOLDER_ID, auth=env.YANDEX_TOKEN)
 
-yandexGPT = sdk.models.completions("yandexgpt").langchain(model_type="chat", timeout=60)
+@lru_cache
+def yandex_gpt():
+    # SDK импортируется и клиент создается при первом запросе к LLM.
+    from yandex_cloud_ml_sdk import YCloudML
+
+    sdk = YCloudML(folder_id=env.YANDEX_FOLDER_ID, auth=env.YANDEX_TOKEN)
+
+    return sdk.models.completions("yandexgpt").langchain(
+        model_type="chat", timeout=env.YANDEX_GPT_TIMEOUT
+    )
+
+
+def get_llm():
+    yield yandex_gpt()
@@ -16,3 +16,9 @@ class ErrBadRequest(Exception):
 class ErrNotAuthorized(Exception):
     def __int__(self, message):
         super().__init__(message)
+
+
+class ErrOverloaded(Exception):
+    def __init__(self, message, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -10,6 +10,7 @@ from errors.errors import (
     ErrEntityConflict,
     ErrBadRequest,
     ErrNotAuthorized,
+    ErrOverloaded,
 )
 
 
@@ -48,6 +49,15 @@ async def bad_request_exception_handler(request: Request, e: ErrBadRequest):
     )
 
 
+async def overloaded_exception_handler(request: Request, e: ErrOverloaded):
+    logger.warning(f"err = {e}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 async def internal_server_exception_handler(request: Request, e: ErrBadRequest):
     logger.error(f"err = {e}")
     return JSONResponse(
@@ -64,4 +74,6 @@ def init_exception_handlers(app: FastAPI):
 
     app.add_exception_handler(ErrBadRequest, bad_request_exception_handler)
 
+    app.add_exception_handler(ErrOverloaded, overloaded_exception_handler)
+
     app.add_exception_handler(500, internal_server_exception_handler)
@@ -0,0 +1,57 @@
+"""
+Нагрузочное тестирование /api/v1/ml/answer с локальными заглушками.
+
+Пример:
+    python -m loadtest loadtest/questions.txt --concurrency 8 --requests 200
+    python -m loadtest corpus.jsonl --field question --concurrency 8 --requests 200
+
+По умолчанию приложение запускается в процессе, YandexGPT заменяется FakeLLM,
+ClickHouse и MinIO - хранилищами в памяти. С --clickhouse local / --minio local
+используются сервисы из переменных окружения (например, make local), а с --url
+нагружается уже запущенный сервер, и стадии берутся из заголовка Server-Timing.
+"""
+
+import argparse
+import asyncio
+
+from loadtest.runner import load_questions, run
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__)
+    parser.add_argument("corpus", help="Корпус вопросов: .jsonl или текст.")
+    parser.add_argument("--field", default="question", help="Поле вопроса в JSONL.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--url", help="Адрес запущенного сервера вместо приложения в процессе."
+    )
+    parser.add_argument("--clickhouse", choices=["memory", "local"], default="memory")
+    parser.add_argument("--minio", choices=["memory", "local"], default="memory")
+    parser.add_argument("--hit-ratio", type=float, default=0.8)
+    parser.add_argument("--noise-chunks", type=int, default=10_000)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="Сохранить сводку по стадиям в JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.questions = load_questions(args.corpus, args.field)
+
+    stats = asyncio.run(run(args))
+
+    request = next(row for row in stats.summary() if row["stage"] == "request")
+    print(stats.format())
+    print(
+        f"\nЗапросов: {request['count']}, ошибок: {request['errors']}, "
+        f"пропускная способность: {request['throughput']:.2f} rps"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+import httpx
+import numpy as np
+from loguru import logger
+
+from loadtest.standins import (
+    FakeLLM,
+    InMemoryClickhouseRepository,
+    InMemoryMinioService,
+)
+from loadtest.stats import StageStats, Timed, parse_server_timing
+from ml.models import ChunkBatch, uuid4_array, uuid_array
+from schemas.clickhouse import CreateParagraphOpts
+
+ANSWER_PATH = "/api/v1/ml/answer"
+
+
+def load_questions(path: str, field: str = "question") -> List[str]:
+    """
+    Загружает корпус вопросов: JSONL (значение поля field) или текст по строке на вопрос.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                questions.append(str(json.loads(line)[field]))
+            else:
+                questions.append(line)
+
+    if not questions:
+        raise ValueError(f"Корпус вопросов {path} пуст.")
+    return questions
+
+
+def seed_clickhouse(
+    repo: InMemoryClickhouseRepository,
+    ml_repo,
+    questions: List[str],
+    hit_ratio: float,
+    noise_chunks: int,
+    batch_size: int = 32,
+):
+    """
+    Заполняет хранилище так, чтобы доля hit_ratio вопросов находила свой чанк
+    (полный путь с параграфом, LLM и метрикой), а остальные шли по веткам
+    без найденных данных. noise_chunks случайных чанков задают размер индекса.
+    """
+    hits = questions[: int(len(questions) * hit_ratio)]
+    for start in range(0, len(hits), batch_size):
+        texts = hits[start : start + batch_size]
+        embeddings = np.atleast_2d(
+            np.asarray(ml_repo.get_embeddings_from_text(texts), dtype=np.float32)
+        )
+        paragraph_ids = [uuid.uuid4() for _ in texts]
+        for paragraph_id, text in zip(paragraph_ids, texts):
+            repo.create_paragraph(
+                CreateParagraphOpts(
+                    id=paragraph_id,
+                    name=text,
+                    text=text,
+                    num="1",
+                    images={"Рисунок 1": f"loadtest/{paragraph_id}/image_1.png"},
+                )
+            )
+        batch = ChunkBatch(
+            texts=texts,
+            paragraph_ids=uuid_array(paragraph_ids),
+            embeddings=embeddings,
+            dim=embeddings.shape[1],
+        )
+        repo.create_chunks(batch)
+        repo.create_paragraph_centroids(*batch.paragraph_centroids())
+
+    if noise_chunks:
+        dim = 512
+        embeddings = np.random.default_rng(0).standard_normal(
+            (noise_chunks, dim), np.float32
+        )
+        batch = ChunkBatch(
+            texts=["шум"] * noise_chunks,
+            paragraph_ids=uuid4_array(noise_chunks),
+            embeddings=embeddings,
+        )
+        repo.create_chunks(batch)
+        repo.create_paragraph_centroids(*batch.paragraph_centroids())
+
+    logger.info(
+        f"Хранилище заполнено: {len(hits)} вопросов, {noise_chunks} шумовых чанков"
+    )
+
+
+def build_app(args, stats: StageStats):
+    """
+    Импортирует приложение и подменяет зависимости MlService заглушками
+    с замером времени по стадиям.
+    """
+    from app import app
+    from configs.YandexGPT import get_llm
+    from repositories.clickhouse import ClickhouseRepository
+    from repositories.ml import MlRepository
+    from services.minio import MinioService
+
+    llm = Timed(
+        FakeLLM(
+            latency=args.llm_latency,
+            jitter=args.llm_jitter,
+            error_rate=args.llm_error_rate,
+        ),
+        "llm",
+        stats,
+    )
+    app.dependency_overrides[get_llm] = lambda: llm
+
+    if args.clickhouse == "memory":
+        store = InMemoryClickhouseRepository()
+        seed_clickhouse(
+            store, MlRepository(), args.questions, args.hit_ratio, args.noise_chunks
+        )
+        clickhouse = Timed(store, "clickhouse", stats)
+        app.dependency_overrides[ClickhouseRepository] = lambda: clickhouse
+    else:
+        app.dependency_overrides[ClickhouseRepository] = lambda: Timed(
+            ClickhouseRepository(), "clickhouse", stats
+        )
+
+    if args.minio == "memory":
+        minio = Timed(InMemoryMinioService(), "minio", stats)
+        app.dependency_overrides[MinioService] = lambda: minio
+    else:
+        from configs.Minio import minio_client
+
+        app.dependency_overrides[MinioService] = lambda: Timed(
+            MinioService(minio_client()), "minio", stats
+        )
+
+    def ml_repository():
+        # Как и в приложении, репозиторий создается на каждый запрос.
+        with stats.timer("ml.__init__"):
+            repo = MlRepository()
+        return Timed(repo, "ml", stats)
+
+    app.dependency_overrides[MlRepository] = ml_repository
+    return app
+
+
+async def _replay(
+    client: httpx.AsyncClient,
+    questions: List[str],
+    total: int,
+    concurrency: int,
+    stats: StageStats,
+    timeout: float,
+):
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(questions[i % len(questions)])
+
+    async def worker():
+        while True:
+            try:
+                question = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = time.perf_counter()
+            error = False
+            try:
+                response = await client.post(
+                    ANSWER_PATH, data={"question": question}, timeout=timeout
+                )
+                error = response.status_code >= 400
+                header = response.headers.get("server-timing")
+                if header:
+                    for stage, seconds in parse_server_timing(header).items():
+                        stats.record(f"server.{stage}", seconds)
+            except httpx.HTTPError as e:
+                logger.warning(f"Запрос завершился ошибкой: {e!r}")
+                error = True
+            stats.record("request", time.perf_counter() - start, error=error)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run(args) -> StageStats:
+    """
+    Прогоняет корпус вопросов через /answer и возвращает статистику по стадиям.
+    """
+    stats = StageStats()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url)
+    else:
+        app = build_app(args, stats)
+        client = httpx.AsyncClient(
+            # Необработанные исключения приложения считаются ошибками запроса (500).
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://loadtest",
+        )
+
+    async with client:
+        if args.warmup:
+            logger.info(f"Прогрев: {args.warmup} запросов")
+            await _replay(client, args.questions, args.warmup, 1, stats, args.timeout)
+            stats.reset()
+
+        logger.info(
+            f"Нагрузка: {args.requests} запросов, параллельность {args.concurrency}"
+        )
+        await _replay(
+            client,
+            args.questions,
+            args.requests,
+            args.concurrency,
+            stats,
+            args.timeout,
+        )
+        stats.finish()
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(stats.summary(), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    return stats
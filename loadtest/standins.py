@@ -0,0 +1,343 @@
+import io
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage
+from loguru import logger
+
+from errors.errors import ErrEntityNotFound
+from ml.models import DEFAULT_COLLECTION, ChunkBatch
+from ml.quantization import sign_bits
+from schemas.clickhouse import (
+    ChunkWithoutEmb,
+    CollectionInfo,
+    CreateChunkOpts,
+    CreateParagraphOpts,
+    ParagraphSchema,
+)
+from utils.types import MinioContentType
+
+
+class FakeLLM:
+    """
+    Заглушка YandexGPT с настраиваемой задержкой.
+
+    Параметры:
+    - latency (float): Средняя задержка ответа в секундах.
+    - jitter (float): Разброс задержки в секундах (равномерно в ±jitter).
+    - error_rate (float): Доля вызовов, завершающихся исключением.
+    - echo (bool): Возвращать текст запроса пользователя вместо фиксированного ответа,
+      чтобы метрика близости ответа к параграфу проходила порог.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        echo: bool = True,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.echo = echo
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, messages) -> AIMessage:
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            failed = self._random.random() < self.error_rate
+
+        time.sleep(max(delay, 0.0))
+        if failed:
+            raise RuntimeError("FakeLLM: искусственная ошибка")
+
+        content = messages[-1].content if self.echo else "Ответ заглушки LLM."
+        return AIMessage(content=content)
+
+
+class InMemoryClickhouseRepository:
+    """
+    Хранилище чанков и параграфов в памяти с интерфейсом ClickhouseRepository.
+
+    Поиск по эмбеддингам выполняется перебором косинусной близости, как и запросы
+    get_chunk_by_emb, get_chunk_by_emb_hierarchical и get_chunk_by_emb_binary в
+    ClickHouse.
+    """
+
+    def __init__(self):
+        self._ids: List[uuid.UUID] = []
+        self._texts: List[str] = []
+        self._paragraph_ids: List[uuid.UUID] = []
+        self._collections: List[str] = []
+        self._embeddings: List[np.ndarray] = []
+        self._matrix: np.ndarray | None = None
+        self._bits: np.ndarray | None = None
+        self._paragraphs: Dict[uuid.UUID, ParagraphSchema] = {}
+        self._paragraph_collections: Dict[uuid.UUID, str] = {}
+        self._centroids: Dict[uuid.UUID, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def create_chunk(self, opts: CreateChunkOpts):
+        with self._lock:
+            self._ids.append(opts.id)
+            self._texts.append(opts.text)
+            self._paragraph_ids.append(opts.paragraph_id)
+            self._collections.append(DEFAULT_COLLECTION)
+            self._embeddings.append(np.asarray(opts.emb, dtype=np.float32)[None])
+            self._matrix = None
+            self._bits = None
+
+    def create_chunks(self, batch: ChunkBatch, projection=None):
+        with self._lock:
+            for i in range(len(batch)):
+                self._ids.append(uuid.UUID(bytes=batch.ids[i].ljust(16, b"\0")))
+                self._paragraph_ids.append(
+                    uuid.UUID(bytes=batch.paragraph_ids[i].ljust(16, b"\0"))
+                )
+            self._texts.extend(batch.texts)
+            self._collections.extend([batch.collection] * len(batch))
+            self._embeddings.append(batch.embeddings.astype(np.float32, copy=False))
+            self._matrix = None
+            self._bits = None
+
+    def create_paragraph(self, opts: CreateParagraphOpts):
+        with self._lock:
+            self._paragraphs[opts.id] = ParagraphSchema(**opts.model_dump())
+            self._paragraph_collections[opts.id] = opts.collection
+
+    def create_paragraph_centroids(
+        self,
+        paragraph_ids: np.ndarray,
+        centroids: np.ndarray,
+        collection: str = DEFAULT_COLLECTION,
+    ):
+        with self._lock:
+            for paragraph_id, centroid in zip(paragraph_ids, centroids):
+                key = uuid.UUID(bytes=paragraph_id.ljust(16, b"\0"))
+                self._centroids[key] = centroid.astype(np.float32)
+                self._paragraph_collections.setdefault(key, collection)
+
+    def _collection_rows(self, collection: Optional[str]) -> np.ndarray | None:
+        if collection is None:
+            return None
+        with self._lock:
+            return np.flatnonzero(np.asarray(self._collections) == collection)
+
+    def _get_matrix(self) -> np.ndarray:
+        with self._lock:
+            if self._matrix is None:
+                matrix = (
+                    np.concatenate(self._embeddings)
+                    if self._embeddings
+                    else np.zeros((0, 0), dtype=np.float32)
+                )
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1
+                self._matrix = matrix / norms
+            return self._matrix
+
+    def _top_chunks(
+        self, embeddings: list[float], top_k: int, rows: np.ndarray | None = None
+    ) -> list[ChunkWithoutEmb]:
+        matrix = self._get_matrix()
+        query = np.asarray(embeddings, dtype=np.float32)
+        if not len(matrix) or matrix.shape[1] != len(query):
+            return []
+        if rows is None:
+            rows = np.arange(len(matrix))
+        if not len(rows):
+            return []
+
+        norm = np.linalg.norm(query)
+        scores = matrix[rows] @ (query / norm) if norm else np.zeros(len(rows))
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            ChunkWithoutEmb(
+                id=self._ids[rows[i]],
+                text=self._texts[rows[i]],
+                paragraph_id=self._paragraph_ids[rows[i]],
+                cos_dist=float(scores[i]),
+            )
+            for i in top
+        ]
+
+    def get_chunk_by_emb(
+        self, embeddings: list[float], top_k: int, collection: Optional[str] = None
+    ) -> list[ChunkWithoutEmb]:
+        return self._top_chunks(embeddings, top_k, self._collection_rows(collection))
+
+    def get_chunks_by_embs(
+        self,
+        embeddings: list[list[float]],
+        top_k: int,
+        collection: Optional[str] = None,
+    ) -> list[list[ChunkWithoutEmb]]:
+        rows = self._collection_rows(collection)
+        return [self._top_chunks(query, top_k, rows) for query in embeddings]
+
+    def get_chunk_by_emb_binary(
+        self,
+        embeddings: list[float],
+        top_k: int,
+        candidates: int,
+        collection: Optional[str] = None,
+    ) -> list[ChunkWithoutEmb]:
+        matrix = self._get_matrix()
+        with self._lock:
+            if self._bits is None:
+                self._bits = sign_bits(matrix)
+            bits = self._bits
+
+        rows = self._collection_rows(collection)
+        if rows is None:
+            rows = np.arange(len(bits))
+
+        query = sign_bits(np.asarray([embeddings]))[0]
+        distances = np.unpackbits(bits[rows] ^ query, axis=1).sum(axis=1)
+        rows = rows[np.argsort(distances, kind="stable")[:candidates]]
+        return self._top_chunks(embeddings, top_k, rows)
+
+    def get_chunk_by_emb_hierarchical(
+        self,
+        embeddings: list[float],
+        top_k: int,
+        top_paragraphs: int,
+        collection: Optional[str] = None,
+    ) -> list[ChunkWithoutEmb]:
+        with self._lock:
+            paragraph_ids = [
+                pid
+                for pid in self._centroids
+                if collection is None
+                or self._paragraph_collections.get(pid) == collection
+            ]
+            centroids = (
+                np.stack([self._centroids[pid] for pid in paragraph_ids])
+                if paragraph_ids
+                else None
+            )
+        if centroids is None:
+            return []
+
+        scores = centroids @ np.asarray(embeddings, dtype=np.float32)
+        selected = {paragraph_ids[i] for i in np.argsort(-scores)[:top_paragraphs]}
+        rows = np.array(
+            [i for i, pid in enumerate(self._paragraph_ids) if pid in selected],
+            dtype=np.int64,
+        )
+        return self._top_chunks(embeddings, top_k, rows)
+
+    def get_collections(self) -> list[CollectionInfo]:
+        with self._lock:
+            counts = Counter(self._collections)
+        return [
+            CollectionInfo(name=name, chunks=count)
+            for name, count in sorted(counts.items())
+        ]
+
+    def drop_collection(self, collection: str):
+        with self._lock:
+            keep = np.asarray(self._collections) != collection
+            embeddings = (
+                np.concatenate(self._embeddings)[keep] if self._embeddings else None
+            )
+            self._ids = [v for v, k in zip(self._ids, keep) if k]
+            self._texts = [v for v, k in zip(self._texts, keep) if k]
+            self._paragraph_ids = [v for v, k in zip(self._paragraph_ids, keep) if k]
+            self._collections = [v for v, k in zip(self._collections, keep) if k]
+            self._embeddings = [embeddings] if embeddings is not None else []
+            self._matrix = None
+            self._bits = None
+
+            dropped = [
+                pid
+                for pid, name in self._paragraph_collections.items()
+                if name == collection
+            ]
+            for pid in dropped:
+                self._paragraphs.pop(pid, None)
+                self._centroids.pop(pid, None)
+                del self._paragraph_collections[pid]
+
+    def get_latest_projection(self):
+        # Проекция PCA не обучается: режим reduced сводится к точному поиску.
+        return None
+
+    def get_paragraph_chunks(
+        self, paragraph_id: uuid.UUID, embeddings: list[float]
+    ) -> list[ChunkWithoutEmb]:
+        rows = np.array(
+            [
+                i
+                for i, pid in enumerate(self._paragraph_ids)
+                if pid == paragraph_id and self._texts[i] != "image"
+            ],
+            dtype=np.int64,
+        )
+        return self._top_chunks(embeddings, len(rows), rows)
+
+    def get_paragraph(self, id: uuid.UUID) -> ParagraphSchema:
+        paragraph = self._paragraphs.get(id)
+        if paragraph is None:
+            raise ErrEntityNotFound(f"there is no paragraph with id {id}")
+        return paragraph
+
+
+class InMemoryMinioService:
+    """
+    Хранилище объектов в памяти с интерфейсом MinioService.
+    """
+
+    def __init__(self):
+        self._objects: Dict[tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def create_object_from_byte(
+        self,
+        object_path: str,
+        file: io.BytesIO,
+        content_type: MinioContentType,
+        bucket_name: str = "static",
+    ) -> str:
+        with self._lock:
+            self._objects[(bucket_name, object_path)] = file.getvalue()
+        return object_path
+
+    def create_object_from_file(
+        self,
+        object_path: str,
+        file: str,
+        content_type: MinioContentType,
+        bucket_name: str = "static",
+    ) -> str:
+        with open(file, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self._objects[(bucket_name, object_path)] = data
+        return object_path
+
+    def remove_prefix(self, prefix: str, bucket_name: str = "static"):
+        with self._lock:
+            for key in [
+                key
+                for key in self._objects
+                if key[0] == bucket_name and key[1].startswith(prefix)
+            ]:
+                del self._objects[key]
+
+    def create_bucket(self, name: str):
+        logger.debug(f"InMemoryMinio - create_bucket {name}")
+
+    def get_link(self, object_path: str, bucket_name: str = "static") -> str:
+        return f"memory://{bucket_name}/{object_path}"
@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Возвращает перцентиль q (0..100) отсортированного списка методом ближайшего ранга.
+    """
+    if not values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class StageStats:
+    """
+    Потокобезопасный сборщик длительностей и ошибок по стадиям пайплайна.
+    """
+
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def record(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            self._durations[stage].append(seconds)
+            if error:
+                self._errors[stage] += 1
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(stage, time.perf_counter() - start, error=True)
+            raise
+        self.record(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._errors.clear()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def summary(self) -> List[dict]:
+        """
+        Сводка по стадиям: количество вызовов, ошибки, p50/p95/p99 в секундах
+        и пропускная способность в вызовах в секунду.
+        """
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        rows = []
+        with self._lock:
+            for stage, durations in sorted(self._durations.items()):
+                values = sorted(durations)
+                rows.append(
+                    {
+                        "stage": stage,
+                        "count": len(values),
+                        "errors": self._errors[stage],
+                        "p50": percentile(values, 50),
+                        "p95": percentile(values, 95),
+                        "p99": percentile(values, 99),
+                        "throughput": len(values) / elapsed if elapsed else 0.0,
+                    }
+                )
+        return rows
+
+    def format(self) -> str:
+        rows = self.summary()
+        header = (
+            f"{'stage':<40} {'count':>7} {'errors':>7} {'p50 ms':>10}"
+            f" {'p95 ms':>10} {'p99 ms':>10} {'rps':>8}"
+        )
+        lines = [header, "-" * len(header)]
+        for row in rows:
+            lines.append(
+                f"{row['stage']:<40} {row['count']:>7} {row['errors']:>7}"
+                f" {row['p50'] * 1000:>10.1f} {row['p95'] * 1000:>10.1f}"
+                f" {row['p99'] * 1000:>10.1f} {row['throughput']:>8.2f}"
+            )
+        return "\n".join(lines)
+
+
+class Timed:
+    """
+    Прокси, замеряющий время каждого вызова методов обернутого объекта.
+
+    Вызов метода name записывается в стадию "{prefix}.{name}".
+    """
+
+    def __init__(self, target, prefix: str, stats: StageStats):
+        self._target = target
+        self._prefix = prefix
+        self._stats = stats
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        stage = f"{self._prefix}.{name}"
+
+        def timed(*args, **kwargs):
+            with self._stats.timer(stage):
+                return attr(*args, **kwargs)
+
+        return timed
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    Разбирает заголовок Server-Timing ("name;dur=12.5, other;dur=3") в секунды.
+    """
+    stages = {}
+    for metric in header.split(","):
+        name, *params = [part.strip() for part in metric.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value) / 1000
+                except ValueError:
+                    pass
+    return stages
@@ -0,0 +1,194 @@
+import argparse
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from ml.constants import (
+    CLIP_MODEL_NAME,
+    CLIP_PRETRAINED,
+    CLIP_WEIGHTS_PATH,
+    TOXIC_CLF_PATH,
+    TOXIC_WEIGHTS_FILE,
+)
+from utils.memory import current_rss_bytes, current_shared_bytes
+from utils.metrics import MODEL_LOAD_RSS_BYTES, MODEL_LOAD_SECONDS, stage
+
+# Артефакты моделей - веса в safetensors. Файл отображается в память (mmap), и тензоры
+# float32 ссылаются прямо на страницы файла: воркеры на одной машине делят эти
+# страницы через page cache, а не держат каждый свою копию весов. Веса, сохраненные в
+# float16 (--fp16), занимают вдвое меньше места, но при загрузке переводятся в
+# float32 и уже не разделяются между процессами.
+
+
+def _format_bytes(value: float) -> str:
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def save_weights(
+    state_dict: Dict, path: str, fp16: bool = False, metadata: Optional[Dict] = None
+):
+    """
+    Сохраняет веса модели в safetensors.
+
+    Параметры:
+    - state_dict (Dict): Веса модели.
+    - path (str): Путь к файлу.
+    - fp16 (bool): Хранить веса с плавающей точкой в float16.
+    - metadata (Optional[Dict]): Дополнительные строковые метаданные файла.
+    """
+    from safetensors.torch import save_file
+
+    tensors = {}
+    for name, tensor in state_dict.items():
+        tensor = tensor.detach().cpu()
+        if fp16 and tensor.is_floating_point():
+            tensor = tensor.half()
+        tensors[name] = tensor.contiguous()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_file(
+        tensors,
+        path,
+        metadata={
+            "format": "pt",
+            "dtype": "float16" if fp16 else "float32",
+            **(metadata or {}),
+        },
+    )
+    logger.info(f"Веса сохранены в {path} ({_format_bytes(os.path.getsize(path))}).")
+
+
+def load_weights(path: str) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Загружает веса из safetensors через mmap. Тензоры float32 остаются отображенными
+    на файл, поэтому модель нужно заполнять через load_state_dict(..., assign=True),
+    иначе веса скопируются в память процесса.
+
+    Возвращает:
+    - Tuple[Dict, Dict[str, str]]: Веса и метаданные файла.
+    """
+    import torch
+    from safetensors import safe_open
+
+    with safe_open(path, framework="pt", device="cpu") as f:
+        metadata = f.metadata() or {}
+        state_dict = {name: f.get_tensor(name) for name in f.keys()}
+
+    for name, tensor in state_dict.items():
+        if tensor.dtype == torch.float16:
+            state_dict[name] = tensor.float()
+
+    return state_dict, metadata
+
+
+@contextmanager
+def model_load(name: str):
+    """
+    Замеряет загрузку модели: длительность, прирост RSS и его разделяемую часть
+    (страницы файлов весов). Результаты пишутся в лог и в метрики rag_model_load_*.
+    При параллельной загрузке моделей приросты RSS пересекаются; точные значения
+    по каждой модели дает python -m ml.artifacts report.
+    """
+    rss_before = current_rss_bytes() or 0
+    shared_before = current_shared_bytes() or 0
+    start = time.perf_counter()
+
+    with stage("startup", f"{name}_model"):
+        yield
+
+    elapsed = time.perf_counter() - start
+    rss = (current_rss_bytes() or 0) - rss_before
+    shared = (current_shared_bytes() or 0) - shared_before
+
+    MODEL_LOAD_SECONDS.set(elapsed, model=name)
+    MODEL_LOAD_RSS_BYTES.set(rss, model=name, kind="total")
+    MODEL_LOAD_RSS_BYTES.set(shared, model=name, kind="shared")
+    logger.info(
+        f"Модель {name} загружена за {elapsed:.2f} с: RSS +{_format_bytes(rss)}, "
+        f"из них разделяемые страницы файлов +{_format_bytes(shared)}"
+    )
+
+
+def convert_clip(path: str, fp16: bool):
+    import open_clip
+
+    model, _, _ = open_clip.create_model_and_transforms(
+        CLIP_MODEL_NAME, pretrained=CLIP_PRETRAINED
+    )
+    save_weights(
+        model.state_dict(),
+        path,
+        fp16,
+        {"model": CLIP_MODEL_NAME, "pretrained": CLIP_PRETRAINED},
+    )
+
+
+def convert_toxic(model_dir: str, fp16: bool, keep_original: bool):
+    from transformers import AutoModelForSequenceClassification
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    save_weights(model.state_dict(), os.path.join(model_dir, TOXIC_WEIGHTS_FILE), fp16)
+
+    # transformers и так предпочитает safetensors, а pickle-файл весов больше не нужен.
+    original = os.path.join(model_dir, "pytorch_model.bin")
+    if not keep_original and os.path.exists(original):
+        os.remove(original)
+
+
+def convert_command(args):
+    convert_clip(args.clip_path, args.fp16)
+    convert_toxic(args.toxic_dir, args.fp16, args.keep_original)
+
+
+def report_command(args):
+    from ml.lifespan import get_embedding_generator, get_swear_clf, get_toxic_clf
+
+    # Модели загружаются по очереди, чтобы приросты RSS не пересекались.
+    models = (
+        ("clip", get_embedding_generator),
+        ("toxic", get_toxic_clf),
+        ("swear", get_swear_clf),
+    )
+    for _, loader in models:
+        loader()
+
+    print(f"{'модель':<8} {'время, с':>9} {'RSS':>12} {'разделяемая':>12}")
+    for name, _ in models:
+        print(
+            f"{name:<8} {MODEL_LOAD_SECONDS.value(model=name):>9.2f} "
+            f"{_format_bytes(MODEL_LOAD_RSS_BYTES.value(model=name, kind='total')):>12} "
+            f"{_format_bytes(MODEL_LOAD_RSS_BYTES.value(model=name, kind='shared')):>12}"
+        )
+
+
+# Подготовка артефактов моделей (выполняется в make load-models) и отчет о загрузке:
+#   python -m ml.artifacts convert [--fp16]
+#   python -m ml.artifacts report
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m ml.artifacts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser(
+        "convert",
+        help="Сохранить веса CLIP и классификатора токсичности в safetensors.",
+    )
+    convert_parser.add_argument("--fp16", action="store_true")
+    convert_parser.add_argument("--clip-path", default=CLIP_WEIGHTS_PATH)
+    convert_parser.add_argument("--toxic-dir", default=TOXIC_CLF_PATH)
+    convert_parser.add_argument(
+        "--keep-original",
+        action="store_true",
+        help="Не удалять pytorch_model.bin классификатора после конвертации.",
+    )
+    convert_parser.set_defaults(handler=convert_command)
+
+    report_parser = commands.add_parser(
+        "report", help="Загрузить модели и вывести время загрузки и прирост RSS."
+    )
+    report_parser.set_defaults(handler=report_command)
+
+    args = parser.parse_args()
+    args.handler(args)
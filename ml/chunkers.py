@@ -3,14 +3,20 @@ from __future__ import annotations
 import copy
 import logging
 import re
+from collections import deque
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import groupby, islice, repeat
 from typing import (
     Any,
     Callable,
     Iterable,
+    Iterator,
     List,
     Optional,
+    Pattern,
     Sequence,
+    Tuple,
     cast,
 )
 
@@ -47,17 +53,26 @@ class SentenceChunker:
         tokens_per_chunk (Optional[int]): Максимальное количество токенов в части.
         add_start_index (bool): Флаг добавления индекса начала части.
         strip_whitespace (bool): Флаг удаления пробелов в начале и конце части.
+        use_offset_mapping (bool): Флаг вырезания частей из исходного текста по offset mapping
+            быстрого токенизатора вместо декодирования токенов.
+        batch_size (int): Количество текстов, кодируемых токенизатором за один вызов.
 
     Methods:
         create_documents(texts: List[str], metadatas: Optional[List[dict]] = None) -> List[Document]:
             Создает документы на основе списка текстов.
 
+        iter_documents(texts: Iterable[str], metadatas: Optional[Iterable[dict]] = None) -> Iterator[Document]:
+            Лениво создает документы на основе текстов.
+
         split_documents(documents: Iterable[Document]) -> List[Any]:
             Разбивает список документов на тексты и метаданные и вызывает метод create_documents.
 
         split_text(text: str) -> List[str]:
             Разбивает текст на части с помощью токенизатора.
 
+        iter_split(text: str) -> Iterator[Tuple[str, int]]:
+            Лениво разбивает текст на части и возвращает их вместе с позицией начала в тексте.
+
         count_tokens(text: str) -> int:
             Считает количество токенов в тексте.
     """
@@ -69,21 +84,31 @@ class SentenceChunker:
         tokens_per_chunk: Optional[int] = None,
         add_start_index: bool = False,
         strip_whitespace: bool = True,
+        use_offset_mapping: bool = False,
+        batch_size: int = 64,
         **kwargs: Any,
     ) -> None:
         try:
-            from transformers import AutoModel, AutoTokenizer
+            from transformers import AutoConfig, AutoTokenizer
         except ImportError:
             raise ImportError(
                 "Пожалуйста, установите transformers с помощью `pip install transformers`."
             )
         self._chunk_overlap = chunk_overlap
         self.model_name = model_name
-        self._model = AutoModel.from_pretrained(self.model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        # Для разбиения нужен только лимит позиций модели, поэтому веса не загружаются.
+        self._config = AutoConfig.from_pretrained(self.model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+        if use_offset_mapping and not self.tokenizer.is_fast:
+            raise ValueError(
+                f"Для модели '{self.model_name}' нет быстрого токенизатора,"
+                f" режим use_offset_mapping недоступен."
+            )
         self._initialize_chunk_configuration(tokens_per_chunk=tokens_per_chunk)
         self._add_start_index = add_start_index
         self._strip_whitespace = strip_whitespace
+        self._use_offset_mapping = use_offset_mapping
+        self._batch_size = batch_size
 
     def _initialize_chunk_configuration(
         self, *, tokens_per_chunk: Optional[int]
@@ -96,9 +121,7 @@ class SentenceChunker:
         """
 
         # Получение максимального количества токенов модели.
-        self.maximum_tokens_per_chunk = cast(
-            int, self._model.config.max_position_embeddings
-        )
+        self.maximum_tokens_per_chunk = cast(int, self._config.max_position_embeddings)
 
         # Установка значения tokens_per_chunk в соответствии с переданным или максимальным значением.
         if tokens_per_chunk is None:
@@ -126,33 +149,49 @@ class SentenceChunker:
             metadatas (Optional[List[dict]]): Список метаданных для каждого текста.
 
         Returns:
-            List[Document]: Список документов.
+            List[Document]: Список документов с независимыми копиями метаданных.
         """
+        return [
+            Document(
+                page_content=doc.page_content, metadata=copy.deepcopy(doc.metadata)
+            )
+            for doc in self.iter_documents(texts, metadatas)
+        ]
 
-        # Создание пустых списков для текстов и метаданных.
-        _metadatas = metadatas or [{}] * len(texts)
-        documents = []
-
-        # Итерация по текстам для создания документов.
-        for i, text in enumerate(texts):
-            index = 0
-            previous_chunk_len = 0
+    def iter_documents(
+        self, texts: Iterable[str], metadatas: Optional[Iterable[dict]] = None
+    ) -> Iterator[Document]:
+        """
+        Лениво создает документы на основе текстов.
 
-            # Итерация по частям текста.
-            for chunk in self.split_text(text):
-                metadata = copy.deepcopy(_metadatas[i])
+        Метаданные не копируются: все чанки одного текста ссылаются на один и тот же
+        словарь (при add_start_index - на его поверхностную копию с start_index),
+        поэтому изменять их нельзя.
 
-                # Добавление индекса начала части, если флаг установлен.
-                if self._add_start_index:
-                    offset = index + previous_chunk_len - self._chunk_overlap
-                    index = text.find(chunk, max(0, offset))
-                    metadata["start_index"] = index
-                    previous_chunk_len = len(chunk)
+        Args:
+            texts (Iterable[str]): Тексты для обработки.
+            metadatas (Optional[Iterable[dict]]): Метаданные для каждого текста.
 
-                # Создание нового документа и добавление его в список документов.
-                new_doc = Document(page_content=chunk, metadata=metadata)
-                documents.append(new_doc)
-        return documents
+        Yields:
+            Document: Документ для очередной части текста.
+        """
+        _metadatas = metadatas or repeat({})
+        pairs = zip(texts, _metadatas)
+
+        # Тексты кодируются пачками: быстрый токенизатор обрабатывает пачку за один вызов.
+        while batch := list(islice(pairs, self._batch_size)):
+            encodings = self._encode_batch_with_offsets([text for text, _ in batch])
+
+            for (text, metadata), (input_ids, offsets) in zip(batch, encodings):
+                for chunk, start_index in self._iter_windows(text, input_ids, offsets):
+                    if self._add_start_index:
+                        chunk_metadata = {**metadata, "start_index": start_index}
+                    else:
+                        chunk_metadata = metadata
+
+                    yield Document.model_construct(
+                        page_content=chunk, metadata=chunk_metadata
+                    )
 
     def split_documents(self, documents: Iterable[Document]) -> List[Any]:
         """
@@ -183,20 +222,88 @@ class SentenceChunker:
         Returns:
             List[str]: Список частей текста.
         """
+        return [chunk for chunk, _ in self.iter_split(text)]
+
+    def iter_split(self, text: str) -> Iterator[Tuple[str, int]]:
+        """
+        Лениво разбивает текст на части с помощью токенизатора.
 
-        def encode_strip_start_and_stop_token_ids(text: str) -> List[int]:
-            # Функция для кодирования текста без токенов начала и конца
-            return self._encode(text)[1:-1]
+        Позиция начала части берется из offset mapping быстрого токенизатора,
+        поэтому она точна даже при повторяющихся фрагментах текста.
 
-        # Создание экземпляра Tokenizer с необходимыми параметрами
-        tokenizer = Tokenizer(
-            chunk_overlap=self._chunk_overlap,
-            tokens_per_chunk=self.tokens_per_chunk,
-            decode=self.tokenizer.decode,
-            encode=encode_strip_start_and_stop_token_ids,
-        )
-        # Разбиение текста на части на основе токенов
-        return self.split_text_on_tokens(text=text, tokenizer=tokenizer)
+        Args:
+            text (str): Исходный текст.
+
+        Yields:
+            Tuple[str, int]: Часть текста и позиция ее начала в исходном тексте.
+        """
+        input_ids, offsets = self._encode_with_offsets(text)
+        return self._iter_windows(text, input_ids, offsets)
+
+    def _iter_windows(
+        self,
+        text: str,
+        input_ids: List[int],
+        offsets: Optional[List[Tuple[int, int]]],
+    ) -> Iterator[Tuple[str, int]]:
+        """
+        Нарезает закодированный текст на окна токенов.
+
+        Args:
+            text (str): Исходный текст.
+            input_ids (List[int]): Токены текста без токенов начала и конца.
+            offsets (Optional[List[Tuple[int, int]]]): Позиции токенов в тексте или None.
+
+        Yields:
+            Tuple[str, int]: Часть текста и позиция ее начала в исходном тексте.
+        """
+        # Медленные токенизаторы не умеют возвращать offset mapping:
+        # в этом случае ищем часть в тексте, начиная с конца предыдущего перекрытия.
+        index = 0
+        previous_chunk_len = 0
+
+        for start_idx, cur_idx in self._iter_token_windows(
+            len(input_ids), self.tokens_per_chunk, self._chunk_overlap
+        ):
+            if self._use_offset_mapping:
+                # Окно вырезается из исходного текста от начала первого до конца последнего токена.
+                index = offsets[start_idx][0]
+                yield text[index : offsets[cur_idx - 1][1]], index
+                continue
+
+            chunk = self.tokenizer.decode(input_ids[start_idx:cur_idx])
+
+            if offsets is not None:
+                index = offsets[start_idx][0]
+            else:
+                offset = index + previous_chunk_len - self._chunk_overlap
+                index = text.find(chunk, max(0, offset))
+                previous_chunk_len = len(chunk)
+
+            yield chunk, index
+
+    @staticmethod
+    def _iter_token_windows(
+        n_tokens: int, tokens_per_chunk: int, chunk_overlap: int
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Перечисляет границы окон токенов с перекрытием.
+
+        Args:
+            n_tokens (int): Количество токенов в тексте.
+            tokens_per_chunk (int): Максимальное количество токенов в части.
+            chunk_overlap (int): Количество токенов перекрытия между частями.
+
+        Yields:
+            Tuple[int, int]: Индексы начала и конца окна.
+        """
+        start_idx = 0
+        while start_idx < n_tokens:
+            cur_idx = min(start_idx + tokens_per_chunk, n_tokens)
+            yield start_idx, cur_idx
+            if cur_idx == n_tokens:
+                break
+            start_idx += tokens_per_chunk - chunk_overlap
 
     @staticmethod
     def split_text_on_tokens(*, text: str, tokenizer: Tokenizer) -> List[str]:
@@ -210,20 +317,13 @@ class SentenceChunker:
         Returns:
             List[str]: Список частей текста.
         """
-        # Разбиение текста на части на основе токенов
-        splits: List[str] = []
         input_ids = tokenizer.encode(text)
-        start_idx = 0
-        cur_idx = min(start_idx + tokenizer.tokens_per_chunk, len(input_ids))
-        chunk_ids = input_ids[start_idx:cur_idx]
-        while start_idx < len(input_ids):
-            splits.append(tokenizer.decode(chunk_ids))
-            if cur_idx == len(input_ids):
-                break
-            start_idx += tokenizer.tokens_per_chunk - tokenizer.chunk_overlap
-            cur_idx = min(start_idx + tokenizer.tokens_per_chunk, len(input_ids))
-            chunk_ids = input_ids[start_idx:cur_idx]
-        return splits
+        return [
+            tokenizer.decode(input_ids[start_idx:cur_idx])
+            for start_idx, cur_idx in SentenceChunker._iter_token_windows(
+                len(input_ids), tokenizer.tokens_per_chunk, tokenizer.chunk_overlap
+            )
+        ]
 
     def count_tokens(self, *, text: str) -> int:
         """
@@ -256,6 +356,58 @@ class SentenceChunker:
         )
         return token_ids_with_start_and_end_token_ids
 
+    def _encode_with_offsets(
+        self, text: str
+    ) -> Tuple[List[int], Optional[List[Tuple[int, int]]]]:
+        """
+        Кодирует текст в токены без токенов начала и конца вместе с их позициями в тексте.
+
+        Args:
+            text (str): Исходный текст.
+
+        Returns:
+            Tuple[List[int], Optional[List[Tuple[int, int]]]]: Список токенов и их позиции
+            или None, если токенизатор не поддерживает offset mapping.
+        """
+        if not self.tokenizer.is_fast:
+            return self._encode(text)[1:-1], None
+
+        encoding = self.tokenizer(
+            text,
+            max_length=self._max_length_equal_32_bit_integer,
+            truncation="do_not_truncate",
+            return_offsets_mapping=True,
+        )
+        return encoding["input_ids"][1:-1], encoding["offset_mapping"][1:-1]
+
+    def _encode_batch_with_offsets(
+        self, texts: List[str]
+    ) -> List[Tuple[List[int], Optional[List[Tuple[int, int]]]]]:
+        """
+        Кодирует пачку текстов за один вызов токенизатора.
+
+        Args:
+            texts (List[str]): Исходные тексты.
+
+        Returns:
+            List[Tuple[List[int], Optional[List[Tuple[int, int]]]]]: Токены и их позиции для каждого текста.
+        """
+        if not self.tokenizer.is_fast:
+            return [self._encode_with_offsets(text) for text in texts]
+
+        encodings = self.tokenizer(
+            texts,
+            max_length=self._max_length_equal_32_bit_integer,
+            truncation="do_not_truncate",
+            return_offsets_mapping=True,
+        )
+        return [
+            (input_ids[1:-1], offsets[1:-1])
+            for input_ids, offsets in zip(
+                encodings["input_ids"], encodings["offset_mapping"]
+            )
+        ]
+
 
 class RecursiveChunker:
     """
@@ -273,15 +425,18 @@ class RecursiveChunker:
         **kwargs: Дополнительные аргументы.
 
     Methods:
-        _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+        _iter_merge(self, text: str, splits: Iterable[Tuple[int, int, int]], separator: str) -> Iterator[Tuple[str, int]]:
             Объединяет части текста с разделителем separator, учитывая ограничения на размер части.
 
-        _join_docs(self, docs: List[str], separator: str) -> Optional[str]:
-            Объединяет список частей текста в один текст с разделителем separator.
+        _join_window(self, text: str, window: Sequence[Tuple[int, int, int]], separator: str) -> Optional[Tuple[str, int]]:
+            Объединяет окно частей текста в один текст с разделителем separator.
 
         create_documents(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[Document]:
             Создает список документов на основе текстов.
 
+        iter_documents(self, texts: Iterable[str], metadatas: Optional[Iterable[dict]] = None) -> Iterator[Document]:
+            Лениво создает документы на основе текстов.
+
         split_documents(self, documents: Iterable[Document]) -> List[Any]:
             Разбивает документы на части и создает новые документы на основе частей текста.
 
@@ -291,12 +446,18 @@ class RecursiveChunker:
         _split_text_with_regex(text: str, separator: str, keep_separator: bool) -> List[str]:
             Разделяет текст на части с помощью регулярного выражения separator.
 
-        _split_text(self, text: str, separators: List[str]) -> List[str]:
-            Рекурсивно разбивает текст на части с учетом списка разделителей separators.
+        _iter_spans(text: str, start: int, end: int, pattern: Optional[Pattern[str]], keep_separator: bool) -> Iterator[Tuple[int, int]]:
+            Перечисляет границы частей фрагмента текста, разделенного регулярным выражением pattern.
+
+        _iter_split(self, text: str, start: int, end: int, level: int) -> Iterator[Tuple[str, int]]:
+            Рекурсивно разбивает фрагмент текста на части, начиная с разделителя с индексом level.
 
         split_text(self, text: str) -> List[str]:
             Разделяет текст на части с учетом установленных разделителей.
 
+        iter_split(self, text: str) -> Iterator[Tuple[str, int]]:
+            Лениво разделяет текст на части и возвращает их вместе с позицией начала в тексте.
+
     """
 
     def __init__(
@@ -313,6 +474,13 @@ class RecursiveChunker:
     ) -> None:
         self._separators = separators or ["\n\n", "\n", " ", ""]
         self._is_separator_regex = is_separator_regex
+        # Регулярные выражения разделителей компилируются один раз, а не на каждом уровне рекурсии.
+        self._separator_patterns: List[Optional[Pattern[str]]] = [
+            re.compile(separator if is_separator_regex else re.escape(separator))
+            if separator
+            else None
+            for separator in self._separators
+        ]
         self._chunk_size = chunk_size
         self._chunk_overlap = chunk_overlap
         self._length_function = length_function
@@ -320,77 +488,97 @@ class RecursiveChunker:
         self._add_start_index = add_start_index
         self._strip_whitespace = strip_whitespace
 
-    def _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+    def _span_length(self, text: str, start: int, end: int) -> int:
+        """
+        Считает длину фрагмента текста, не копируя его для стандартной функции len.
+        """
+        if self._length_function is len:
+            return end - start
+        return self._length_function(text[start:end])
+
+    def _iter_merge(
+        self, text: str, splits: Iterable[Tuple[int, int, int]], separator: str
+    ) -> Iterator[Tuple[str, int]]:
         """
         Объединяет части текста с разделителем separator, учитывая ограничения на размер части.
 
         Args:
-            splits (Iterable[str]): Список частей текста.
+            text (str): Исходный текст.
+            splits (Iterable[Tuple[int, int, int]]): Границы и длины частей текста.
             separator (str): Разделитель для объединения частей.
 
-        Returns:
-            List[str]: Список объединенных частей текста.
+        Yields:
+            Tuple[str, int]: Объединенная часть текста и позиция ее начала в тексте.
         """
         separator_len = self._length_function(separator)
 
-        docs = []
-        current_doc: List[str] = []
+        # Окно текущего чанка. deque позволяет снимать части с начала окна за O(1).
+        current_doc: deque[Tuple[int, int, int]] = deque()
         total = 0
         for split in splits:
-            _len = self._length_function(split)
-            if (
-                total + _len + (separator_len if len(current_doc) > 0 else 0)
-                > self._chunk_size
-            ):
+            _len = split[2]
+            if total + _len + (separator_len if current_doc else 0) > self._chunk_size:
                 if total > self._chunk_size:
                     logger.warning(
                         f"Создан фрагмент размером {total}, "
                         f"который длиннее указанного {self._chunk_size}"
                     )
 
-                if len(current_doc) > 0:
-                    # Объединяем текущий документ и добавляем его в список объединенных документов.
-                    doc = self._join_docs(current_doc, separator)
+                if current_doc:
+                    # Объединяем текущий документ и отдаем его.
+                    doc = self._join_window(text, current_doc, separator)
                     if doc is not None:
-                        docs.append(doc)
+                        yield doc
 
                     # Удаляем из текущего документа части, которые не поместились в текущий чанк.
                     while total > self._chunk_overlap or (
-                        total + _len + (separator_len if len(current_doc) > 0 else 0)
+                        total + _len + (separator_len if current_doc else 0)
                         > self._chunk_size
                         and total > 0
                     ):
-                        total -= self._length_function(current_doc[0]) + (
-                            separator_len if len(current_doc) > 1 else 0
+                        total -= current_doc.popleft()[2] + (
+                            separator_len if current_doc else 0
                         )
-                        current_doc = current_doc[1:]
             current_doc.append(split)
             total += _len + (separator_len if len(current_doc) > 1 else 0)
 
         # Объединяем оставшиеся части текста в последний документ.
-        doc = self._join_docs(current_doc, separator)
+        doc = self._join_window(text, current_doc, separator)
         if doc is not None:
-            docs.append(doc)
-        return docs
+            yield doc
 
-    def _join_docs(self, docs: List[str], separator: str) -> Optional[str]:
+    def _join_window(
+        self, text: str, window: Sequence[Tuple[int, int, int]], separator: str
+    ) -> Optional[Tuple[str, int]]:
         """
-        Объединяет список частей текста в один текст с разделителем separator.
+        Объединяет окно частей текста в один текст с разделителем separator.
 
         Args:
-            docs (List[str]): Список частей текста.
+            text (str): Исходный текст.
+            window (Sequence[Tuple[int, int, int]]): Границы и длины частей текста.
             separator (str): Разделитель для объединения частей.
 
         Returns:
-            Optional[str]: Объединенный текст или None, если текст пуст.
+            Optional[Tuple[str, int]]: Объединенный текст и позиция его начала или None, если текст пуст.
         """
-        text = separator.join(docs)
+        if not window:
+            return None
+
+        start = window[0][0]
+        if separator:
+            doc = separator.join(text[s:e] for s, e, _ in window)
+        else:
+            # Без разделителя части окна идут в тексте подряд.
+            doc = text[start : window[-1][1]]
+
         if self._strip_whitespace:
-            text = text.strip()
-        if text == "":
+            stripped = doc.lstrip()
+            start += len(doc) - len(stripped)
+            doc = stripped.rstrip()
+        if doc == "":
             return None
         else:
-            return text
+            return doc, start
 
     def create_documents(
         self, texts: List[str], metadatas: Optional[List[dict]] = None
@@ -403,30 +591,44 @@ class RecursiveChunker:
             metadatas (Optional[List[dict]]): Список метаданных для каждого текста.
 
         Returns:
-            List[Document]: Список созданных документов.
+            List[Document]: Список созданных документов с независимыми копиями метаданных.
         """
-        # Инициализация метаданных для текстов, если они не заданы.
-        _metadatas = metadatas or [{}] * len(texts)
-        documents = []
+        return [
+            Document(
+                page_content=doc.page_content, metadata=copy.deepcopy(doc.metadata)
+            )
+            for doc in self.iter_documents(texts, metadatas)
+        ]
 
-        for i, text in enumerate(texts):
-            index = 0
-            previous_chunk_len = 0
+    def iter_documents(
+        self, texts: Iterable[str], metadatas: Optional[Iterable[dict]] = None
+    ) -> Iterator[Document]:
+        """
+        Лениво создает документы на основе текстов.
 
-            for chunk in self.split_text(text):
-                metadata = copy.deepcopy(_metadatas[i])
+        Метаданные не копируются: все чанки одного текста ссылаются на один и тот же
+        словарь (при add_start_index - на его поверхностную копию с start_index),
+        поэтому изменять их нельзя.
 
+        Args:
+            texts (Iterable[str]): Тексты для обработки.
+            metadatas (Optional[Iterable[dict]]): Метаданные для каждого текста.
+
+        Yields:
+            Document: Документ для очередной части текста.
+        """
+        _metadatas = metadatas or repeat({})
+
+        for text, metadata in zip(texts, _metadatas):
+            for chunk, start_index in self.iter_split(text):
                 if self._add_start_index:
-                    offset = index + previous_chunk_len - self._chunk_overlap
-                    # Находим индекс начала текущей части в исходном тексте.
-                    index = text.find(chunk, max(0, offset))
-                    metadata["start_index"] = index
-                    previous_chunk_len = len(chunk)
+                    chunk_metadata = {**metadata, "start_index": start_index}
+                else:
+                    chunk_metadata = metadata
 
-                # Создаем новый документ на основе части текста и метаданных.
-                new_doc = Document(page_content=chunk, metadata=metadata)
-                documents.append(new_doc)
-        return documents
+                yield Document.model_construct(
+                    page_content=chunk, metadata=chunk_metadata
+                )
 
     def split_documents(self, documents: Iterable[Document]) -> List[Any]:
         """
@@ -459,108 +661,117 @@ class RecursiveChunker:
         Returns:
             List[str]: Список частей текста.
         """
-        if separator:
-            if keep_separator:
-                splits = re.split(f"({separator})", text)
-                # Объединяем разделители с соответствующими частями текста.
-                splits = [splits[i] + splits[i + 1] for i in range(1, len(splits), 2)]
-                # Если количество разделителей нечетное, добавляем последний элемент.
-                if len(splits) % 2 == 0:
-                    splits += splits[-1:]
-                # Добавляем первоначальный элемент текста в начало списка.
-                splits = [splits[0]] + splits
-            else:
-                splits = re.split(separator, text)
-        else:
+        pattern = re.compile(separator) if separator else None
+        return [
+            text[start:end]
+            for start, end in RecursiveChunker._iter_spans(
+                text, 0, len(text), pattern, keep_separator
+            )
+        ]
+
+    @staticmethod
+    def _iter_spans(
+        text: str,
+        start: int,
+        end: int,
+        pattern: Optional[Pattern[str]],
+        keep_separator: bool,
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Перечисляет границы непустых частей фрагмента text[start:end],
+        разделенного регулярным выражением pattern, за один проход.
+
+        Args:
+            text (str): Исходный текст.
+            start (int): Начало фрагмента.
+            end (int): Конец фрагмента.
+            pattern (Optional[Pattern[str]]): Регулярное выражение разделителя или None для разбиения на символы.
+            keep_separator (bool): Флаг, указывающий, нужно ли сохранять разделители.
+
+        Yields:
+            Tuple[int, int]: Границы очередной части в исходном тексте.
+        """
+        if pattern is None:
             # Если разделитель не указан, разбиваем текст на символы.
-            splits = list(text)
-        # Удаляем пустые строки из списка.
-        return [s for s in splits if s != ""]
+            for i in range(start, end):
+                yield i, i + 1
+            return
+
+        position = start
+        for match in pattern.finditer(text, start, end):
+            if match.start() > position:
+                yield position, match.start()
+            # Сохраненный разделитель остается в начале следующей части.
+            position = match.start() if keep_separator else match.end()
+        if position < end:
+            yield position, end
 
     def transform_documents(self, documents: Sequence[Document]) -> Sequence[Document]:
         return self.split_documents(list(documents))
 
-    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+    def _iter_split(
+        self, text: str, start: int, end: int, level: int
+    ) -> Iterator[Tuple[str, int]]:
         """
-        Рекурсивно разбивает текст на части с учетом списка разделителей separators.
+        Рекурсивно разбивает фрагмент text[start:end] на части, начиная с разделителя с индексом level.
 
         Args:
             text (str): Исходный текст.
-            separators (List[str]): Список разделителей для разбиения текста.
+            start (int): Начало фрагмента.
+            end (int): Конец фрагмента.
+            level (int): Индекс первого разделителя в списке, который можно использовать.
 
-        Returns:
-            List[str]: Список частей текста.
+        Yields:
+            Tuple[str, int]: Часть текста и позиция ее начала в исходном тексте.
         """
-        # Инициализация пустого списка для хранения окончательных частей текста.
-        final_chunks = []
+        # По умолчанию используем последний разделитель и не рекурсируем дальше.
+        separator_index = len(self._separators) - 1
+        next_level = len(self._separators)
 
-        # Инициализация разделителя как последнего в списке.
-        current_separator = separators[-1]
-
-        # Инициализация списка разделителей.
-        remaining_separators = []
-
-        # Проверка каждого разделителя в списке.
-        for i, separator in enumerate(separators):
-            regex_separator = (
-                separator if self._is_separator_regex else re.escape(separator)
-            )
+        # Ищем первый разделитель, который встречается во фрагменте.
+        for i in range(level, len(self._separators)):
+            pattern = self._separator_patterns[i]
 
             # Если разделитель пустой, устанавливаем его и прерываем цикл.
-            if separator == "":
-                current_separator = separator
+            if pattern is None:
+                separator_index = i
                 break
 
-            # Если найден разделитель в тексте, устанавливаем его и запоминаем оставшиеся разделители.
-            if re.search(regex_separator, text):
-                current_separator = separator
-                remaining_separators = separators[i + 1 :]
+            if pattern.search(text, start, end):
+                separator_index = i
+                next_level = i + 1
                 break
 
-        # Применяем регулярное выражение к разделителю.
-        regex_separator = (
-            current_separator
-            if self._is_separator_regex
-            else re.escape(current_separator)
-        )
-
-        # Разделяем текст на части с помощью регулярного выражения.
-        splits = self._split_text_with_regex(
-            text, regex_separator, self._keep_separator
+        splits = (
+            (s, e, self._span_length(text, s, e))
+            for s, e in self._iter_spans(
+                text,
+                start,
+                end,
+                self._separator_patterns[separator_index],
+                self._keep_separator,
+            )
         )
 
-        # Создаем список для хранения "хороших" частей текста.
-        good_splits = []
-
         # Инициализация разделителя как пустой строки или исходного разделителя.
-        current_separator = "" if self._keep_separator else current_separator
+        current_separator = (
+            "" if self._keep_separator else self._separators[separator_index]
+        )
 
-        # Проходим по каждой части текста после разделения.
-        for split in splits:
-            # Если длина части меньше максимального размера части, добавляем её в "хорошие" части.
-            if self._length_function(split) < self._chunk_size:
-                good_splits.append(split)
-            else:
-                # Если часть больше максимального размера, объединяем "хорошие" части и добавляем в итоговый список.
-                if good_splits:
-                    merged_text = self._merge_splits(good_splits, current_separator)
-                    final_chunks.extend(merged_text)
-                    good_splits = []
-
-                # Если есть новые разделители, разбиваем текущую часть на еще более мелкие части.
-                if not remaining_separators:
-                    final_chunks.append(split)
+        # Подряд идущие части меньше максимального размера объединяются,
+        # а слишком большие разбиваются дальше следующими разделителями.
+        for is_good, group in groupby(
+            splits, key=lambda split: split[2] < self._chunk_size
+        ):
+            if is_good:
+                yield from self._iter_merge(text, group, current_separator)
+                continue
+
+            for s, e, _ in group:
+                if next_level >= len(self._separators):
+                    yield text[s:e], s
                 else:
-                    other_chunks = self._split_text(split, remaining_separators)
-                    final_chunks.extend(other_chunks)
-
-        # Добавляем "хорошие" части, если они остались после обработки.
-        if good_splits:
-            merged_text = self._merge_splits(good_splits, current_separator)
-            final_chunks.extend(merged_text)
-
-        # Возвращаем итоговый список частей текста.
-        return final_chunks
+                    yield from self._iter_split(text, s, e, next_level)
 
     def split_text(self, text: str) -> List[str]:
         """
@@ -572,4 +783,49 @@ class RecursiveChunker:
         Returns:
             List[str]: Список частей текста.
         """
-        return self._split_text(text, self._separators)
+        return [chunk for chunk, _ in self.iter_split(text)]
+
+    def iter_split(self, text: str) -> Iterator[Tuple[str, int]]:
+        """
+        Лениво разделяет текст на части с учетом установленных разделителей.
+
+        Позиции частей отслеживаются во время разбиения, поэтому дополнительная
+        память не зависит от длины текста.
+
+        Args:
+            text (str): Исходный текст.
+
+        Yields:
+            Tuple[str, int]: Часть текста и позиция ее начала в исходном тексте.
+        """
+        return self._iter_split(text, 0, len(text), 0)
+
+
+@lru_cache(maxsize=None)
+def _get_recursive_chunker(options: Tuple[Tuple[str, Any], ...]) -> RecursiveChunker:
+    return RecursiveChunker(**dict(options))
+
+
+def recursive_split_batch(
+    texts: List[str], options: Tuple[Tuple[str, Any], ...]
+) -> List[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Разбивает пачку текстов одним RecursiveChunker. Функция выполняется в том числе
+    в процессах пула, поэтому чанкер кэшируется по набору параметров, а ошибки
+    возвращаются вместе с результатом, не прерывая обработку пачки.
+
+    Args:
+        texts (List[str]): Тексты для разбиения.
+        options (Tuple[Tuple[str, Any], ...]): Параметры RecursiveChunker.
+
+    Returns:
+        List[Tuple[Optional[List[str]], Optional[str]]]: Части каждого текста или текст ошибки.
+    """
+    chunker = _get_recursive_chunker(options)
+    results = []
+    for text in texts:
+        try:
+            results.append((chunker.split_text(text), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
@@ -1,10 +1,12 @@
-from check_swear import SwearingCheck
+from typing import List
 
 
 def load_swear_model():
     """
     Загружает модель для проверки бранных слов.
     """
+    from check_swear import SwearingCheck
+
     sch = SwearingCheck(reg_pred=True)
     return sch
 
@@ -24,6 +26,23 @@ def has_swear(model, input_text: str) -> bool:
     return prediction[0] == 1
 
 
+def has_swear_batch(model, input_texts: List[str]) -> List[bool]:
+    """
+    Проверяет несколько текстов на бранные слова за один вызов модели.
+
+    Args:
+        model: Предварительно загруженная модель SwearingCheck.
+        input_texts (List[str]): Тексты для проверки.
+
+    Returns:
+        List[bool]: Признак бранных слов для каждого текста в исходном порядке.
+    """
+    if not input_texts:
+        return []
+
+    return [prediction == 1 for prediction in model.predict(input_texts)]
+
+
 # Example usage:
 if __name__ == "__main__":
     model = load_swear_model()
@@ -1,12 +1,43 @@
-from transformers import pipeline
-import torch
+import os
+from typing import List
+
+from ml.constants import TOXIC_WEIGHTS_FILE
 
 
 def load_toxic_model(model_path: str):
     """
     Загружает модель для классификации токсичных текстов.
     """
-    pipe = pipeline("text-classification", model=model_path, device="cpu")
+    # transformers и torch импортируются только при загрузке модели.
+    from transformers import pipeline
+
+    weights_path = os.path.join(model_path, TOXIC_WEIGHTS_FILE)
+    if not os.path.exists(weights_path):
+        return pipeline("text-classification", model=model_path, device="cpu")
+
+    # Веса из safetensors подставляются без копирования (assign=True), поэтому
+    # воркеры на одной машине делят страницы файла весов.
+    from transformers import (
+        AutoConfig,
+        AutoModelForSequenceClassification,
+        AutoTokenizer,
+    )
+
+    from ml.artifacts import load_weights
+
+    model = AutoModelForSequenceClassification.from_config(
+        AutoConfig.from_pretrained(model_path)
+    )
+    state_dict, _ = load_weights(weights_path)
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+
+    pipe = pipeline(
+        "text-classification",
+        model=model,
+        tokenizer=AutoTokenizer.from_pretrained(model_path),
+        device="cpu",
+    )
     return pipe
 
 
@@ -21,11 +52,34 @@ def is_toxic(pipe, input_text: str) -> bool:
     Returns:
         bool: True, если текст токсичен, False в противном случае.
     """
+    import torch
 
     with torch.no_grad():
         return True if pipe(input_text)[0]["label"] == "toxic" else False
 
 
+def is_toxic_batch(pipe, input_texts: List[str], batch_size: int = 32) -> List[bool]:
+    """
+    Определяет токсичность нескольких текстов за один вызов модели.
+
+    Args:
+        pipe: Предварительно загруженная модель классификации токсичности.
+        input_texts (List[str]): Тексты для классификации.
+        batch_size (int): Размер пачки, которую модель обрабатывает за один проход.
+
+    Returns:
+        List[bool]: Признак токсичности для каждого текста в исходном порядке.
+    """
+    if not input_texts:
+        return []
+
+    import torch
+
+    with torch.no_grad():
+        predictions = pipe(input_texts, batch_size=batch_size)
+    return [prediction["label"] == "toxic" for prediction in predictions]
+
+
 if __name__ == "__main__":
     model_path = "ml/preloaded_models/toxic-classifier"
     pipe = load_toxic_model(model_path)
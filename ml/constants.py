@@ -1,3 +1,5 @@
+import os
+
 SYSTEM_PROMPT = """
 Вы — виртуальный ассистент компании "Сила", предоставляющий профессиональную поддержку по вопросам управления безопасностью конфигураций ПО. Ваши ответы должны основываться исключительно на информации из базы знаний компании. В случаях, когда информации недостаточно, используйте сообщение: "Извините, на данный вопрос у меня нет информации."
 
@@ -19,3 +21,21 @@ USER_PROMPT = """
 """
 
 TOXIC_CLF_PATH = "ml/preloaded_models/toxic-classifier"
+
+# Веса классификатора в safetensors внутри TOXIC_CLF_PATH (python -m ml.artifacts convert).
+TOXIC_WEIGHTS_FILE = "model.safetensors"
+
+CLIP_MODEL_NAME = "ViT-B-32"
+
+CLIP_PRETRAINED = "laion2b_s34b_b79k"
+
+CLIP_WEIGHTS_PATH = f"ml/preloaded_models/clip/{CLIP_MODEL_NAME}.safetensors"
+
+# Параметры RecursiveChunker для индексации параграфов.
+CHUNKER_OPTIONS = (("chunk_size", 256), ("chunk_overlap", 32))
+
+# Количество процессов для параллельного разбиения на чанки.
+CHUNKING_WORKERS = os.cpu_count() or 1
+
+# Суммарный размер текста (в символах), начиная с которого разбиение уходит в пул процессов.
+PARALLEL_CHUNKING_MIN_CHARS = 200_000
@@ -0,0 +1,82 @@
+import math
+from typing import List, Sequence, Tuple
+
+from schemas.clickhouse import ChunkWithoutEmb
+
+# Грубая оценка длины в токенах YandexGPT: для русского текста токен в среднем
+# занимает 3-4 символа, берется нижняя граница, чтобы не превышать бюджет.
+CHARS_PER_TOKEN = 3
+
+CONTEXT_SEPARATOR = "\n...\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _cost(text: str, spans: List[Tuple[int, int]], extra: List[str]) -> int:
+    pieces = [text[start:end] for start, end in spans] + extra
+    separators = max(len(pieces) - 1, 0)
+    return sum(map(estimate_tokens, pieces)) + separators * estimate_tokens(
+        CONTEXT_SEPARATOR
+    )
+
+
+def assemble_context(
+    text: str, chunks: Sequence[ChunkWithoutEmb], token_budget: int
+) -> str:
+    """
+    Собирает контекст для промпта из наиболее близких к вопросу чанков параграфа.
+
+    Чанки берутся по убыванию близости, пока укладываются в token_budget. Найденные
+    в тексте параграфа чанки превращаются в отрезки текста, пересекающиеся отрезки
+    (перекрытие чанков) сливаются, поэтому текст не повторяется, а части идут в
+    порядке параграфа. Если параграф целиком укладывается в бюджет, он
+    возвращается без изменений.
+
+    Параметры:
+    - text (str): Текст параграфа.
+    - chunks (Sequence[ChunkWithoutEmb]): Чанки параграфа с близостью к вопросу.
+    - token_budget (int): Бюджет контекста в токенах; 0 - без ограничения.
+
+    Возвращает:
+    - str: Текст контекста.
+    """
+    if token_budget <= 0 or estimate_tokens(text) <= token_budget:
+        return text
+
+    spans: List[Tuple[int, int]] = []
+    # Чанки, которых нет в тексте дословно (части, склеенные разделителем).
+    extra: List[str] = []
+
+    for chunk in sorted(chunks, key=lambda chunk: chunk.cos_dist, reverse=True):
+        start = text.find(chunk.text)
+        if start >= 0:
+            candidate_spans = _merge_spans(spans + [(start, start + len(chunk.text))])
+            candidate_extra = extra
+        elif any(chunk.text in piece for piece in extra) or any(
+            chunk.text in text[s:e] for s, e in spans
+        ):
+            continue
+        else:
+            candidate_spans = spans
+            candidate_extra = extra + [chunk.text]
+
+        if _cost(text, candidate_spans, candidate_extra) <= token_budget:
+            spans, extra = candidate_spans, candidate_extra
+
+    if not spans and not extra:
+        return text[: token_budget * CHARS_PER_TOKEN]
+
+    pieces = [text[start:end].strip() for start, end in spans] + extra
+    return CONTEXT_SEPARATOR.join(pieces)
@@ -0,0 +1,293 @@
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from ml.models import ChunkBatch
+from utils.types import DedupMode
+
+# Шинглы текста - подстроки из SHINGLE_SIZE символов нормализованного текста.
+SHINGLE_SIZE = 5
+
+# Сигнатура MinHash из MINHASH_PERMUTATIONS минимумов, разбитая для LSH на
+# MINHASH_BANDS полос: тексты - кандидаты в дубликаты, если совпала хотя бы одна
+# полоса. При 32 полосах по 4 значения кандидатами становятся почти все пары со
+# сходством от 0.6, а порог проверяется уже по всей сигнатуре.
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+
+# Размер блока строк при попарном сравнении эмбеддингов.
+SIMILARITY_BLOCK = 1024
+
+_SHINGLE_BASE = np.uint64(1_000_003)
+_LOW_BITS = np.uint64(0xFFFFFFFF)
+
+
+class DedupReport(NamedTuple):
+    """
+    Результат дедупликации пачки чанков.
+
+    - chunks (int): Чанков до дедупликации.
+    - unique (int): Чанков после дедупликации.
+    - exact (int): Удалено точных дубликатов.
+    - near (int): Удалено почти одинаковых чанков.
+    - mapped_paragraphs (int): Записей в duplicate_paragraph_ids.
+    - dim (int): Размерность эмбеддингов.
+    """
+
+    chunks: int
+    unique: int
+    exact: int
+    near: int
+    mapped_paragraphs: int
+    dim: int
+
+    @property
+    def removed(self) -> int:
+        return self.chunks - self.unique
+
+    @property
+    def ratio(self) -> float:
+        return self.removed / self.chunks if self.chunks else 0.0
+
+    @property
+    def saved_bytes(self) -> int:
+        # Не сохраненные эмбеддинги float32; тексты и хэши чанков не учитываются.
+        return self.removed * self.dim * 4
+
+
+class _DisjointSets:
+    """
+    Система непересекающихся множеств строк пачки. Корень множества - его
+    наименьшая строка, поэтому в пачке остается первое вхождение чанка.
+    """
+
+    def __init__(self, n: int):
+        self._parent = list(range(n))
+
+    def find(self, row: int) -> int:
+        parent = self._parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self._parent[max(a, b)] = min(a, b)
+
+    def roots(self) -> np.ndarray:
+        return np.fromiter(
+            (self.find(row) for row in range(len(self._parent))),
+            dtype=np.int64,
+            count=len(self._parent),
+        )
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    Считает 32-битные хэши шинглов нормализованного текста. Текст короче size
+    символов дает один шингл.
+
+    Возвращает:
+    - np.ndarray: Уникальные хэши шинглов (dtype uint64).
+    """
+    codes = np.frombuffer(normalize_text(text).encode("utf-32-le"), dtype="<u4")
+    codes = codes.astype(np.uint64)
+    size = max(min(size, len(codes)), 1)
+    count = max(len(codes) - size + 1, 1)
+
+    # Полиномиальный хэш всех окон сразу; переполнение uint64 - часть хэша.
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(min(size, len(codes))):
+        hashes = hashes * _SHINGLE_BASE + codes[offset : offset + count]
+    return np.unique((hashes >> np.uint64(32)) ^ (hashes & _LOW_BITS))
+
+
+def minhash_signatures(
+    texts: List[str], permutations: int = MINHASH_PERMUTATIONS, seed: int = 0
+) -> np.ndarray:
+    """
+    Считает сигнатуры MinHash текстов: для каждой хэш-функции минимум по шинглам
+    текста. Хэш-функции - multiply-shift: старшие 32 бита (a * x + b) mod 2^64,
+    без дорогого деления. Доля совпадающих значений двух сигнатур - оценка
+    сходства Жаккара множеств шинглов.
+
+    Возвращает:
+    - np.ndarray: Сигнатуры формы (n, permutations) в uint32.
+    """
+    rng = np.random.default_rng(seed)
+    max_value = np.iinfo(np.uint64).max
+    a = rng.integers(0, max_value, permutations, dtype=np.uint64, endpoint=True)
+    a = (a | np.uint64(1))[:, None]
+    b = rng.integers(0, max_value, permutations, dtype=np.uint64, endpoint=True)
+    b = b[:, None]
+
+    signatures = np.empty((len(texts), permutations), dtype=np.uint32)
+    for i, text in enumerate(texts):
+        hashes = (a * shingle_hashes(text) + b) >> np.uint64(32)
+        signatures[i] = hashes.min(axis=1)
+    return signatures
+
+
+def _union_exact(batch: ChunkBatch, sets: _DisjointSets):
+    # Тексты сравниваются после нормализации пробелов и регистра, изображения - по
+    # хэшу содержимого файла.
+    first = {}
+    for row in range(len(batch)):
+        if batch.images[row]:
+            binary = batch.binaries[row]
+            if binary is None:
+                continue
+            key = (True, hashlib.sha1(binary.getvalue()).digest())
+        else:
+            key = (False, normalize_text(batch.texts[row]))
+        sets.union(first.setdefault(key, row), row)
+
+
+def _union_minhash(batch: ChunkBatch, sets: _DisjointSets, threshold: float):
+    # Точные дубликаты уже объединены, сравниваются только их представители.
+    # Чанк присоединяется к первому похожему на него оставшемуся чанку, а не к
+    # любому члену группы, поэтому группы не растут цепочкой A ~ B ~ C.
+    rows = [row for row in np.flatnonzero(~batch.images) if sets.find(row) == row]
+    if len(rows) < 2:
+        return
+
+    signatures = minhash_signatures([batch.texts[row] for row in rows])
+    band_size = signatures.shape[1] // MINHASH_BANDS
+    # Корзины LSH содержат только оставшиеся чанки.
+    buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(MINHASH_BANDS)]
+    for i in range(len(rows)):
+        keys = [
+            signatures[i, band * band_size : (band + 1) * band_size].tobytes()
+            for band in range(MINHASH_BANDS)
+        ]
+        compared = set()
+        owner = None
+        for band, key in enumerate(keys):
+            for j in buckets[band].get(key, ()):
+                if j in compared:
+                    continue
+                compared.add(j)
+                if np.mean(signatures[i] == signatures[j]) >= threshold:
+                    owner = j
+                    break
+            if owner is not None:
+                break
+
+        if owner is not None:
+            sets.union(rows[owner], rows[i])
+            continue
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(i)
+
+
+def _union_embeddings(batch: ChunkBatch, sets: _DisjointSets, threshold: float):
+    # Сравниваются только чанки одного вида: текст с текстом, изображение с
+    # изображением. Как и в _union_minhash, чанк присоединяется к первому похожему
+    # оставшемуся чанку.
+    rows = np.array(
+        [row for row in range(len(batch)) if sets.find(row) == row], dtype=np.int64
+    )
+    if len(rows) < 2:
+        return
+
+    embeddings = batch.embeddings[rows]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    embeddings = embeddings / norms
+    images = batch.images[rows]
+    kept = np.ones(len(rows), dtype=bool)
+
+    for start in range(0, len(rows), SIMILARITY_BLOCK):
+        similarity = embeddings[start : start + SIMILARITY_BLOCK] @ embeddings.T
+        left, right = np.nonzero(similarity >= threshold)
+        left += start
+        pairs = (right < left) & (images[left] == images[right])
+        left, right = left[pairs], right[pairs]
+        # Пары упорядочены по left, а внутри - по right: первый оставшийся right
+        # и есть первый похожий чанк.
+        bounds = np.flatnonzero(np.diff(left)) + 1
+        for lefts, rights in zip(np.split(left, bounds), np.split(right, bounds)):
+            if not len(lefts):
+                continue
+            owners = rights[kept[rights]]
+            if len(owners):
+                kept[lefts[0]] = False
+                sets.union(rows[owners[0]], rows[lefts[0]])
+
+
+def deduplicate(
+    batch: ChunkBatch, mode: DedupMode, threshold: float = 0.0
+) -> Tuple[ChunkBatch, DedupReport]:
+    """
+    Удаляет из пачки точные и почти одинаковые чанки. Из группы дубликатов
+    остается первый чанк, а параграфы остальных записываются в его
+    duplicate_paragraph_ids, чтобы чанк находился и из этих параграфов. Каждый
+    удаленный чанк похож на оставшийся не меньше порога.
+
+    Режимы exact и minhash сравнивают тексты и не требуют эмбеддингов, поэтому их
+    стоит применять до генерации эмбеддингов; режим embedding сравнивает
+    эмбеддинги чанков и применяется после нее.
+
+    Параметры:
+    - batch (ChunkBatch): Пачка чанков одного документа.
+    - mode (DedupMode): Режим дедупликации; точные дубликаты удаляются в любом
+      режиме, кроме off.
+    - threshold (float): Порог сходства Жаккара (minhash) или косинусной
+      близости (embedding).
+
+    Возвращает:
+    - Tuple[ChunkBatch, DedupReport]: Пачка без дубликатов и отчет.
+    """
+    n = len(batch)
+    dim = batch.embeddings.shape[1]
+    if mode == DedupMode.OFF or not n:
+        return batch, DedupReport(n, n, 0, 0, 0, dim)
+
+    sets = _DisjointSets(n)
+    _union_exact(batch, sets)
+    exact_unique = int(np.count_nonzero(sets.roots() == np.arange(n)))
+
+    if mode == DedupMode.MINHASH:
+        _union_minhash(batch, sets, threshold)
+    elif mode == DedupMode.EMBEDDING:
+        _union_embeddings(batch, sets, threshold)
+
+    roots = sets.roots()
+    keep = np.flatnonzero(roots == np.arange(n))
+    duplicates = np.flatnonzero(roots != np.arange(n))
+
+    # Пары (оставшийся чанк, параграф дубликата) без повторов и без параграфа
+    # самого чанка (дубликаты из перекрытия чанков одного параграфа).
+    owners = roots[duplicates]
+    paragraph_ids = batch.paragraph_ids[duplicates]
+    foreign = paragraph_ids != batch.paragraph_ids[owners]
+    owners, paragraph_ids = owners[foreign], paragraph_ids[foreign]
+    order = np.lexsort((paragraph_ids, owners))
+    owners, paragraph_ids = owners[order], paragraph_ids[order]
+    distinct = np.ones(len(owners), dtype=bool)
+    distinct[1:] = (owners[1:] != owners[:-1]) | (
+        paragraph_ids[1:] != paragraph_ids[:-1]
+    )
+    owners, paragraph_ids = owners[distinct], paragraph_ids[distinct]
+
+    result = batch.take(keep)
+    counts = np.bincount(np.searchsorted(keep, owners), minlength=len(keep))
+    result.duplicate_paragraph_ids = paragraph_ids
+    result.duplicate_offsets = np.cumsum(counts).astype(np.uint64)
+
+    return result, DedupReport(
+        chunks=n,
+        unique=len(keep),
+        exact=n - exact_unique,
+        near=exact_unique - len(keep),
+        mapped_paragraphs=len(paragraph_ids),
+        dim=dim,
+    )
@@ -1,4 +1,5 @@
-from typing import List
+import os
+from typing import List, Optional
 import torch
 from PIL import Image
 from loguru import logger
@@ -11,7 +12,10 @@ class EmbeddingGenerator:
     """
 
     def __init__(
-        self, model_name: str = "ViT-B-32", pretrained: str = "laion2b_s34b_b79k"
+        self,
+        model_name: str = "ViT-B-32",
+        pretrained: str = "laion2b_s34b_b79k",
+        weights_path: Optional[str] = None,
     ):
         """
         Инициализирует модель OpenCLIP для последующего использования.
@@ -19,20 +23,51 @@ class EmbeddingGenerator:
         Параметры:
         - model_name (str): Название архитектуры модели.с
         - pretrained (str): Название предобученной модели.
+        - weights_path (Optional[str]): Веса модели в safetensors (python -m ml.artifacts
+          convert). Если файл есть, веса отображаются в память из него, иначе
+          загружаются из кэша open_clip.
         """
         try:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-                model_name, pretrained=pretrained, device=self.device
-            )
+            if weights_path and os.path.exists(weights_path):
+                self.model, self.preprocess = self._load_safetensors(
+                    model_name, pretrained, weights_path
+                )
+                source = weights_path
+            else:
+                self.model, _, self.preprocess = open_clip.create_model_and_transforms(
+                    model_name, pretrained=pretrained, device=self.device
+                )
+                source = pretrained
             self.tokenizer = open_clip.get_tokenizer(model_name)
-            logger.info(
-                f"Модель OpenCLIP {model_name} ({pretrained}) успешно загружена."
-            )
+            logger.info(f"Модель OpenCLIP {model_name} ({source}) успешно загружена.")
         except Exception as e:
             logger.error(f"Не удалось загрузить модель OpenCLIP: {e}")
             raise RuntimeError(f"Failed to load OpenCLIP model: {e}")
 
+    def _load_safetensors(self, model_name: str, pretrained: str, weights_path: str):
+        """
+        Создает модель без предобученных весов и подставляет в нее тензоры,
+        отображенные из файла: assign=True не копирует веса в память процесса.
+        Параметры препроцессинга берутся из конфигурации предобученной модели.
+        """
+        from ml.artifacts import load_weights
+
+        cfg = open_clip.get_pretrained_cfg(model_name, pretrained)
+        model, _, preprocess = open_clip.create_model_and_transforms(
+            model_name,
+            pretrained=None,
+            force_quick_gelu=cfg.get("quick_gelu", False),
+            image_mean=cfg.get("mean"),
+            image_std=cfg.get("std"),
+            image_interpolation=cfg.get("interpolation"),
+            image_resize_mode=cfg.get("resize_mode"),
+        )
+        state_dict, _ = load_weights(weights_path)
+        model.load_state_dict(state_dict, assign=True)
+
+        return model.to(self.device), preprocess
+
     def get_text_embedding(self, texts: List[str]) -> torch.Tensor:
         """
         Преобразует список текстов в эмбеддинги с помощью модели OpenCLIP.
@@ -1,20 +1,36 @@
-from typing import List
-from docx import Document
-
-from ml.documents import Document as Doc
-from PIL import Image
+import math
+from contextlib import contextmanager
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
 from io import BytesIO
 import zipfile
 from loguru import logger
-from ml.embedders import EmbeddingGenerator
-from ml.models import Paragraph, Chunk
+from ml.dedup import deduplicate
+from ml.lifespan import get_embedding_generator
+from ml.models import DEFAULT_COLLECTION, Paragraph, ChunkBatch
 from repositories.clickhouse import ClickhouseRepository
-from ml.chunkers import RecursiveChunker
-from schemas.clickhouse import CreateChunkOpts, CreateParagraphOpts
+from ml.chunkers import recursive_split_batch
+from ml.constants import (
+    CHUNKER_OPTIONS,
+    CHUNKING_WORKERS,
+    PARALLEL_CHUNKING_MIN_CHARS,
+)
+from schemas.clickhouse import CreateParagraphOpts
 import os
 
 from services.minio import MinioService
-from utils.types import MinioContentType
+from configs.Indexing import dedup_mode, embedding_threshold, minhash_threshold
+from configs.Profiling import memory_frames, memory_profiling, memory_top
+from utils.memory import track_memory
+from utils.metrics import INDEXING_DEDUP_RATIO, INDEXING_DUPLICATE_CHUNKS, stage
+from utils.types import DedupMode, MinioContentType
+
+if TYPE_CHECKING:
+    from ml.embedders import EmbeddingGenerator
 
 
 def extract_images_to_memory(docx_path: str) -> List[BytesIO]:
@@ -35,7 +51,10 @@ def extract_images_to_memory(docx_path: str) -> List[BytesIO]:
 
 
 def parse_docx(
-    repo: ClickhouseRepository, static_storage: MinioService, docx_path: str
+    repo: ClickhouseRepository,
+    static_storage: MinioService,
+    docx_path: str,
+    collection: str = DEFAULT_COLLECTION,
 ) -> List[Paragraph]:
     """
     Парсит документ .docx и извлекает параграфы, а также сохраняет их в ClickhouseRepository.
@@ -43,10 +62,13 @@ def parse_docx(
     Параметры:
     - repo (ClickhouseRepository): Репозиторий для сохранения объектов Paragraph.
     - docx_path (str): Путь к файлу .docx.
+    - collection (str): Коллекция документов, в которую сохраняются параграфы.
 
     Возвращает:
     - List[Paragraph]: Список объектов Paragraph.
     """
+    from docx import Document
+
     document = Document(docx_path)
     paragraphs = []
     current_section_num = 0
@@ -100,7 +122,7 @@ def parse_docx(
     for paragraph in paragraphs:
         for index, image in enumerate(paragraph.image_binaries):
             path = static_storage.create_object_from_byte(
-                object_path=f"images/{paragraph.id}/{index}",
+                object_path=f"images/{collection}/{paragraph.id}/{index}",
                 file=image,
                 content_type=MinioContentType.PNG,
             )
@@ -117,164 +139,277 @@ def parse_docx(
                     f"Image_{i+1}": image
                     for i, image in enumerate(paragraph.image_paths)
                 },
+                collection=collection,
             )
         )
 
     return paragraphs
 
 
-def append_to_clickhouse(repo: ClickhouseRepository, chunks: List[Chunk]):
+def append_to_clickhouse(repo: ClickhouseRepository, chunks: ChunkBatch):
     """
-    Сохраняет данные в ClickHouse.
+    Сохраняет данные в ClickHouse одной пачкой вместе с центроидами параграфов
+    для иерархического поиска.
 
     Параметры:
-    - chunks (List[Chunk]): Список чанков для сохранения.
+    - chunks (ChunkBatch): Пачка чанков для сохранения.
     """
-    # Мокированная функция - требуется реализация пользователем
     logger.info("Сохранение данных в ClickHouse.")
 
-    for chunk in chunks:
-        repo.create_chunk(
-            CreateChunkOpts(
-                id=chunk.id,
-                emb=chunk.emb,
-                text=chunk.text,
-                paragraph_id=chunk.paragraph_uuid,
-            )
+    # Если обучена проекция PCA, emb_reduced пишется сразу при вставке.
+    repo.create_chunks(chunks, repo.get_latest_projection())
+
+    paragraph_ids, centroids = chunks.paragraph_centroids()
+    repo.create_paragraph_centroids(paragraph_ids, centroids, chunks.collection)
+
+
+_chunking_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_chunking_pool() -> ProcessPoolExecutor:
+    """
+    Возвращает пул процессов для разбиения на чанки, создавая его при первом обращении.
+    Процессы запускаются через spawn, чтобы не наследовать потоки torch и веб-сервера.
+    """
+    global _chunking_pool
+    if _chunking_pool is None:
+        _chunking_pool = ProcessPoolExecutor(
+            max_workers=CHUNKING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _chunking_pool
+
+
+def shutdown_chunking_pool():
+    """
+    Останавливает пул процессов для разбиения на чанки, если он был создан.
+    """
+    global _chunking_pool
+    if _chunking_pool is not None:
+        _chunking_pool.shutdown()
+        _chunking_pool = None
+
+
+def split_paragraph_texts(
+    texts: List[str], parallel: Optional[bool] = None
+) -> List[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Разбивает тексты параграфов на чанки, при необходимости в пуле процессов.
+
+    Параметры:
+    - texts (List[str]): Тексты параграфов.
+    - parallel (Optional[bool]): Режим разбиения. None - выбрать по суммарному размеру текста.
+
+    Возвращает:
+    - List[Tuple[Optional[List[str]], Optional[str]]]: Чанки каждого текста (в исходном порядке) или текст ошибки.
+    """
+    if parallel is None:
+        parallel = (
+            CHUNKING_WORKERS > 1 and sum(map(len, texts)) >= PARALLEL_CHUNKING_MIN_CHARS
         )
 
+    if not parallel or not texts:
+        return recursive_split_batch(texts, CHUNKER_OPTIONS)
 
-def chunk_paragraphs(paragraphs: List[Paragraph]) -> List[Chunk]:
+    # Непрерывные пачки по несколько на процесс: соседние параграфы одного документа
+    # попадают в одну пачку, а map возвращает результаты в порядке пачек.
+    batch_size = math.ceil(len(texts) / (CHUNKING_WORKERS * 4))
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = get_chunking_pool().map(
+        partial(recursive_split_batch, options=CHUNKER_OPTIONS), batches
+    )
+    return [result for batch in results for result in batch]
+
+
+def chunk_paragraphs(
+    paragraphs: List[Paragraph],
+    parallel: Optional[bool] = None,
+    collection: str = DEFAULT_COLLECTION,
+) -> ChunkBatch:
     """
-    Разбивает параграфы на чанки с помощью RecursiveChunker и добавляет UUID параграфа в метаданные.
+    Разбивает параграфы на чанки с помощью RecursiveChunker и привязывает их к UUID параграфа.
 
     Параметры:
     - paragraphs (List[Paragraph]): Список параграфов для обработки.
+    - parallel (Optional[bool]): Разбивать ли параграфы в пуле процессов.
+      По умолчанию пул используется только для больших документов.
+    - collection (str): Коллекция документов, к которой относятся чанки.
 
     Возвращает:
-    - List[Chunk]: Список созданных чанков.
+    - ChunkBatch: Пачка созданных чанков.
     """
     if not paragraphs:
         logger.error("Список параграфов пуст.")
         raise ValueError("Список параграфов пуст.")
 
-    chunks = []
-
-    # Инициализируем RecursiveChunker
-    try:
-        recursive_splitter = RecursiveChunker(chunk_overlap=32, chunk_size=256)
-        logger.info("RecursiveChunker успешно инициализирован.")
-    except Exception as e:
-        logger.error(f"Ошибка при инициализации RecursiveChunker: {e}")
-        raise RuntimeError(f"Не удалось инициализировать RecursiveChunker: {e}")
+    texts = []
+    paragraph_ids = []
+    images = []
+    binaries = []
 
+    non_empty = []
     for paragraph in paragraphs:
         if not paragraph.text:
             logger.warning(f"Параграф с UUID {paragraph.id} не содержит текста.")
             continue
+        non_empty.append(paragraph)
 
-        # Создаем документ для параграфа
-        doc = Doc(
-            page_content=paragraph.text,
-            metadata={
-                "paragraph_uuid": str(paragraph.id),
-                "name_paragraph": paragraph.name,
-                "num_paragraph": paragraph.num,
-            },
+    # Разбиваем тексты параграфов на чанки
+    try:
+        split_results = split_paragraph_texts(
+            [paragraph.text for paragraph in non_empty], parallel
         )
+    except Exception as e:
+        logger.error(f"Ошибка при разбиении параграфов на чанки: {e}")
+        raise RuntimeError(f"Не удалось разбить параграфы на чанки: {e}")
 
-        # Разбиваем документ на чанки
-        try:
-            paragraph_chunks = recursive_splitter.split_documents([doc])
-            logger.debug(
-                f"Параграф {paragraph.id} разбит на {len(paragraph_chunks)} чанков."
+    for paragraph, (paragraph_texts, error) in zip(non_empty, split_results):
+        if error is not None:
+            logger.error(
+                f"Ошибка при разбиении параграфа {paragraph.id} на чанки: {error}"
             )
-        except Exception as e:
-            logger.error(f"Ошибка при разбиении параграфа {paragraph.id} на чанки: {e}")
             continue
 
-        # Создаем объекты Chunk из полученных чанков
-        for chunk_doc in paragraph_chunks:
-            chunk = Chunk(text=chunk_doc.page_content, paragraph_uuid=paragraph.id)
-            chunks.append(chunk)
+        logger.debug(
+            f"Параграф {paragraph.id} разбит на {len(paragraph_texts)} чанков."
+        )
+
+        texts.extend(paragraph_texts)
+        paragraph_ids.extend([paragraph.id.bytes] * len(paragraph_texts))
+        images.extend([False] * len(paragraph_texts))
+        binaries.extend([None] * len(paragraph_texts))
 
         logger.debug(f"Создан текстовый чанк для параграфа {paragraph.id}")
 
         # Обрабатываем изображения в параграфе
-        for idx, image_bin in enumerate(paragraph.image_binaries):
-            chunk = Chunk(image=True, binary=image_bin, paragraph_uuid=paragraph.id)
-
-            chunks.append(chunk)
+        for image_bin in paragraph.image_binaries:
+            texts.append("image")
+            paragraph_ids.append(paragraph.id.bytes)
+            images.append(True)
+            binaries.append(image_bin)
 
         logger.debug(f"Создан визуальный чанк для параграфа {paragraph.id}")
 
-    if not chunks:
+    if not texts:
         logger.error("Не удалось создать чанки из предоставленных параграфов.")
         raise RuntimeError("Чанки не были созданы из параграфов.")
 
-    logger.info(f"Всего создано {len(chunks)} чанков из параграфов.")
-    return chunks
+    logger.info(f"Всего создано {len(texts)} чанков из параграфов.")
+    return ChunkBatch(
+        texts=texts,
+        paragraph_ids=np.array(paragraph_ids, dtype="S16"),
+        images=np.array(images, dtype=bool),
+        binaries=binaries,
+        collection=collection,
+    )
 
 
 def generate_embeddings_for_chunks(
-    chunks: List[Chunk], embedding_generator: EmbeddingGenerator
+    chunks: ChunkBatch, embedding_generator: "EmbeddingGenerator"
 ) -> None:
     """
-    Генерирует эмбеддинги для каждого чанка (текст или изображение) и сохраняет их в объекте Chunk.
+    Генерирует эмбеддинги для каждого чанка (текст или изображение) и записывает их
+    в матрицу эмбеддингов пачки.
 
     Параметры:
-    - chunks (List[Chunk]): Список чанков.
+    - chunks (ChunkBatch): Пачка чанков.
     - embedding_generator (EmbeddingGenerator): Экземпляр класса для генерации эмбеддингов.
     """
-    if not chunks:
+    if not len(chunks):
         logger.error("Список чанков пуст.")
         raise ValueError("Chunk list is empty.")
 
-    text_chunks = []
-    image_chunks = []
-    for chunk in chunks:
-        if chunk.image:
-            image_chunks.append(chunk)
-        else:
-            text_chunks.append(chunk)
+    text_rows = np.flatnonzero(~chunks.images)
+    image_rows = np.flatnonzero(chunks.images)
 
     # Генерируем эмбеддинги для текстовых чанков
-    if text_chunks:
-        texts = [chunk.text for chunk in text_chunks]
+    if len(text_rows):
+        texts = [chunks.texts[row] for row in text_rows]
         try:
             embeddings = embedding_generator.get_text_embedding(texts)
-            for idx, chunk in enumerate(text_chunks):
-                chunk.emb = embeddings[idx].tolist()
+            chunks.embeddings[text_rows] = embeddings.numpy()
             logger.info(
-                f"Эмбеддинги для {len(text_chunks)} текстовых чанков сгенерированы."
+                f"Эмбеддинги для {len(text_rows)} текстовых чанков сгенерированы."
             )
         except Exception as e:
             logger.error(f"Ошибка при генерации эмбеддингов текстовых чанков: {e}")
             raise
 
     # Генерируем эмбеддинги для чанков изображений
-    if image_chunks:
-        for idx, chunk in enumerate(image_chunks):
-            image = Image.open(chunk.binary)
+    if len(image_rows):
+        from PIL import Image
+
+        for row in image_rows:
+            image = Image.open(chunks.binaries[row])
             embeddings = embedding_generator.get_image_embedding([image])
-            embeddings = embeddings.squeeze().tolist()
 
-            chunk.emb = embeddings
-            chunk.text = "image"
+            chunks.embeddings[row] = embeddings[0].numpy()
 
         logger.info(
-            f"Эмбеддинги для {len(image_chunks)} визуальных чанков сгенерированы."
+            f"Эмбеддинги для {len(image_rows)} визуальных чанков сгенерированы."
         )
 
 
+def deduplicate_chunks(chunks: ChunkBatch, mode: DedupMode) -> ChunkBatch:
+    """
+    Удаляет из пачки точные и почти одинаковые чанки (ml.dedup) и сообщает, насколько
+    уменьшился индекс.
+
+    Параметры:
+    - chunks (ChunkBatch): Пачка чанков документа.
+    - mode (DedupMode): Режим дедупликации.
+
+    Возвращает:
+    - ChunkBatch: Пачка без дубликатов.
+    """
+    threshold = (
+        embedding_threshold if mode == DedupMode.EMBEDDING else minhash_threshold
+    )
+    chunks, report = deduplicate(chunks, mode, threshold)
+
+    INDEXING_DUPLICATE_CHUNKS.inc(report.exact, kind="exact")
+    INDEXING_DUPLICATE_CHUNKS.inc(report.near, kind="near")
+    INDEXING_DEDUP_RATIO.set(report.ratio)
+    logger.info(
+        f"Дедупликация чанков ({mode.value}): {report.chunks} -> {report.unique} "
+        f"(-{report.ratio:.1%}), точных дубликатов {report.exact}, почти одинаковых "
+        f"{report.near}, привязок к параграфам {report.mapped_paragraphs}, "
+        f"эмбеддингов не сохранено на {report.saved_bytes / (1024 * 1024):.1f} MiB."
+    )
+    return chunks
+
+
+@contextmanager
+def indexing_stage(name: str, collect: bool = False):
+    """
+    Стадия индексации: время в метриках и Server-Timing, а при MEMORY_PROFILING
+    также память стадии (tracemalloc, пиковый RSS, места аллокаций).
+
+    Параметры:
+    - name (str): Название стадии.
+    - collect (bool): Собрать мусор перед итоговым снимком памяти.
+    """
+    with (
+        stage("indexing", name),
+        track_memory(
+            "indexing", name, memory_profiling, memory_top, memory_frames, collect
+        ),
+    ):
+        yield
+
+
 def docs2clickhouse(
-    repo: ClickhouseRepository, static_storage: MinioService, docx_path: str
+    repo: ClickhouseRepository,
+    static_storage: MinioService,
+    docx_path: str,
+    collection: str = DEFAULT_COLLECTION,
 ):
     """
     Основная функция для обработки документа .docx и сохранения данных в ClickHouse.
 
     Параметры:
     - docx_path (str): Путь к файлу .docx.
+    - collection (str): Коллекция документов, в которую индексируется файл.
     """
     if not os.path.exists(docx_path):
         logger.error(f"Файл документа '{docx_path}' не найден.")
@@ -282,7 +417,8 @@ def docs2clickhouse(
 
     # Шаг 1: Парсинг документа
     try:
-        paragraphs = parse_docx(repo, static_storage, docx_path)
+        with indexing_stage("parse"):
+            paragraphs = parse_docx(repo, static_storage, docx_path, collection)
         logger.info(
             f"Парсинг документа завершен. Найдено {len(paragraphs)} параграфов."
         )
@@ -296,7 +432,8 @@ def docs2clickhouse(
 
     # Шаг 2: Разбиваем параграфы на чанки и добавляем UUID параграфа в метаданные
     try:
-        chunks = chunk_paragraphs(paragraphs)
+        with indexing_stage("chunking"):
+            chunks = chunk_paragraphs(paragraphs, collection=collection)
         logger.info(
             f"Разбиение параграфов на чанки завершено. Всего чанков: {len(chunks)}."
         )
@@ -304,17 +441,31 @@ def docs2clickhouse(
         logger.error(f"Ошибка при разбиении параграфов на чанки: {e}")
         raise RuntimeError(f"Error chunking paragraphs: {e}")
 
+    # Дубликаты по тексту удаляются до генерации эмбеддингов: для них модель не
+    # вызывается.
+    if dedup_mode in (DedupMode.EXACT, DedupMode.MINHASH):
+        with indexing_stage("dedup"):
+            chunks = deduplicate_chunks(chunks, dedup_mode)
+
     # Шаг 3: Генерируем эмбеддинги для чанков (как текстовых, так и изображений)
     try:
-        embedding_generator = EmbeddingGenerator()
-        generate_embeddings_for_chunks(chunks, embedding_generator)
+        with indexing_stage("model_load"):
+            embedding_generator = get_embedding_generator()
+        with indexing_stage("embeddings"):
+            generate_embeddings_for_chunks(chunks, embedding_generator)
         logger.info("Генерация эмбеддингов для всех чанков завершена.")
     except Exception as e:
         logger.error(f"Ошибка при генерации эмбеддингов: {e}")
         raise RuntimeError(f"Error generating embeddings: {e}")
+
+    if dedup_mode == DedupMode.EMBEDDING:
+        with indexing_stage("dedup"):
+            chunks = deduplicate_chunks(chunks, dedup_mode)
+
     # Шаг 4: Сохранение данных в ClickHouse
     try:
-        append_to_clickhouse(repo, chunks)
+        with indexing_stage("clickhouse_insert"):
+            append_to_clickhouse(repo, chunks)
         logger.info("Данные успешно сохранены в ClickHouse.")
     except Exception as e:
         logger.error(f"Ошибка при сохранении данных в ClickHouse: {e}")
@@ -326,23 +477,12 @@ def docs2clickhouse(
 # Пример использования
 if __name__ == "__main__":
     from services.minio import MinioService
-    from configs.Environment import get_environment_variables
-    from minio import Minio
+    from configs.Minio import minio_client
 
     docx_path = "ml/test_data/data.docx"
     repo = ClickhouseRepository()
-    env = get_environment_variables()
-
-    minio_client = Minio(
-        env.MINIO_HOST,
-        access_key=env.MINIO_ACCESS,
-        secret_key=env.MINIO_SECRET,
-        secure=False if env.ENV == "LOCAL" else True,
-    )
-
-    static_storage = MinioService(minio_client)
 
-    embedding_generator = EmbeddingGenerator()
+    static_storage = MinioService(minio_client())
     try:
         docs2clickhouse(repo, static_storage, docx_path)
     except Exception as e:
@@ -1,7 +1,60 @@
-from ml.classificators.swear_classifier import load_swear_model
-from ml.classificators.toxic_classifier import load_toxic_model
-from ml.constants import TOXIC_CLF_PATH
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 
-swear_clf = load_swear_model()
+from loguru import logger
 
-toxic_clf = load_toxic_model(TOXIC_CLF_PATH)
+from ml.artifacts import model_load
+from ml.constants import CLIP_WEIGHTS_PATH, TOXIC_CLF_PATH
+
+# Модели общие для процесса и загружаются при первом обращении (или заранее в lifespan
+# приложения через load_models), чтобы импорт приложения не тянул torch и веса.
+
+
+def _load_once(loader):
+    cached = lru_cache(maxsize=1)(loader)
+    lock = threading.Lock()
+
+    @wraps(loader)
+    def wrapper():
+        # Одновременные первые обращения не должны загружать модель дважды.
+        with lock:
+            return cached()
+
+    return wrapper
+
+
+@_load_once
+def get_swear_clf():
+    from ml.classificators.swear_classifier import load_swear_model
+
+    with model_load("swear"):
+        return load_swear_model()
+
+
+@_load_once
+def get_toxic_clf():
+    from ml.classificators.toxic_classifier import load_toxic_model
+
+    with model_load("toxic"):
+        return load_toxic_model(TOXIC_CLF_PATH)
+
+
+@_load_once
+def get_embedding_generator():
+    from ml.embedders import EmbeddingGenerator
+
+    with model_load("clip"):
+        return EmbeddingGenerator(weights_path=CLIP_WEIGHTS_PATH)
+
+
+def load_models():
+    """
+    Загружает все модели параллельно: большая часть времени уходит на чтение весов
+    и инициализацию torch, которые отпускают GIL.
+    """
+    loaders = (get_embedding_generator, get_toxic_clf, get_swear_clf)
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        for future in [executor.submit(loader) for loader in loaders]:
+            future.result()
+    logger.info("Модели загружены.")
@@ -1,13 +1,35 @@
 import io
-from typing import List
+import os
+from typing import List, Sequence, Tuple
 import uuid
 
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+# Коллекция документов, в которую индексируются файлы без явно указанной коллекции.
+DEFAULT_COLLECTION = "default"
+
+# Имя коллекции - значение ключа партиционирования таблиц ClickHouse и часть
+# путей объектов MinIO, поэтому допускаются только латиница, цифры, "_" и "-".
+COLLECTION_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
 
 class Paragraph:
     """
     Класс, представляющий параграф документа.
     """
 
+    __slots__ = (
+        "id",
+        "name",
+        "text",
+        "num",
+        "image_binaries",
+        "image_paths",
+        "image_texts",
+    )
+
     def __init__(
         self,
         name: str,
@@ -31,17 +53,183 @@ class Chunk:
     Класс, представляющий чанк текста или изображения.
     """
 
+    __slots__ = ("id", "text", "emb", "image", "binary", "paragraph_uuid")
+
     def __init__(
         self,
         text: str = None,
-        emb: List[float] = None,
+        emb: np.ndarray = None,
         paragraph_uuid: uuid.UUID = None,
         image: bool = False,
         binary: io.BytesIO = None,
     ):
         self.id = uuid.uuid4()
         self.text = text
-        self.emb = emb if emb else []
+        self.emb = emb
         self.image = image
         self.binary = binary
         self.paragraph_uuid = paragraph_uuid
+
+
+def uuid4_array(n: int) -> np.ndarray:
+    """
+    Генерирует n случайных UUID версии 4 одним массивом.
+
+    Возвращает:
+    - np.ndarray: Массив формы (n,) с байтами UUID (dtype S16).
+    """
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return raw.view("S16").reshape(n)
+
+
+def uuid_array(values: Sequence[uuid.UUID]) -> np.ndarray:
+    """
+    Упаковывает последовательность UUID в массив байтов (dtype S16).
+    """
+    return np.array([value.bytes for value in values], dtype="S16")
+
+
+class ChunkBatch:
+    """
+    Колоночное представление чанков для индексации.
+
+    Идентификаторы чанков и параграфов хранятся массивами байтов UUID (dtype S16),
+    признаки изображений - булевым массивом, а эмбеддинги - одной матрицей float32
+    формы (n, EMBEDDING_DIM), которая без преобразований уходит в ClickHouse.
+    Все чанки пачки относятся к одной коллекции документов.
+
+    После дедупликации (ml.dedup) чанк хранится один раз, а параграфы его
+    дубликатов записываются плоским массивом duplicate_paragraph_ids; концы отрезков
+    каждого чанка в нем - в duplicate_offsets, как у колонки Array в формате Native.
+    """
+
+    __slots__ = (
+        "ids",
+        "texts",
+        "paragraph_ids",
+        "images",
+        "binaries",
+        "embeddings",
+        "collection",
+        "duplicate_paragraph_ids",
+        "duplicate_offsets",
+    )
+
+    def __init__(
+        self,
+        texts: List[str],
+        paragraph_ids: np.ndarray,
+        images: np.ndarray = None,
+        binaries: List[io.BytesIO] = None,
+        ids: np.ndarray = None,
+        embeddings: np.ndarray = None,
+        dim: int = EMBEDDING_DIM,
+        collection: str = DEFAULT_COLLECTION,
+        duplicate_paragraph_ids: np.ndarray = None,
+        duplicate_offsets: np.ndarray = None,
+    ):
+        n = len(texts)
+        self.ids = ids if ids is not None else uuid4_array(n)
+        self.texts = texts
+        self.paragraph_ids = paragraph_ids
+        self.images = images if images is not None else np.zeros(n, dtype=bool)
+        self.binaries = binaries if binaries is not None else [None] * n
+        self.embeddings = (
+            embeddings
+            if embeddings is not None
+            else np.zeros((n, dim), dtype=np.float32)
+        )
+        self.collection = collection
+        self.duplicate_paragraph_ids = (
+            duplicate_paragraph_ids
+            if duplicate_paragraph_ids is not None
+            else np.empty(0, dtype="S16")
+        )
+        self.duplicate_offsets = (
+            duplicate_offsets
+            if duplicate_offsets is not None
+            else np.zeros(n, dtype=np.uint64)
+        )
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Sequence[Chunk],
+        dim: int = EMBEDDING_DIM,
+        collection: str = DEFAULT_COLLECTION,
+    ):
+        """
+        Собирает пачку из отдельных чанков.
+        """
+        embeddings = np.zeros((len(chunks), dim), dtype=np.float32)
+        for i, chunk in enumerate(chunks):
+            if chunk.emb is not None:
+                embeddings[i] = chunk.emb
+
+        return cls(
+            ids=uuid_array([chunk.id for chunk in chunks]),
+            texts=[chunk.text for chunk in chunks],
+            paragraph_ids=uuid_array([chunk.paragraph_uuid for chunk in chunks]),
+            images=np.fromiter(
+                (chunk.image for chunk in chunks), dtype=bool, count=len(chunks)
+            ),
+            binaries=[chunk.binary for chunk in chunks],
+            embeddings=embeddings,
+            collection=collection,
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def has_duplicates(self) -> bool:
+        return len(self.duplicate_paragraph_ids) > 0
+
+    def duplicate_counts(self) -> np.ndarray:
+        """
+        Число параграфов дубликатов у каждого чанка.
+        """
+        return np.diff(self.duplicate_offsets, prepend=np.uint64(0)).astype(np.int64)
+
+    def take(self, rows: np.ndarray) -> "ChunkBatch":
+        """
+        Возвращает пачку из строк rows (без параграфов дубликатов).
+        """
+        return ChunkBatch(
+            ids=self.ids[rows],
+            texts=[self.texts[row] for row in rows],
+            paragraph_ids=self.paragraph_ids[rows],
+            images=self.images[rows],
+            binaries=[self.binaries[row] for row in rows],
+            embeddings=self.embeddings[rows],
+            collection=self.collection,
+        )
+
+    def paragraph_centroids(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Считает центроиды эмбеддингов чанков каждого параграфа. Чанк с дубликатами
+        входит и в центроиды параграфов своих дубликатов.
+
+        Возвращает:
+        - Tuple[np.ndarray, np.ndarray]: Идентификаторы параграфов (dtype S16) и
+          нормированные центроиды формы (m, dim) в float32.
+        """
+        rows = np.concatenate(
+            [
+                np.arange(len(self)),
+                np.repeat(np.arange(len(self)), self.duplicate_counts()),
+            ]
+        )
+        paragraph_ids, inverse = np.unique(
+            np.concatenate([self.paragraph_ids, self.duplicate_paragraph_ids]),
+            return_inverse=True,
+        )
+        sums = np.zeros((len(paragraph_ids), self.embeddings.shape[1]), np.float32)
+        np.add.at(sums, inverse, self.embeddings[rows])
+
+        # Среднее и сумма отличаются только масштабом, который снимает нормировка.
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return paragraph_ids, sums / norms
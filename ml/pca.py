@@ -0,0 +1,166 @@
+import argparse
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+# Максимальное количество чанков, на которых обучается проекция.
+PCA_FIT_SAMPLE = 100_000
+
+
+class PcaProjection:
+    """
+    Линейная проекция эмбеддингов на главные компоненты.
+
+    Параметры:
+    - version (int): Версия проекции; чанки хранят версию, которой посчитан emb_reduced.
+    - mean (np.ndarray): Среднее обучающих эмбеддингов формы (dim,).
+    - components (np.ndarray): Главные компоненты формы (n_components, dim).
+    - explained_variance (float): Доля объясненной дисперсии.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        mean: np.ndarray,
+        components: np.ndarray,
+        explained_variance: float = 0.0,
+    ):
+        self.version = version
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.explained_variance = explained_variance
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(
+        cls,
+        embeddings: np.ndarray,
+        dim: int,
+        version: int,
+        sample: int = PCA_FIT_SAMPLE,
+        seed: int = 0,
+    ) -> "PcaProjection":
+        """
+        Обучает проекцию на выборке эмбеддингов через SVD.
+
+        Параметры:
+        - embeddings (np.ndarray): Эмбеддинги формы (n, dim_full).
+        - dim (int): Размерность проекции.
+        - version (int): Версия новой проекции.
+        - sample (int): Максимальный размер обучающей выборки.
+
+        Возвращает:
+        - PcaProjection: Обученная проекция.
+        """
+        if len(embeddings) <= dim:
+            raise ValueError(
+                f"Для проекции размерности {dim} нужно больше {dim} эмбеддингов, "
+                f"получено {len(embeddings)}."
+            )
+
+        if len(embeddings) > sample:
+            rows = np.random.default_rng(seed).choice(
+                len(embeddings), sample, replace=False
+            )
+            embeddings = embeddings[rows]
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        mean = embeddings.mean(axis=0)
+        _, singular, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+        variance = singular**2
+        explained = float(variance[:dim].sum() / variance.sum())
+
+        logger.info(
+            f"PCA v{version}: {embeddings.shape[1]} -> {dim}, "
+            f"объясненная дисперсия {explained:.3f}"
+        )
+        return cls(version, mean, vt[:dim], explained)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Проецирует эмбеддинги формы (n, dim_full) или (dim_full,) в пространство PCA.
+        """
+        return (
+            np.asarray(embeddings, dtype=np.float32) - self.mean
+        ) @ self.components.T
+
+
+def recall_at_k(exact: list, approx: list, k: int) -> float:
+    """
+    Доля точных top-k результатов, найденных приближенным поиском.
+    """
+    exact_ids = {chunk.id for chunk in exact[:k]}
+    if not exact_ids:
+        return 1.0
+    return len(exact_ids & {chunk.id for chunk in approx[:k]}) / len(exact_ids)
+
+
+def fit_command(args):
+    from repositories.clickhouse import ClickhouseRepository
+
+    repo = ClickhouseRepository()
+    embeddings = repo.get_embeddings_sample(PCA_FIT_SAMPLE)
+    latest = repo.get_latest_projection()
+    projection = PcaProjection.fit(
+        embeddings, args.dim, version=(latest.version + 1) if latest else 1
+    )
+    repo.create_projection(projection)
+    repo.update_reduced_embeddings(projection)
+    logger.info(f"Проекция v{projection.version} сохранена, emb_reduced пересчитан.")
+
+
+def recall_command(args):
+    from repositories.clickhouse import ClickhouseRepository
+
+    repo = ClickhouseRepository()
+    projection: Optional[PcaProjection] = repo.get_latest_projection()
+    if projection is None:
+        raise SystemExit("Проекция не найдена, сначала выполните fit.")
+
+    rng = np.random.default_rng(args.seed)
+    queries = repo.get_embeddings_sample(args.queries, seed=args.seed)
+    if args.noise:
+        queries = queries + rng.normal(0, args.noise, queries.shape).astype(np.float32)
+
+    recalls = []
+    for query in queries:
+        exact = repo.get_chunk_by_emb(query.tolist(), args.k)
+        approx = repo.get_chunk_by_emb_reduced(
+            query.tolist(), args.k, projection, args.candidates
+        )
+        recalls.append(recall_at_k(exact, approx, args.k))
+
+    print(
+        f"PCA v{projection.version} ({projection.dim}d), кандидатов {args.candidates}: "
+        f"recall@{args.k} = {np.mean(recalls):.4f} "
+        f"(min {np.min(recalls):.2f}) по {len(recalls)} запросам"
+    )
+
+
+# Обучение проекции и оценка качества:
+#   python -m ml.pca fit --dim 96
+#   python -m ml.pca recall --k 5 --candidates 100 --queries 200
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m ml.pca")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit", help="Обучить и сохранить новую проекцию.")
+    fit_parser.add_argument("--dim", type=int, default=96)
+    fit_parser.set_defaults(handler=fit_command)
+
+    recall_parser = commands.add_parser(
+        "recall", help="Сравнить поиск через проекцию с точным поиском."
+    )
+    recall_parser.add_argument("--k", type=int, default=5)
+    recall_parser.add_argument("--candidates", type=int, default=100)
+    recall_parser.add_argument("--queries", type=int, default=200)
+    recall_parser.add_argument("--noise", type=float, default=0.05)
+    recall_parser.add_argument("--seed", type=int, default=0)
+    recall_parser.set_defaults(handler=recall_command)
+
+    args = parser.parse_args()
+    args.handler(args)
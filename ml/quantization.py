@@ -0,0 +1,83 @@
+import argparse
+from typing import Tuple
+
+import numpy as np
+from loguru import logger
+
+# Длина знакового хэша эмбеддинга: по биту на компоненту, две колонки UInt256.
+SIGN_BITS = 512
+SIGN_BYTES = SIGN_BITS // 8
+HALF_BYTES = SIGN_BYTES // 2
+
+
+def sign_bits(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Считает знаковый хэш эмбеддингов: бит i равен 1, если компонента i больше нуля.
+
+    Нормировка не меняет знаков, поэтому хэш нормированного эмбеддинга совпадает с
+    хэшем исходного. Эмбеддинги короче SIGN_BITS дополняются нулевыми битами,
+    длиннее - обрезаются.
+
+    Параметры:
+    - embeddings (np.ndarray): Эмбеддинги формы (n, dim).
+
+    Возвращает:
+    - np.ndarray: Хэши формы (n, SIGN_BYTES) в uint8, старший бит байта - первая
+      компонента (порядок np.packbits).
+    """
+    embeddings = np.asarray(embeddings)[:, :SIGN_BITS]
+    bits = np.packbits(embeddings > 0, axis=1)
+    if bits.shape[1] < SIGN_BYTES:
+        bits = np.pad(bits, ((0, 0), (0, SIGN_BYTES - bits.shape[1])))
+    return bits
+
+
+def split_uint256(bits: np.ndarray) -> Tuple[int, int]:
+    """
+    Переводит хэш одного эмбеддинга в значения колонок emb_bits_0 и emb_bits_1.
+
+    Колонки UInt256 хранятся в little-endian, поэтому байты хэша читаются как
+    little-endian число: так значения совпадают с байтами, записанными в Native.
+    """
+    raw = bits.tobytes()
+    return (
+        int.from_bytes(raw[:HALF_BYTES], "little"),
+        int.from_bytes(raw[HALF_BYTES:], "little"),
+    )
+
+
+def sign_bits_sql(column: str, half: int) -> str:
+    """
+    Выражение ClickHouse, вычисляющее половину half знакового хэша колонки column
+    так же, как sign_bits: байт i собирается из компонент 8i..8i+7, старший бит -
+    первая. Выход за границы массива дает 0, как и дополнение в sign_bits.
+    """
+    offset = half * HALF_BYTES * 8
+    return (
+        f"reinterpretAsUInt256(arrayStringConcat(arrayMap(i -> char(arraySum("
+        f"j -> bitShiftLeft(toUInt8({column}[{offset} + i * 8 + j + 1] > 0), 7 - j), "
+        f"range(8))), range({HALF_BYTES}))))"
+    )
+
+
+def backfill_command(args):
+    from repositories.clickhouse import ClickhouseRepository
+
+    repo = ClickhouseRepository()
+    repo.update_sign_bits()
+    logger.info("Знаковые хэши эмбеддингов пересчитаны для чанков без хэша.")
+
+
+# Заполнение хэшей чанков, проиндексированных до появления emb_bits_*:
+#   python -m ml.quantization backfill
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m ml.quantization")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = commands.add_parser(
+        "backfill", help="Посчитать знаковые хэши для чанков без хэша."
+    )
+    backfill_parser.set_defaults(handler=backfill_command)
+
+    args = parser.parse_args()
+    args.handler(args)
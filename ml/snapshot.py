@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.types import MinioContentType
+
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+OBJECTS_DIR = "objects"
+
+# Колонки таблиц в снимке. UUID (и массивы UUID) хранятся строками, а эмбеддинги
+# (vector) - колонкой фиксированной длины: dim значений float32 подряд в
+# little-endian (FIXED_LEN_BYTE_ARRAY в Parquet), что читается как
+# np.frombuffer(value, "<f4").
+# Знаковые хэши и emb_reduced в снимок не входят: после восстановления они
+# пересчитываются в ClickHouse из emb.
+SNAPSHOT_TABLES = {
+    "paragraph": (
+        ("id", "uuid"),
+        ("name", "String"),
+        ("text", "String"),
+        ("num", "String"),
+        ("images", "Map(String, String)"),
+        ("collection", "String"),
+    ),
+    "chunk": (
+        ("id", "uuid"),
+        ("text", "String"),
+        ("paragraph_id", "uuid"),
+        ("duplicate_paragraph_ids", "uuid_array"),
+        ("collection", "String"),
+        ("emb", "vector"),
+    ),
+    "paragraph_centroid": (
+        ("paragraph_id", "uuid"),
+        ("collection", "String"),
+        ("emb", "vector"),
+    ),
+}
+
+# Параллельные загрузки объектов MinIO (размер пула соединений клиента по умолчанию).
+OBJECT_WORKERS = 8
+
+
+def vector_to_bytes_sql(column: str, dim: int) -> str:
+    """
+    Выражение ClickHouse, превращающее Array(Float32) в FixedString(dim * 4) с
+    байтами float32 в little-endian. reinterpretAsString отбрасывает нулевые байты в
+    конце значения, rightPad возвращает их.
+    """
+    return (
+        f"toFixedString(arrayStringConcat(arrayMap("
+        f"x -> rightPad(reinterpretAsString(x), 4, char(0)), {column})), {dim * 4})"
+    )
+
+
+def bytes_to_vector_sql(column: str, dim: int) -> str:
+    """
+    Обратное к vector_to_bytes_sql выражение: FixedString(dim * 4) в Array(Float32).
+    """
+    return (
+        f"arrayMap(i -> reinterpretAsFloat32(substring({column}, i * 4 + 1, 4)), "
+        f"range({dim}))"
+    )
+
+
+def _export_columns(table: str, dims: dict) -> List[Tuple[str, str]]:
+    columns = []
+    for name, kind in SNAPSHOT_TABLES[table]:
+        if kind == "uuid":
+            columns.append((name, f"toString({name})"))
+        elif kind == "uuid_array":
+            columns.append((name, f"arrayMap(x -> toString(x), {name})"))
+        elif kind == "vector":
+            columns.append((name, vector_to_bytes_sql(name, dims[name])))
+        else:
+            columns.append((name, name))
+    return columns
+
+
+def _import_columns(
+    table: str, dims: dict, names: Optional[List[str]] = None
+) -> List[Tuple[str, str, str]]:
+    columns = []
+    for name, kind in SNAPSHOT_TABLES[table]:
+        # Колонки, которых нет в снимке, получают значения по умолчанию.
+        if names is not None and name not in names:
+            continue
+        if kind == "uuid":
+            columns.append((name, "String", f"toUUID({name})"))
+        elif kind == "uuid_array":
+            columns.append((name, "Array(String)", f"arrayMap(x -> toUUID(x), {name})"))
+        elif kind == "vector":
+            columns.append(
+                (
+                    name,
+                    f"FixedString({dims[name] * 4})",
+                    bytes_to_vector_sql(name, dims[name]),
+                )
+            )
+        else:
+            columns.append((name, kind, name))
+    return columns
+
+
+def _read_blocks(path: str, size: int = 1 << 20) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while block := f.read(size):
+            yield block
+
+
+def export_snapshot(
+    repo, minio, directory: str, collection: Optional[str] = None
+) -> dict:
+    """
+    Выгружает базу знаний в каталог: таблицы paragraph, chunk и paragraph_centroid в
+    Parquet, изображения параграфов из MinIO и manifest.json с описанием снимка.
+
+    Параметры:
+    - repo (ClickhouseRepository): Репозиторий ClickHouse.
+    - minio (MinioService): Хранилище изображений.
+    - directory (str): Каталог снимка.
+    - collection (Optional[str]): Выгрузить только эту коллекцию.
+
+    Возвращает:
+    - dict: Манифест снимка.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "collection": collection,
+        "tables": {},
+    }
+
+    for table, columns in SNAPSHOT_TABLES.items():
+        start = time.perf_counter()
+        rows = repo.count_rows(table, collection)
+        dims = {
+            name: repo.get_vector_dim(table, name, collection) if rows else 0
+            for name, kind in columns
+            if kind == "vector"
+        }
+
+        file_name = f"{table}.parquet"
+        if rows:
+            with open(os.path.join(directory, file_name), "wb") as f:
+                repo.export_parquet(table, _export_columns(table, dims), f, collection)
+
+        manifest["tables"][table] = {
+            "file": file_name if rows else None,
+            "rows": rows,
+            "columns": [name for name, _ in columns],
+            "vector_dims": dims,
+        }
+        logger.info(
+            f"Таблица {table}: {rows} строк выгружено за "
+            f"{time.perf_counter() - start:.1f} с."
+        )
+
+    paths = repo.get_image_paths(collection)
+
+    def download(path: str) -> dict:
+        file = os.path.join(directory, OBJECTS_DIR, path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        return {"path": path, "content_type": minio.download_object(path, file)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=OBJECT_WORKERS) as executor:
+        manifest["objects"] = list(executor.map(download, paths))
+    logger.info(
+        f"Объекты MinIO: {len(paths)} выгружено за {time.perf_counter() - start:.1f} с."
+    )
+
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return manifest
+
+
+def restore_snapshot(repo, minio, directory: str, replace: bool = False) -> dict:
+    """
+    Восстанавливает базу знаний из снимка пакетными вставками, без вызова моделей.
+    Знаковые хэши и (при наличии проекции PCA) emb_reduced пересчитываются в
+    ClickHouse.
+
+    Параметры:
+    - repo (ClickhouseRepository): Репозиторий ClickHouse.
+    - minio (MinioService): Хранилище изображений.
+    - directory (str): Каталог снимка.
+    - replace (bool): Удалить коллекции снимка, если они уже есть в базе. Без
+      replace восстановление в существующую коллекцию запрещено.
+
+    Возвращает:
+    - dict: Манифест снимка.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {manifest['version']}.")
+
+    existing = {info.name for info in repo.get_collections()}
+    if manifest["collection"] is not None:
+        conflicts = existing & {manifest["collection"]}
+    else:
+        conflicts = existing
+    if conflicts and not replace:
+        raise ValueError(
+            f"Коллекции уже есть в базе: {', '.join(sorted(conflicts))}. "
+            "Используйте replace, чтобы заменить их."
+        )
+    for collection in sorted(conflicts):
+        repo.drop_collection(collection)
+        minio.remove_prefix(f"images/{collection}/")
+
+    for table, info in manifest["tables"].items():
+        if not info["file"]:
+            continue
+
+        start = time.perf_counter()
+        repo.import_parquet(
+            table,
+            _import_columns(table, info["vector_dims"], info.get("columns")),
+            _read_blocks(os.path.join(directory, info["file"])),
+        )
+        logger.info(
+            f"Таблица {table}: {info['rows']} строк восстановлено за "
+            f"{time.perf_counter() - start:.1f} с."
+        )
+
+    def upload(obj: dict):
+        minio.create_object_from_file(
+            obj["path"],
+            os.path.join(directory, OBJECTS_DIR, obj["path"]),
+            MinioContentType(obj["content_type"]),
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=OBJECT_WORKERS) as executor:
+        list(executor.map(upload, manifest["objects"]))
+    logger.info(
+        f"Объекты MinIO: {len(manifest['objects'])} восстановлено за "
+        f"{time.perf_counter() - start:.1f} с."
+    )
+
+    repo.update_sign_bits()
+    projection = repo.get_latest_projection()
+    if projection is not None:
+        repo.update_reduced_embeddings(projection)
+
+    return manifest
+
+
+def _services():
+    from configs.Minio import minio_client
+    from repositories.clickhouse import ClickhouseRepository
+    from services.minio import MinioService
+
+    return ClickhouseRepository(), MinioService(minio_client())
+
+
+def export_command(args):
+    repo, minio = _services()
+    manifest = export_snapshot(repo, minio, args.directory, args.collection)
+    rows = ", ".join(
+        f"{table} {info['rows']}" for table, info in manifest["tables"].items()
+    )
+    logger.info(
+        f"Снимок сохранен в {args.directory}: {rows}, "
+        f"объектов {len(manifest['objects'])}."
+    )
+
+
+def restore_command(args):
+    repo, minio = _services()
+    restore_snapshot(repo, minio, args.directory, args.replace)
+    logger.info(f"Снимок {args.directory} восстановлен.")
+
+
+# Перенос базы знаний между окружениями без повторной индексации:
+#   python -m ml.snapshot export snapshots/2024-12-01 [--collection manuals]
+#   python -m ml.snapshot restore snapshots/2024-12-01 [--replace]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m ml.snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser(
+        "export", help="Выгрузить таблицы и изображения в каталог снимка."
+    )
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--collection", default=None)
+    export_parser.set_defaults(handler=export_command)
+
+    restore_parser = commands.add_parser(
+        "restore", help="Восстановить базу знаний из каталога снимка."
+    )
+    restore_parser.add_argument("directory")
+    restore_parser.add_argument("--replace", action="store_true")
+    restore_parser.set_defaults(handler=restore_command)
+
+    args = parser.parse_args()
+    args.handler(args)
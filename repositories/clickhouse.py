@@ -1,21 +1,163 @@
 import json
 import uuid
+from typing import BinaryIO, Iterable, Optional
 
+import numpy as np
 from loguru import logger
 
-from configs.Clickhouse import client
+from configs.Clickhouse import get_clickhouse_client
 from errors.errors import ErrEntityNotFound
+from ml.models import DEFAULT_COLLECTION, ChunkBatch
+from ml.pca import PcaProjection
+from ml.quantization import HALF_BYTES, sign_bits, sign_bits_sql, split_uint256
 from schemas.clickhouse import (
     CreateChunkOpts,
     CreateParagraphOpts,
     ParagraphSchema,
     ChunkWithoutEmb,
+    CollectionInfo,
 )
 
+# Таблицы, партиционированные по коллекции документов.
+COLLECTION_TABLES = ("chunk", "paragraph", "paragraph_centroid")
+
+
+def _write_leb128(value: int, dest: bytearray):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            dest.append(byte | 0x80)
+        else:
+            dest.append(byte)
+            return
+
+
+def _write_native_column(name: str, type_name: str, data: bytes, dest: bytearray):
+    for value in (name, type_name):
+        encoded = value.encode()
+        _write_leb128(len(encoded), dest)
+        dest += encoded
+    dest += data
+
+
+def _native_uuid(values: np.ndarray) -> bytes:
+    # ClickHouse хранит UUID как две половины UInt64 в little-endian, старшая первой.
+    return values.view(">u8").astype("<u8").tobytes()
+
+
+def _native_float32_array(values: np.ndarray) -> bytes:
+    rows, dim = values.shape
+    offsets = np.arange(1, rows + 1, dtype="<u8") * dim
+    return offsets.tobytes() + np.ascontiguousarray(values, dtype="<f4").tobytes()
+
+
+def _native_uuid_array(values: np.ndarray, offsets: np.ndarray) -> bytes:
+    return offsets.astype("<u8").tobytes() + _native_uuid(values)
+
+
+def _native_string(values: list[str]) -> bytes:
+    dest = bytearray()
+    for value in values:
+        encoded = value.encode()
+        _write_leb128(len(encoded), dest)
+        dest += encoded
+    return bytes(dest)
+
+
+def chunk_batch_to_native(
+    batch: ChunkBatch, projection: Optional[PcaProjection] = None
+) -> bytes:
+    """
+    Кодирует пачку чанков в блок формата Native для таблицы chunk.
+    Идентификаторы и эмбеддинги сериализуются целыми массивами, без обхода строк.
+    Знаковый хэш эмбеддинга пишется в emb_bits_0 и emb_bits_1, а с projection в
+    блок добавляются emb_reduced и pca_version. duplicate_paragraph_ids пишется,
+    только если в пачке есть дубликаты.
+    """
+    bits = sign_bits(batch.embeddings)
+    columns = 7 + (projection is not None) * 2 + batch.has_duplicates
+    block = bytearray()
+    _write_leb128(columns, block)
+    _write_leb128(len(batch), block)
+    _write_native_column("id", "UUID", _native_uuid(batch.ids), block)
+    _write_native_column(
+        "emb", "Array(Float32)", _native_float32_array(batch.embeddings), block
+    )
+    _write_native_column("text", "String", _native_string(batch.texts), block)
+    _write_native_column(
+        "paragraph_id", "UUID", _native_uuid(batch.paragraph_ids), block
+    )
+    _write_native_column(
+        "collection", "String", _native_string([batch.collection] * len(batch)), block
+    )
+    if batch.has_duplicates:
+        _write_native_column(
+            "duplicate_paragraph_ids",
+            "Array(UUID)",
+            _native_uuid_array(batch.duplicate_paragraph_ids, batch.duplicate_offsets),
+            block,
+        )
+    # UInt256 в Native - 32 байта little-endian, то есть ровно половина хэша.
+    _write_native_column("emb_bits_0", "UInt256", bits[:, :HALF_BYTES].tobytes(), block)
+    _write_native_column("emb_bits_1", "UInt256", bits[:, HALF_BYTES:].tobytes(), block)
+    if projection is not None:
+        _write_native_column(
+            "emb_reduced",
+            "Array(Float32)",
+            _native_float32_array(projection.transform(batch.embeddings)),
+            block,
+        )
+        _write_native_column(
+            "pca_version",
+            "UInt32",
+            np.full(len(batch), projection.version, dtype="<u4").tobytes(),
+            block,
+        )
+    return bytes(block)
+
+
+def _projection_sql(projection: PcaProjection, column: str) -> str:
+    # Та же проекция, что и PcaProjection.transform, но вычисляемая в ClickHouse.
+    return (
+        f"arrayMap(c -> arraySum((x, m, w) -> (x - m) * w, {column}, "
+        f"{projection.mean.tolist()}, c), {projection.components.tolist()})"
+    )
+
+
+def _collection_filter(collection: Optional[str]) -> str:
+    # Условие на ключ партиционирования: ClickHouse читает только части коллекции.
+    return "" if collection is None else "AND collection = %(collection)s"
+
+
+def _collection_parameters(collection: Optional[str]) -> Optional[dict]:
+    return None if collection is None else {"collection": collection}
+
+
+def paragraph_centroids_to_native(
+    paragraph_ids: np.ndarray,
+    centroids: np.ndarray,
+    collection: str = DEFAULT_COLLECTION,
+) -> bytes:
+    """
+    Кодирует центроиды параграфов в блок формата Native для таблицы paragraph_centroid.
+    """
+    block = bytearray()
+    _write_leb128(3, block)
+    _write_leb128(len(paragraph_ids), block)
+    _write_native_column("paragraph_id", "UUID", _native_uuid(paragraph_ids), block)
+    _write_native_column(
+        "emb", "Array(Float32)", _native_float32_array(centroids), block
+    )
+    _write_native_column(
+        "collection", "String", _native_string([collection] * len(centroids)), block
+    )
+    return bytes(block)
+
 
 class ClickhouseRepository:
     def __init__(self):
-        self._client = client
+        self._client = get_clickhouse_client()
 
     def create_chunk(self, opts: CreateChunkOpts):
         logger.debug("Clickhouse - Repository - create_chunk")
@@ -34,11 +176,56 @@ class ClickhouseRepository:
             ),
         )
 
+    def create_chunks(
+        self, batch: ChunkBatch, projection: Optional[PcaProjection] = None
+    ):
+        logger.debug("Clickhouse - Repository - create_chunks")
+        if not len(batch):
+            return
+
+        columns = [
+            "id",
+            "emb",
+            "text",
+            "paragraph_id",
+            "collection",
+            "emb_bits_0",
+            "emb_bits_1",
+        ]
+        if projection is not None:
+            columns += ["emb_reduced", "pca_version"]
+
+        self._client.raw_insert(
+            "chunk",
+            columns,
+            insert_block=chunk_batch_to_native(batch, projection),
+            fmt="Native",
+        )
+
+    def create_paragraph_centroids(
+        self,
+        paragraph_ids: np.ndarray,
+        centroids: np.ndarray,
+        collection: str = DEFAULT_COLLECTION,
+    ):
+        logger.debug("Clickhouse - Repository - create_paragraph_centroids")
+        if not len(paragraph_ids):
+            return
+
+        self._client.raw_insert(
+            "paragraph_centroid",
+            ["paragraph_id", "emb", "collection"],
+            insert_block=paragraph_centroids_to_native(
+                paragraph_ids, centroids, collection
+            ),
+            fmt="Native",
+        )
+
     def create_paragraph(self, opts: CreateParagraphOpts):
         logger.debug("Clickhouse - Repository - create_paragraph")
         query = """
-            INSERT INTO `paragraph` (id, name, text, num, images)
-            VALUES (%s, %s, %s, %s, %s)   
+            INSERT INTO `paragraph` (id, name, text, num, images, collection)
+            VALUES (%s, %s, %s, %s, %s, %s)   
         """
 
         self._client.command(
@@ -49,11 +236,12 @@ class ClickhouseRepository:
                 opts.text,
                 opts.num,
                 json.dumps(opts.images).replace('"', "'"),
+                opts.collection,
             ),
         )
 
     def get_chunk_by_emb(
-        self, embeddings: list[float], top_k: int
+        self, embeddings: list[float], top_k: int, collection: Optional[str] = None
     ) -> list[ChunkWithoutEmb]:
         logger.debug("Clickhouse - Repository - get_chunk_by_emb")
         query = f"""
@@ -64,12 +252,15 @@ class ClickhouseRepository:
             : 0 AS cosine_similarity
             FROM chunk
             WHERE length(query_vector) == length(emb)
+            {_collection_filter(collection)}
             ORDER BY cosine_similarity DESC 
             LIMIT {top_k}
         """
 
         result = self._client.query(
-            query, settings={"max_query_size": "10000000000000"}
+            query,
+            parameters=_collection_parameters(collection),
+            settings={"max_query_size": "10000000000000"},
         )
 
         rows = result.result_rows
@@ -85,6 +276,464 @@ class ClickhouseRepository:
 
         return chunks
 
+    def get_chunks_by_embs(
+        self,
+        embeddings: list[list[float]],
+        top_k: int,
+        collection: Optional[str] = None,
+    ) -> list[list[ChunkWithoutEmb]]:
+        logger.debug("Clickhouse - Repository - get_chunks_by_embs")
+        # Таблица читается один раз: для каждой строки близость считается сразу ко
+        # всем векторам запроса, затем ARRAY JOIN разворачивает ее по номеру вектора и
+        # LIMIT BY оставляет top_k чанков на каждый. Тексты подтягиваются JOIN-ом
+        # только для отобранных чанков, а не размножаются на все векторы.
+        if not embeddings:
+            return []
+
+        query = f"""
+            WITH {embeddings} as query_vectors
+            SELECT top.query_index, chunk.id, chunk.text, chunk.paragraph_id,
+            top.cosine_similarity
+            FROM chunk
+            INNER JOIN (
+                SELECT query_index, id, sims[query_index] AS cosine_similarity
+                FROM (
+                    SELECT id, arraySum(x -> x * x, emb) AS emb_norm,
+                    arrayMap(
+                        q -> emb_norm * arraySum(x -> x * x, q) != 0
+                        ? arraySum((x, y) -> x * y, emb, q) / sqrt(emb_norm * arraySum(x -> x * x, q))
+                        : 0,
+                        query_vectors
+                    ) AS sims
+                    FROM chunk
+                    WHERE length(query_vectors[1]) == length(emb)
+                    {_collection_filter(collection)}
+                )
+                ARRAY JOIN arrayEnumerate(sims) AS query_index
+                ORDER BY query_index, cosine_similarity DESC
+                LIMIT {top_k} BY query_index
+            ) AS top ON chunk.id = top.id
+            WHERE 1 {_collection_filter(collection)}
+            ORDER BY top.query_index, top.cosine_similarity DESC
+        """
+
+        result = self._client.query(
+            query,
+            parameters=_collection_parameters(collection),
+            settings={"max_query_size": "10000000000000"},
+        )
+
+        chunks = [[] for _ in embeddings]
+        for row in result.result_rows:
+            chunks[row[0] - 1].append(
+                ChunkWithoutEmb(
+                    id=row[1], text=row[2], paragraph_id=row[3], cos_dist=row[4]
+                )
+            )
+
+        return chunks
+
+    def get_chunk_by_emb_hierarchical(
+        self,
+        embeddings: list[float],
+        top_k: int,
+        top_paragraphs: int,
+        collection: Optional[str] = None,
+    ) -> list[ChunkWithoutEmb]:
+        logger.debug("Clickhouse - Repository - get_chunk_by_emb_hierarchical")
+        # Сначала выбираются top_paragraphs параграфов по центроидам, затем точная
+        # близость считается только для их чанков. Таблица chunk упорядочена по
+        # paragraph_id, поэтому фильтр читает только гранулы выбранных параграфов.
+        # Чанки, у которых в выбранных параграфах были дубликаты, находятся по
+        # индексу bloom_filter на duplicate_paragraph_ids.
+        top = f"""
+            SELECT paragraph_id FROM paragraph_centroid
+            WHERE length(query_vector) == length(emb)
+            {_collection_filter(collection)}
+            ORDER BY arraySum((x, y) -> x * y, emb, query_vector) DESC
+            LIMIT {top_paragraphs}
+        """
+        query = f"""
+            WITH {embeddings} as query_vector
+            SELECT id, text, paragraph_id, cosine_similarity,
+            arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector) != 0
+            ? arraySum((x, y) -> x * y, emb, query_vector) / sqrt(arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector))
+            : 0 AS cosine_similarity
+            FROM (
+                SELECT id, text, paragraph_id, emb FROM chunk
+                WHERE paragraph_id IN ({top})
+                {_collection_filter(collection)}
+                UNION ALL
+                SELECT id, text, paragraph_id, emb FROM chunk
+                WHERE hasAny(
+                    duplicate_paragraph_ids, (SELECT groupArray(paragraph_id) FROM ({top}))
+                )
+                AND paragraph_id NOT IN ({top})
+                {_collection_filter(collection)}
+            )
+            WHERE length(query_vector) == length(emb)
+            ORDER BY cosine_similarity DESC
+            LIMIT {top_k}
+        """
+
+        result = self._client.query(
+            query,
+            parameters=_collection_parameters(collection),
+            settings={"max_query_size": "10000000000000"},
+        )
+
+        return [
+            ChunkWithoutEmb(
+                id=row[0], text=row[1], paragraph_id=row[2], cos_dist=row[3]
+            )
+            for row in result.result_rows
+        ]
+
+    def get_chunk_by_emb_reduced(
+        self,
+        embeddings: list[float],
+        top_k: int,
+        projection: PcaProjection,
+        candidates: int,
+        collection: Optional[str] = None,
+    ) -> list[ChunkWithoutEmb]:
+        logger.debug("Clickhouse - Repository - get_chunk_by_emb_reduced")
+        # Первый проход читает только компактный emb_reduced и отбирает candidates
+        # ближайших по L2 в пространстве PCA; точная близость по emb считается только
+        # для них. Чанки, посчитанные другой версией проекции, оцениваются точно.
+        reduced = projection.transform(embeddings).tolist()
+        query = f"""
+            WITH {embeddings} as query_vector, {reduced} as query_reduced
+            SELECT id, text, paragraph_id, cosine_similarity,
+            arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector) != 0
+            ? arraySum((x, y) -> x * y, emb, query_vector) / sqrt(arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector))
+            : 0 AS cosine_similarity
+            FROM chunk
+            WHERE (
+                id IN (
+                    SELECT id FROM chunk
+                    WHERE pca_version = {projection.version}
+                    {_collection_filter(collection)}
+                    ORDER BY arraySum((x, y) -> (x - y) * (x - y), emb_reduced, query_reduced)
+                    LIMIT {candidates}
+                )
+                OR pca_version != {projection.version}
+            )
+            AND length(query_vector) == length(emb)
+            {_collection_filter(collection)}
+            ORDER BY cosine_similarity DESC
+            LIMIT {top_k}
+        """
+
+        result = self._client.query(
+            query,
+            parameters=_collection_parameters(collection),
+            settings={"max_query_size": "10000000000000"},
+        )
+
+        return [
+            ChunkWithoutEmb(
+                id=row[0], text=row[1], paragraph_id=row[2], cos_dist=row[3]
+            )
+            for row in result.result_rows
+        ]
+
+    def get_chunk_by_emb_binary(
+        self,
+        embeddings: list[float],
+        top_k: int,
+        candidates: int,
+        collection: Optional[str] = None,
+    ) -> list[ChunkWithoutEmb]:
+        logger.debug("Clickhouse - Repository - get_chunk_by_emb_binary")
+        # Первый проход ранжирует по расстоянию Хэмминга между знаковыми хэшами и
+        # читает только две колонки UInt256; точная близость по emb считается только
+        # для candidates лучших. Чанки без хэша (нулевой хэш) оцениваются точно.
+        bits_0, bits_1 = split_uint256(sign_bits(np.asarray([embeddings]))[0])
+        query = f"""
+            WITH {embeddings} as query_vector,
+            toUInt256('{bits_0}') as query_bits_0,
+            toUInt256('{bits_1}') as query_bits_1
+            SELECT id, text, paragraph_id, cosine_similarity,
+            arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector) != 0
+            ? arraySum((x, y) -> x * y, emb, query_vector) / sqrt(arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector))
+            : 0 AS cosine_similarity
+            FROM chunk
+            WHERE (
+                id IN (
+                    SELECT id FROM chunk
+                    WHERE (emb_bits_0 != 0 OR emb_bits_1 != 0)
+                    {_collection_filter(collection)}
+                    ORDER BY bitCount(bitXor(emb_bits_0, query_bits_0))
+                        + bitCount(bitXor(emb_bits_1, query_bits_1))
+                    LIMIT {candidates}
+                )
+                OR (emb_bits_0 = 0 AND emb_bits_1 = 0)
+            )
+            AND length(query_vector) == length(emb)
+            {_collection_filter(collection)}
+            ORDER BY cosine_similarity DESC
+            LIMIT {top_k}
+        """
+
+        result = self._client.query(
+            query,
+            parameters=_collection_parameters(collection),
+            settings={"max_query_size": "10000000000000"},
+        )
+
+        return [
+            ChunkWithoutEmb(
+                id=row[0], text=row[1], paragraph_id=row[2], cos_dist=row[3]
+            )
+            for row in result.result_rows
+        ]
+
+    def update_sign_bits(self):
+        logger.debug("Clickhouse - Repository - update_sign_bits")
+        self._client.command(
+            f"""
+            ALTER TABLE chunk
+            UPDATE emb_bits_0 = {sign_bits_sql("emb", 0)},
+                emb_bits_1 = {sign_bits_sql("emb", 1)}
+            WHERE emb_bits_0 = 0 AND emb_bits_1 = 0
+            """,
+            settings={"mutations_sync": 1},
+        )
+
+    def get_collections(self) -> list[CollectionInfo]:
+        logger.debug("Clickhouse - Repository - get_collections")
+        result = self._client.query(
+            """
+            SELECT collection, count() FROM chunk
+            GROUP BY collection
+            ORDER BY collection
+            """
+        )
+
+        return [
+            CollectionInfo(name=row[0], chunks=row[1]) for row in result.result_rows
+        ]
+
+    def drop_collection(self, collection: str):
+        logger.debug("Clickhouse - Repository - drop_collection")
+        # Коллекция - отдельная партиция каждой таблицы, поэтому удаление снимает
+        # ее части целиком, без мутаций и перезаписи данных других коллекций.
+        for table in COLLECTION_TABLES:
+            self._client.command(
+                f"ALTER TABLE {table} DROP PARTITION %(collection)s",
+                {"collection": collection},
+            )
+
+    def get_embeddings_sample(self, limit: int, seed: int = 0) -> np.ndarray:
+        logger.debug("Clickhouse - Repository - get_embeddings_sample")
+        result = self._client.query(
+            f"""
+            SELECT emb FROM chunk
+            WHERE length(emb) != 0
+            ORDER BY cityHash64(id, {int(seed)})
+            LIMIT {int(limit)}
+            """
+        )
+
+        return np.array([row[0] for row in result.result_rows], dtype=np.float32)
+
+    def get_latest_projection(self) -> Optional[PcaProjection]:
+        logger.debug("Clickhouse - Repository - get_latest_projection")
+        result = self._client.query(
+            """
+            SELECT version, mean, components, explained_variance
+            FROM pca_projection
+            ORDER BY version DESC
+            LIMIT 1
+            """
+        )
+
+        if not result.result_rows:
+            return None
+
+        version, mean, components, explained = result.result_rows[0]
+        return PcaProjection(version, mean, components, explained)
+
+    def create_projection(self, projection: PcaProjection):
+        logger.debug("Clickhouse - Repository - create_projection")
+        self._client.insert(
+            "pca_projection",
+            [
+                [
+                    projection.version,
+                    projection.mean.tolist(),
+                    projection.components.tolist(),
+                    projection.explained_variance,
+                ]
+            ],
+            column_names=["version", "mean", "components", "explained_variance"],
+        )
+
+    def update_reduced_embeddings(self, projection: PcaProjection):
+        logger.debug("Clickhouse - Repository - update_reduced_embeddings")
+        self._client.command(
+            f"""
+            ALTER TABLE chunk
+            UPDATE emb_reduced = {_projection_sql(projection, "emb")},
+                pca_version = {projection.version}
+            WHERE pca_version != {projection.version}
+            """,
+            settings={"mutations_sync": 1, "max_query_size": "10000000000000"},
+        )
+
+    def get_paragraph_chunks(
+        self, paragraph_id: uuid.UUID, embeddings: list[float]
+    ) -> list[ChunkWithoutEmb]:
+        logger.debug("Clickhouse - Repository - get_paragraph_chunks")
+        # chunk упорядочена по paragraph_id, поэтому читаются только гранулы параграфа.
+        # Чанки, оставленные в другом параграфе при дедупликации, находятся по
+        # индексу на duplicate_paragraph_ids. Чанки изображений (текст "image") в
+        # контекст не попадают.
+        query = f"""
+            WITH {embeddings} as query_vector
+            SELECT id, text, paragraph_id, cosine_similarity,
+            arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector) != 0
+            ? arraySum((x, y) -> x * y, emb, query_vector) / sqrt(arraySum(x -> x * x, emb) * arraySum(x -> x * x, query_vector))
+            : 0 AS cosine_similarity
+            FROM (
+                SELECT id, text, paragraph_id, emb FROM chunk
+                WHERE paragraph_id = %(paragraph_id)s
+                UNION ALL
+                SELECT id, text, paragraph_id, emb FROM chunk
+                WHERE has(duplicate_paragraph_ids, toUUID(%(paragraph_id)s))
+            )
+            WHERE text != 'image'
+            AND length(query_vector) == length(emb)
+            ORDER BY cosine_similarity DESC
+        """
+
+        result = self._client.query(
+            query,
+            parameters={"paragraph_id": paragraph_id},
+            settings={"max_query_size": "10000000000000"},
+        )
+
+        return [
+            ChunkWithoutEmb(
+                id=row[0], text=row[1], paragraph_id=row[2], cos_dist=row[3]
+            )
+            for row in result.result_rows
+        ]
+
+    def count_rows(self, table: str, collection: Optional[str] = None) -> int:
+        logger.debug("Clickhouse - Repository - count_rows")
+        return self._client.command(
+            f"SELECT count() FROM {table} WHERE 1 {_collection_filter(collection)}",
+            _collection_parameters(collection),
+        )
+
+    def get_vector_dim(
+        self, table: str, column: str, collection: Optional[str] = None
+    ) -> int:
+        logger.debug("Clickhouse - Repository - get_vector_dim")
+        result = self._client.query(
+            f"""
+            SELECT min(length({column})), max(length({column})) FROM {table}
+            WHERE 1 {_collection_filter(collection)}
+            """,
+            parameters=_collection_parameters(collection),
+        )
+
+        low, high = result.result_rows[0]
+        if low != high:
+            raise ValueError(
+                f"Векторы {table}.{column} разной длины: от {low} до {high}."
+            )
+        return high
+
+    def get_image_paths(self, collection: Optional[str] = None) -> list[str]:
+        logger.debug("Clickhouse - Repository - get_image_paths")
+        result = self._client.query(
+            f"""
+            SELECT DISTINCT arrayJoin(mapValues(images)) FROM paragraph
+            WHERE 1 {_collection_filter(collection)}
+            """,
+            parameters=_collection_parameters(collection),
+        )
+
+        return [row[0] for row in result.result_rows]
+
+    def export_parquet(
+        self,
+        table: str,
+        columns: list[tuple[str, str]],
+        destination: BinaryIO,
+        collection: Optional[str] = None,
+        row_group_size: int = 65536,
+    ):
+        """
+        Выгружает таблицу в Parquet потоком: ClickHouse формирует файл сам и отдает
+        его по группам строк, поэтому ни сервер, ни клиент не держат таблицу целиком.
+
+        Параметры:
+        - table (str): Таблица.
+        - columns (list[tuple[str, str]]): Колонки файла: имя и выражение над таблицей.
+        - destination (BinaryIO): Файл, в который пишется Parquet.
+        - collection (Optional[str]): Выгружать только эту коллекцию.
+        - row_group_size (int): Строк в группе Parquet.
+        """
+        logger.debug("Clickhouse - Repository - export_parquet")
+        select = ", ".join(f"{expr} AS {name}" for name, expr in columns)
+        stream = self._client.raw_stream(
+            f"SELECT {select} FROM {table} WHERE 1 {_collection_filter(collection)}",
+            parameters=_collection_parameters(collection),
+            settings={
+                "output_format_parquet_row_group_size": row_group_size,
+                "output_format_parquet_compression_method": "zstd",
+                "max_query_size": "10000000000000",
+            },
+            fmt="Parquet",
+        )
+        try:
+            while block := stream.read(1 << 20):
+                destination.write(block)
+        finally:
+            stream.close()
+
+    def import_parquet(
+        self,
+        table: str,
+        columns: list[tuple[str, str, str]],
+        source: Iterable[bytes],
+    ):
+        """
+        Загружает Parquet в таблицу одной пакетной вставкой. Файл потоком вставляется
+        во временную таблицу с типами колонок файла, а затем переносится в table
+        запросом INSERT SELECT, который приводит колонки к типам таблицы.
+
+        Параметры:
+        - table (str): Таблица.
+        - columns (list[tuple[str, str, str]]): Колонки: имя, тип в файле и выражение,
+          дающее значение колонки table.
+        - source (Iterable[bytes]): Содержимое файла Parquet по частям.
+        """
+        logger.debug("Clickhouse - Repository - import_parquet")
+        staging = f"{table}_restore"
+        structure = ", ".join(f"{name} {type_name}" for name, type_name, _ in columns)
+        names = [name for name, _, _ in columns]
+
+        self._client.command(f"DROP TABLE IF EXISTS {staging}")
+        self._client.command(
+            f"CREATE TABLE {staging} ({structure}) ENGINE = MergeTree ORDER BY tuple()"
+        )
+        try:
+            self._client.raw_insert(staging, names, source, fmt="Parquet")
+            self._client.command(
+                f"""
+                INSERT INTO {table} ({", ".join(names)})
+                SELECT {", ".join(expr for _, _, expr in columns)} FROM {staging}
+                """,
+                settings={"max_query_size": "10000000000000"},
+            )
+        finally:
+            self._client.command(f"DROP TABLE IF EXISTS {staging}")
+
     def get_paragraph(self, id: uuid.UUID) -> ParagraphSchema:
         logger.debug("Clickhouse - Repository - get_paragraph")
         query = """
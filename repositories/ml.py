@@ -1,15 +1,16 @@
 from typing import BinaryIO
 
-import torch.nn.functional
-from PIL import Image
 from loguru import logger
 
-from ml.embedders import EmbeddingGenerator
+from ml.lifespan import get_embedding_generator
 
 
 class MlRepository:
-    def __init__(self):
-        self._embeder = EmbeddingGenerator()
+    @property
+    def _embeder(self):
+        # Модель CLIP общая для процесса и загружается при первом использовании,
+        # а не при создании репозитория на каждый запрос.
+        return get_embedding_generator()
 
     def get_embeddings_from_text(self, texts: list[str]) -> list[float]:
         logger.debug("ML - Repository - get_embeddings_from_text")
@@ -17,8 +18,14 @@ class MlRepository:
 
         return emb.squeeze().tolist()
 
+    def get_embeddings_from_texts(self, texts: list[str]) -> list[list[float]]:
+        logger.debug("ML - Repository - get_embeddings_from_texts")
+        return self._embeder.get_text_embedding(texts).tolist()
+
     def get_metric(self, text1: str, text2: str) -> float:
         logger.debug("ML - Repository - get_metric")
+        import torch.nn.functional
+
         emb1 = self._embeder.get_text_embedding([text1])
         emb2 = self._embeder.get_text_embedding([text2])
 
@@ -28,9 +35,21 @@ class MlRepository:
 
     def get_embeddings_from_image(self, image: BinaryIO):
         logger.debug("ML - Repository - get_embeddings_from_image")
+        from PIL import Image
+
         image = Image.open(image)
         embeddings = self._embeder.get_image_embedding([image])
 
         embeddings = embeddings.squeeze().tolist()
 
         return embeddings
+
+    def get_embeddings_from_images(self, images: list[BinaryIO]) -> list[list[float]]:
+        logger.debug("ML - Repository - get_embeddings_from_images")
+        from PIL import Image
+
+        embeddings = self._embeder.get_image_embedding(
+            [Image.open(image) for image in images]
+        )
+
+        return embeddings.tolist()
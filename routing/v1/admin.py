@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import FileResponse
+
+from configs.Profiling import max_profiles, profile_dir, profiling_token
+from errors.errors import ErrEntityNotFound, ErrNotAuthorized
+from schemas.profiling import ProfileInfo
+from utils.profiling import check_token, list_profiles
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+def verify_profiling_token(x_profile: Optional[str] = Header(None)):
+    if not check_token(x_profile, profiling_token):
+        raise ErrNotAuthorized("invalid profiling token")
+
+
+@router.get(
+    "/profiles",
+    summary="list of stored request profiles",
+    response_model=list[ProfileInfo],
+    dependencies=[Depends(verify_profiling_token)],
+)
+async def profiles():
+    result = []
+    for path in list_profiles(profile_dir)[:max_profiles]:
+        stat = path.stat()
+        result.append(
+            ProfileInfo(
+                name=path.name,
+                size=stat.st_size,
+                created_at=datetime.fromtimestamp(stat.st_mtime),
+            )
+        )
+
+    return result
+
+
+@router.get(
+    "/profiles/{name}",
+    summary="download a stored request profile",
+    dependencies=[Depends(verify_profiling_token)],
+)
+async def profile(name: str):
+    path = next((p for p in list_profiles(profile_dir) if p.name == name), None)
+    if path is None:
+        raise ErrEntityNotFound(f"there is no profile with name {name}")
+
+    return FileResponse(path, filename=name)
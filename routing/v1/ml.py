@@ -1,33 +1,51 @@
+import io
 from typing import Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Path
 from fastapi.params import Depends
 
-from schemas.clickhouse import AnswerResponse
+from configs.Answer import answer_deadline, batch_answer_deadline, batch_max_size
+from ml.models import COLLECTION_PATTERN, DEFAULT_COLLECTION
+from schemas.clickhouse import (
+    AnswerResponse,
+    BatchAnswerRequest,
+    BatchAnswerResponse,
+    CollectionInfo,
+)
 from services.ml import MlService
+from utils.deadline import request_deadline
+from utils.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/api/v1/ml", tags=["ml"])
+# Обработчики профилируются в потоке, где выполняются (см. utils.profiling).
+router = APIRouter(prefix="/api/v1/ml", tags=["ml"], route_class=ProfiledRoute)
 
 
 @router.post(
     "/indexing",
     summary="indexing the docx file",
 )
-async def indexing(file: UploadFile = File(...), ml_service: MlService = Depends()):
+async def indexing(
+    file: UploadFile = File(...),
+    collection: str = Form(DEFAULT_COLLECTION, pattern=COLLECTION_PATTERN),
+    ml_service: MlService = Depends(),
+):
     if not file.filename.endswith(".docx"):
         raise HTTPException(status_code=400, detail="Only .docx files are accepted.")
 
-    ml_service.indexing(file.file)
+    ml_service.indexing(file.file, collection)
 
 
+# Обычная функция: запросы обрабатываются параллельно в пуле потоков, и одинаковые
+# вопросы в обработке объединяются (см. MlService.get_answer).
 @router.post(
     "/answer",
     summary="indexing the docx file",
     response_model=AnswerResponse,
 )
-async def answer(
+def answer(
     question: str = Form(),
     file: Optional[UploadFile] = File(None),
+    collection: Optional[str] = Form(None, pattern=COLLECTION_PATTERN),
     ml_service: MlService = Depends(),
 ):
     image = None
@@ -35,4 +53,49 @@ async def answer(
     if file:
         image = file.file
 
-    return ml_service.get_answer(question, image)
+    with request_deadline("answer", answer_deadline):
+        return ml_service.get_answer(question, image, collection)
+
+
+# Обычная функция: FastAPI выполняет ее в пуле потоков, и долгая пачка не блокирует
+# цикл событий.
+@router.post(
+    "/answer/batch",
+    summary="answer a batch of questions",
+    response_model=BatchAnswerResponse,
+)
+def answer_batch(body: BatchAnswerRequest, ml_service: MlService = Depends()):
+    if len(body.questions) > batch_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions in a batch, the limit is {batch_max_size}.",
+        )
+
+    with request_deadline("answer_batch", batch_answer_deadline):
+        answers = ml_service.get_answers(
+            [item.question for item in body.questions],
+            [io.BytesIO(item.image) if item.image else None for item in body.questions],
+            body.collection,
+        )
+
+    return BatchAnswerResponse(answers=answers)
+
+
+@router.get(
+    "/collections",
+    summary="list of document collections",
+    response_model=list[CollectionInfo],
+)
+def collections(ml_service: MlService = Depends()):
+    return ml_service.get_collections()
+
+
+@router.delete(
+    "/collections/{collection}",
+    summary="drop a document collection",
+)
+def drop_collection(
+    collection: str = Path(pattern=COLLECTION_PATTERN),
+    ml_service: MlService = Depends(),
+):
+    ml_service.drop_collection(collection)
@@ -1,7 +1,9 @@
 import uuid
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import Base64Bytes, BaseModel, Field
+
+from ml.models import COLLECTION_PATTERN, DEFAULT_COLLECTION
 
 
 class CreateChunkOpts(BaseModel):
@@ -17,6 +19,7 @@ class CreateParagraphOpts(BaseModel):
     text: str
     num: str
     images: Dict[str, str]
+    collection: str = DEFAULT_COLLECTION
 
 
 class ParagraphSchema(BaseModel):
@@ -44,3 +47,22 @@ class ChunkWithoutEmb(BaseModel):
 class AnswerResponse(BaseModel):
     answer: str
     images: list[str]
+
+
+class BatchQuestion(BaseModel):
+    question: str
+    image: Optional[Base64Bytes] = None  # изображение в base64
+
+
+class BatchAnswerRequest(BaseModel):
+    questions: list[BatchQuestion] = Field(min_length=1)
+    collection: Optional[str] = Field(None, pattern=COLLECTION_PATTERN)
+
+
+class BatchAnswerResponse(BaseModel):
+    answers: list[AnswerResponse]
+
+
+class CollectionInfo(BaseModel):
+    name: str
+    chunks: int
@@ -1,17 +1,38 @@
 import io
+import threading
+from typing import Iterable
+from urllib.parse import quote
 
 from fastapi import Depends
 from loguru import logger
+from minio.deleteobjects import DeleteObject
 
 from configs import Minio
-from configs.Minio import get_minio_client, base_bucket
-from utils.types import MinioContentType
+from configs.Minio import (
+    get_minio_client,
+    base_bucket,
+    link_mode,
+    link_expires,
+    link_min_ttl,
+    public_url,
+)
+from utils.metrics import CACHE_REQUESTS
+from utils.types import MinioContentType, MinioLinkMode
+from utils.utils import TTLCache
+
+# Подписанная ссылка отдается из кэша, пока до ее истечения остается не меньше link_min_ttl.
+_link_cache = TTLCache(
+    ttl=max((link_expires - link_min_ttl).total_seconds(), 0),
+)
+
+# Бакеты, существование которых уже проверено в этом процессе.
+_known_buckets: set[str] = set()
+_known_buckets_lock = threading.Lock()
 
 
 class MinioService:
     def __init__(self, client: Minio = Depends(get_minio_client)):
         self._client = client
-        self.create_bucket(base_bucket)
 
     def create_object_from_byte(
         self,
@@ -21,6 +42,7 @@ class MinioService:
         bucket_name: str = base_bucket,
     ) -> str:
         logger.debug("Minio - Service - create_object_from_byte")
+        self.create_bucket(bucket_name)
         self._client.put_object(
             bucket_name,
             object_path,
@@ -39,6 +61,7 @@ class MinioService:
         bucket_name: str = base_bucket,
     ) -> str:
         logger.debug("Minio - Service - create_object_from_file")
+        self.create_bucket(bucket_name)
         self._client.fput_object(
             bucket_name,
             object_path,
@@ -48,14 +71,60 @@ class MinioService:
 
         return object_path
 
+    def download_object(
+        self, object_path: str, file: str, bucket_name: str = base_bucket
+    ) -> str:
+        logger.debug("Minio - Service - download_object")
+        stat = self._client.fget_object(bucket_name, object_path, file)
+
+        return stat.content_type
+
+    def remove_prefix(self, prefix: str, bucket_name: str = base_bucket):
+        logger.debug("Minio - Service - remove_prefix")
+        objects = self._client.list_objects(bucket_name, prefix=prefix, recursive=True)
+        self._remove(bucket_name, (obj.object_name for obj in objects))
+
+    def remove_objects(self, object_paths: list[str], bucket_name: str = base_bucket):
+        logger.debug("Minio - Service - remove_objects")
+        self._remove(bucket_name, object_paths)
+
+    def _remove(self, bucket_name: str, object_paths: Iterable[str]):
+        errors = self._client.remove_objects(
+            bucket_name, (DeleteObject(path) for path in object_paths)
+        )
+        # remove_objects ленивый: удаление выполняется при обходе результата.
+        for error in errors:
+            logger.error(f"Не удалось удалить объект {error.name}: {error.message}")
+
     def create_bucket(self, name: str):
+        if name in _known_buckets:
+            CACHE_REQUESTS.inc(cache="minio_bucket", result="hit")
+            return
+
         logger.debug("Minio - Service - create_bucket")
-        found = self._client.bucket_exists(name)
-        if not found:
-            self._client.make_bucket(name)
+        CACHE_REQUESTS.inc(cache="minio_bucket", result="miss")
+        with _known_buckets_lock:
+            if name in _known_buckets:
+                return
+
+            found = self._client.bucket_exists(name)
+            if not found:
+                self._client.make_bucket(name)
+
+            _known_buckets.add(name)
 
     def get_link(self, object_path: str, bucket_name: str = base_bucket) -> str:
         logger.debug("Minio - Service - get_link")
-        url = self._client.get_presigned_url("GET", bucket_name, object_path)
+        if link_mode == MinioLinkMode.PUBLIC:
+            return f"{public_url}/{bucket_name}/{quote(object_path)}"
+
+        key = (bucket_name, object_path)
+        url = _link_cache.get(key)
+        CACHE_REQUESTS.inc(cache="minio_link", result="miss" if url is None else "hit")
+        if url is None:
+            url = self._client.get_presigned_url(
+                "GET", bucket_name, object_path, expires=link_expires
+            )
+            _link_cache.set(key, url)
 
         return url
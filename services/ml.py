@@ -1,22 +1,114 @@
+import hashlib
+import math
 import shutil
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from tempfile import NamedTemporaryFile
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 
-import torch
+import numpy as np
 from fastapi import Depends, HTTPException
-from langchain_core.messages import HumanMessage, SystemMessage
 from loguru import logger
 
-from configs.YandexGPT import yandexGPT
-from ml.classificators.swear_classifier import has_swear
-from ml.classificators.toxic_classifier import is_toxic
+from configs.Admission import (
+    clip_concurrency,
+    clip_queue,
+    toxic_concurrency,
+    toxic_queue,
+)
+from configs.Answer import (
+    batch_llm_concurrency,
+    coalescing,
+    context_token_budget,
+    llm_estimate,
+)
+from configs.Retrieval import (
+    hamming_candidates,
+    rerank_candidates,
+    retrieval_mode,
+    top_paragraphs,
+)
+from configs.YandexGPT import get_llm
+from ml.classificators.swear_classifier import has_swear, has_swear_batch
+from ml.classificators.toxic_classifier import is_toxic, is_toxic_batch
 from ml.constants import SYSTEM_PROMPT, USER_PROMPT
-from ml.indexing import docs2clickhouse
-from ml.lifespan import toxic_clf, swear_clf
+from ml.context import assemble_context, estimate_tokens
+from ml.indexing import docs2clickhouse, indexing_stage
+from ml.lifespan import get_swear_clf, get_toxic_clf
+from ml.models import DEFAULT_COLLECTION
+from ml.pca import PcaProjection
 from repositories.clickhouse import ClickhouseRepository
 from repositories.ml import MlRepository
-from schemas.clickhouse import AnswerResponse
+from schemas.clickhouse import (
+    AnswerResponse,
+    ChunkWithoutEmb,
+    CollectionInfo,
+    ParagraphSchema,
+)
 from services.minio import MinioService
+from utils import deadline
+from utils.admission import AdmissionController
+from utils.coalescing import Coalescer
+from utils.metrics import (
+    CACHE_REQUESTS,
+    CONTEXT_TOKENS,
+    LLM_CALLS,
+    LLM_RETRIES,
+    stage,
+)
+from utils.types import RetrievalMode
+from utils.utils import TTLCache
+
+# Последняя проекция PCA перечитывается раз в минуту, чтобы подхватить новую версию.
+_projection_cache = TTLCache(ttl=60, maxsize=1)
+
+_MISSING = object()
+
+# Одинаковые вопросы, пришедшие пока первый еще обрабатывается, ждут его ответа.
+_answers_in_flight = Coalescer("answer")
+
+# Вызовы моделей на CPU ограничены, чтобы при всплеске нагрузки часть запросов
+# быстро получала 503, а не замедлялись все сразу.
+_clip_admission = AdmissionController("clip", clip_concurrency, clip_queue)
+
+_toxic_admission = AdmissionController("toxic", toxic_concurrency, toxic_queue)
+
+# Вызовы LLM под крайним сроком: запрос ждет ответ не дольше остатка бюджета.
+_llm_executor = ThreadPoolExecutor(thread_name_prefix="llm")
+
+FALLBACK_ANSWER = "Извините, я не уверена, что поняла ваш вопрос. Можете уточнить или переформулировать его?"
+
+
+def _question_key(
+    question: str, image: BinaryIO | None, collection: Optional[str]
+) -> tuple:
+    """
+    Ключ объединения одинаковых запросов: вопрос без учета регистра, Unicode-формы и
+    пробелов, хэш изображения и коллекция.
+    """
+    normalized = " ".join(unicodedata.normalize("NFKC", question).casefold().split())
+
+    image_hash = None
+    if image is not None:
+        position = image.tell()
+        image_hash = hashlib.file_digest(image, "sha256").hexdigest()
+        image.seek(position)
+
+    return normalized, image_hash, collection
+
+
+def _out_of_time(stage_name: str) -> bool:
+    """
+    Проверяет, исчерпан ли бюджет времени запроса; пропущенная стадия stage_name
+    отмечается в метриках.
+    """
+    if deadline.remaining() > 0:
+        return False
+
+    deadline.degrade(stage_name)
+    return True
 
 
 class MlService:
@@ -25,6 +117,7 @@ class MlService:
         clickhouse: ClickhouseRepository = Depends(),
         minio: MinioService = Depends(),
         repo: MlRepository = Depends(),
+        llm=Depends(get_llm),
     ):
         self._clickhouse = clickhouse
 
@@ -34,52 +127,294 @@ class MlService:
 
         self._top_k = 5
 
-        self._llm = yandexGPT
+        self._retrieval_mode = retrieval_mode
+
+        self._top_paragraphs = top_paragraphs
+
+        self._rerank_candidates = rerank_candidates
+
+        self._hamming_candidates = hamming_candidates
+
+        self._llm = llm
 
         self._llm_retries = 3
 
-    def indexing(self, file: BinaryIO):
+        self._llm_estimate = llm_estimate
+
+    def indexing(self, file: BinaryIO, collection: str = DEFAULT_COLLECTION):
         logger.debug("ML - Service - indexing")
         try:
             with NamedTemporaryFile(delete=True, suffix=".docx") as temp_file:
                 shutil.copyfileobj(file, temp_file)
                 temp_file.flush()
 
-                docs2clickhouse(self._clickhouse, self._minio, temp_file.name)
+                # Снимок после сборки мусора показывает память, оставшуюся после индексации.
+                with indexing_stage("job", collect=True):
+                    docs2clickhouse(
+                        self._clickhouse, self._minio, temp_file.name, collection
+                    )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    def get_answer(self, question: str, image: BinaryIO | None) -> AnswerResponse:
+    def _search_chunks(
+        self, embeddings: list[float], collection: Optional[str] = None
+    ) -> list[ChunkWithoutEmb]:
+        if self._retrieval_mode == RetrievalMode.HIERARCHICAL:
+            return self._clickhouse.get_chunk_by_emb_hierarchical(
+                embeddings, self._top_k, self._top_paragraphs, collection
+            )
+
+        if self._retrieval_mode == RetrievalMode.BINARY:
+            return self._clickhouse.get_chunk_by_emb_binary(
+                embeddings, self._top_k, self._hamming_candidates, collection
+            )
+
+        if self._retrieval_mode == RetrievalMode.REDUCED:
+            projection = self._get_projection()
+            if projection is not None:
+                return self._clickhouse.get_chunk_by_emb_reduced(
+                    embeddings,
+                    self._top_k,
+                    projection,
+                    self._rerank_candidates,
+                    collection,
+                )
+
+        return self._clickhouse.get_chunk_by_emb(embeddings, self._top_k, collection)
+
+    def _get_projection(self) -> Optional[PcaProjection]:
+        projection = _projection_cache.get("latest", _MISSING)
+        CACHE_REQUESTS.inc(
+            cache="pca_projection",
+            result="miss" if projection is _MISSING else "hit",
+        )
+        if projection is _MISSING:
+            projection = self._clickhouse.get_latest_projection()
+            _projection_cache.set("latest", projection)
+
+        return projection
+
+    def _invoke_llm(self, context: str, details: str, question: str) -> Optional[str]:
+        """
+        Вызывает LLM не дольше оставшегося бюджета времени запроса. Таймаут клиента
+        (YANDEX_GPT_TIMEOUT) может быть больше бюджета, поэтому при крайнем сроке
+        вызов идет в отдельном потоке, а запрос ждет его не дольше остатка времени.
+
+        Возвращает:
+        - Optional[str]: Ответ LLM; None, если он не успел до крайнего срока.
+        """
+        # langchain_core импортируется при первом обращении к LLM, а не при старте.
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=USER_PROMPT.format(context, details, question)),
+        ]
+        LLM_CALLS.inc()
+        with stage("answer", "llm"):
+            timeout = deadline.remaining()
+            if math.isinf(timeout):
+                return self._llm.invoke(messages).content
+
+            future = _llm_executor.submit(self._llm.invoke, messages)
+            try:
+                return future.result(timeout=timeout).content
+            except TimeoutError:
+                # Опоздавший вызов дорабатывает в фоне до таймаута клиента.
+                future.cancel()
+                deadline.degrade("llm")
+                return None
+
+    def get_collections(self) -> list[CollectionInfo]:
+        logger.debug("ML - Service - get_collections")
+        return self._clickhouse.get_collections()
+
+    def drop_collection(self, collection: str):
+        logger.debug("ML - Service - drop_collection")
+        # Изображения, сохраненные до появления коллекций, лежат вне префикса
+        # коллекции (images/{paragraph_id}/...), поэтому удаляются по путям из базы.
+        paths = self._clickhouse.get_image_paths(collection)
+        self._clickhouse.drop_collection(collection)
+        self._minio.remove_objects(paths)
+        self._minio.remove_prefix(f"images/{collection}/")
+
+    def get_answer(
+        self,
+        question: str,
+        image: BinaryIO | None,
+        collection: Optional[str] = None,
+    ) -> AnswerResponse:
         logger.debug("ML - Service - get_answer")
-        answer = "Извините, я не уверена, что поняла ваш вопрос. Можете уточнить или переформулировать его?"
+        if not coalescing:
+            return self._get_answer(question, image, collection)
 
-        if is_toxic(toxic_clf, question) or has_swear(swear_clf, question):
-            return AnswerResponse(answer=answer, images=[])
+        # Ожидающий чужой ответ запрос ждет не дольше собственного бюджета времени.
+        try:
+            return _answers_in_flight.run(
+                _question_key(question, image, collection),
+                lambda: self._get_answer(question, image, collection),
+                timeout=deadline.remaining(),
+            )
+        except TimeoutError:
+            deadline.degrade("coalesced_wait")
+            return AnswerResponse(answer=FALLBACK_ANSWER, images=[])
 
-        embeddings = self._repo.get_embeddings_from_text([question])
+    def _get_answer(
+        self,
+        question: str,
+        image: BinaryIO | None,
+        collection: Optional[str] = None,
+    ) -> AnswerResponse:
+        with _toxic_admission.admit(), stage("answer", "moderation"):
+            rejected = is_toxic(get_toxic_clf(), question) or has_swear(
+                get_swear_clf(), question
+            )
+        if rejected:
+            return AnswerResponse(answer=FALLBACK_ANSWER, images=[])
+
+        with _clip_admission.admit(), stage("answer", "text_embedding"):
+            embeddings = self._repo.get_embeddings_from_text([question])
 
         if image:
-            image_embeddings = self._repo.get_embeddings_from_image(image)
+            with _clip_admission.admit(), stage("answer", "image_embedding"):
+                image_embeddings = self._repo.get_embeddings_from_image(image)
 
-            embeddings = (torch.Tensor(embeddings) + torch.Tensor(image_embeddings)) / 2
+            embeddings = (
+                np.asarray(embeddings, dtype=np.float32)
+                + np.asarray(image_embeddings, dtype=np.float32)
+            ) / 2
 
             embeddings = embeddings.tolist()
 
-        chunks = self._clickhouse.get_chunk_by_emb(embeddings, self._top_k)
+        if _out_of_time("retrieval"):
+            return AnswerResponse(answer=FALLBACK_ANSWER, images=[])
+
+        with stage("answer", "retrieval"):
+            chunks = self._search_chunks(embeddings, collection)
+
+        return self._answer_from_chunks(question, embeddings, chunks)
+
+    def get_answers(
+        self,
+        questions: list[str],
+        images: list[BinaryIO | None],
+        collection: Optional[str] = None,
+    ) -> list[AnswerResponse]:
+        """
+        Отвечает на пачку вопросов. Модерация и эмбеддинги считаются одним проходом
+        моделей на всю пачку, поиск в режиме flat - одним запросом к ClickHouse по
+        всем векторам (в остальных режимах - отдельным запросом на вопрос), а
+        генерация ответов идет параллельно, не больше batch_llm_concurrency вызовов
+        LLM одновременно. Ответы возвращаются в порядке вопросов.
+        """
+        logger.debug("ML - Service - get_answers")
+        answers = [AnswerResponse(answer=FALLBACK_ANSWER, images=[]) for _ in questions]
+
+        with _toxic_admission.admit(), stage("answer", "moderation"):
+            rejected = [
+                toxic or swear
+                for toxic, swear in zip(
+                    is_toxic_batch(get_toxic_clf(), questions),
+                    has_swear_batch(get_swear_clf(), questions),
+                )
+            ]
+        accepted = [i for i, flag in enumerate(rejected) if not flag]
+        if not accepted:
+            return answers
+
+        with _clip_admission.admit(), stage("answer", "text_embedding"):
+            embeddings = np.asarray(
+                self._repo.get_embeddings_from_texts([questions[i] for i in accepted]),
+                dtype=np.float32,
+            )
+
+        with_image = [row for row, i in enumerate(accepted) if images[i] is not None]
+        if with_image:
+            with _clip_admission.admit(), stage("answer", "image_embedding"):
+                image_embeddings = self._repo.get_embeddings_from_images(
+                    [images[accepted[row]] for row in with_image]
+                )
+
+            embeddings[with_image] = (
+                embeddings[with_image] + np.asarray(image_embeddings, dtype=np.float32)
+            ) / 2
+
+        if _out_of_time("retrieval"):
+            return answers
+
+        # Одним запросом на пачку выполняется только точный поиск (flat); остальные
+        # режимы ищут по каждому вопросу, как get_answer.
+        with stage("answer", "retrieval"):
+            if self._retrieval_mode == RetrievalMode.FLAT:
+                chunks = self._clickhouse.get_chunks_by_embs(
+                    embeddings.tolist(), self._top_k, collection
+                )
+            else:
+                chunks = [
+                    self._search_chunks(query_vector, collection)
+                    for query_vector in embeddings.tolist()
+                ]
+
+        # Контекст копируется для каждой задачи, чтобы стадии попадали в Server-Timing.
+        with ThreadPoolExecutor(max_workers=batch_llm_concurrency) as executor:
+            futures = [
+                executor.submit(
+                    copy_context().run,
+                    self._answer_from_chunks,
+                    questions[i],
+                    query_vector,
+                    question_chunks,
+                )
+                for i, query_vector, question_chunks in zip(
+                    accepted, embeddings.tolist(), chunks
+                )
+            ]
+            for i, future in zip(accepted, futures):
+                answers[i] = future.result()
+
+        return answers
+
+    def _build_context(
+        self, paragraph: ParagraphSchema, embeddings: list[float]
+    ) -> str:
+        """
+        Собирает контекст промпта в пределах context_token_budget: из длинного
+        параграфа остаются только его чанки, ближайшие к вопросу, по уже сохраненным
+        эмбеддингам чанков.
+        """
+        CONTEXT_TOKENS.observe(estimate_tokens(paragraph.text), kind="paragraph")
+        # Бюджет 0 - весь параграф без сокращения и без запроса чанков.
+        if (
+            context_token_budget <= 0
+            or estimate_tokens(paragraph.text) <= context_token_budget
+        ):
+            context = paragraph.text
+        else:
+            chunks = self._clickhouse.get_paragraph_chunks(paragraph.id, embeddings)
+            context = assemble_context(paragraph.text, chunks, context_token_budget)
+
+        CONTEXT_TOKENS.observe(estimate_tokens(context), kind="context")
+        return context
+
+    def _answer_from_chunks(
+        self, question: str, embeddings: list[float], chunks: list[ChunkWithoutEmb]
+    ) -> AnswerResponse:
+        answer = FALLBACK_ANSWER
+
+        # В выбранной коллекции может не оказаться ни одного чанка.
+        if not chunks:
+            return AnswerResponse(answer=answer, images=[])
 
         chunk = chunks[0]
 
+        if _out_of_time("llm"):
+            return AnswerResponse(answer=answer, images=[])
+
         if 0.7 < chunk.cos_dist < 0.8:
-            answer = self._llm.invoke(
-                [
-                    SystemMessage(content=SYSTEM_PROMPT),
-                    HumanMessage(
-                        content=USER_PROMPT.format(
-                            "Данные не найдены", "Данные не найдены", question
-                        )
-                    ),
-                ]
-            ).content
+            answer = (
+                self._invoke_llm("Данные не найдены", "Данные не найдены", question)
+                or FALLBACK_ANSWER
+            )
 
             logger.info(
                 f"answer = {answer} \n\n chunk = {chunk}, 0.8 < chunk.cos_dist < 0.9"
@@ -91,18 +426,14 @@ class MlService:
             )
 
         elif chunk.cos_dist < 0.7:
-            answer = self._llm.invoke(
-                [
-                    SystemMessage(content=SYSTEM_PROMPT),
-                    HumanMessage(
-                        content=USER_PROMPT.format(
-                            "Обратитесь к технической поддержке",
-                            "Обратитесь к технической поддержке",
-                            question,
-                        )
-                    ),
-                ]
-            ).content
+            answer = (
+                self._invoke_llm(
+                    "Обратитесь к технической поддержке",
+                    "Обратитесь к технической поддержке",
+                    question,
+                )
+                or FALLBACK_ANSWER
+            )
 
             logger.info(f"answer = {answer} \n chunk = {chunk}, chunk.cos_dist < 0.8")
 
@@ -111,32 +442,60 @@ class MlService:
                 images=[],
             )
 
-        paragraph = self._clickhouse.get_paragraph(chunk.paragraph_id)
+        with stage("answer", "paragraph"):
+            paragraph = self._clickhouse.get_paragraph(chunk.paragraph_id)
 
+        with stage("answer", "context"):
+            context = self._build_context(paragraph, embeddings)
+        # Найденный чанк уже входит в контекст и отдельно не повторяется.
+        details = "" if chunk.text in context else chunk.text
+
+        # Повтор начинается, только если до крайнего срока успеет пройти еще одна
+        # попытка: оценка - не меньше длительности предыдущей попытки этого запроса.
+        attempt_seconds = self._llm_estimate
         for i in range(self._llm_retries):
-            local_answer = self._llm.invoke(
-                [
-                    SystemMessage(content=SYSTEM_PROMPT),
-                    HumanMessage(
-                        content=USER_PROMPT.format(paragraph.text, chunk.text, question)
-                    ),
-                ]
-            ).content
+            if i:
+                if not deadline.fits(attempt_seconds):
+                    deadline.degrade("llm_retry")
+                    break
+                LLM_RETRIES.inc()
+
+            attempt_start = time.perf_counter()
+
+            local_answer = self._invoke_llm(context, details, question)
+            if local_answer is None or _out_of_time("metric"):
+                break
 
-            metric = self._repo.get_metric(paragraph.text, local_answer)
+            with _clip_admission.admit(shed=False), stage("answer", "metric"):
+                metric = self._repo.get_metric(paragraph.text, local_answer)
             logger.info(
                 f"answer = {local_answer} \n chunk = {chunk} \n\n paragraph = {paragraph.text} \n\n metric = {metric}"
             )
 
-            if (
-                metric > 0.4
-                and not is_toxic(toxic_clf, local_answer)
-                and not has_swear(swear_clf, local_answer)
-            ):
-                answer = local_answer
-                break
+            if metric > 0.4:
+                if _out_of_time("answer_moderation"):
+                    break
+                with (
+                    _toxic_admission.admit(shed=False),
+                    stage("answer", "answer_moderation"),
+                ):
+                    accepted = not is_toxic(
+                        get_toxic_clf(), local_answer
+                    ) and not has_swear(get_swear_clf(), local_answer)
+                if accepted:
+                    answer = local_answer
+                    break
+
+            attempt_seconds = max(
+                self._llm_estimate, time.perf_counter() - attempt_start
+            )
+
+        with stage("answer", "links"):
+            images = [
+                self._minio.get_link(path) for _, path in paragraph.images.items()
+            ]
 
         return AnswerResponse(
             answer=answer,
-            images=[self._minio.get_link(path) for _, path in paragraph.images.items()],
+            images=images,
         )
@@ -1,23 +1,13 @@
 from loguru import logger
-from minio import Minio
 
-from configs.Environment import get_environment_variables
+from configs.Minio import minio_client
 from ml.indexing import docs2clickhouse
 from repositories.clickhouse import ClickhouseRepository
 from services.minio import MinioService
 
 repo = ClickhouseRepository()
 
-env = get_environment_variables()
-
-minio_client = Minio(
-    env.MINIO_HOST,
-    access_key=env.MINIO_ACCESS,
-    secret_key=env.MINIO_SECRET,
-    secure=False if env.ENV == "LOCAL" else True,
-)
-
-static_storage = MinioService(minio_client)
+static_storage = MinioService(minio_client())
 
 # embedding_generator = EmbeddingGenerator()
 #
@@ -0,0 +1,201 @@
+"""
+Микробенчмарки чанкеров, эмбеддеров, классификаторов и поиска по ClickHouse.
+
+Бенчмарки не входят в обычный прогон тестов и запускаются явно:
+
+    make bench                 # сравнение с сохраненным baseline
+    make bench-baseline        # перезапись baseline на текущей машине
+
+Результат каждого бенчмарка (медиана по раундам) сравнивается с baseline из
+.benchmarks/baseline.json; если медиана хуже baseline больше чем на
+--bench-tolerance, тест падает. Baseline зависит от машины и в репозиторий
+не коммитится.
+"""
+
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / ".benchmarks" / "baseline.json"
+
+_results: Dict[str, Dict[str, float]] = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Запустить микробенчмарки из tests/benchmarks.",
+    )
+    group.addoption(
+        "--bench-size",
+        type=int,
+        default=int(os.environ.get("BENCH_SIZE", 200)),
+        help="Количество разделов в синтетическом корпусе.",
+    )
+    group.addoption(
+        "--bench-rounds",
+        type=int,
+        default=5,
+        help="Количество замеров на бенчмарк.",
+    )
+    group.addoption(
+        "--bench-tolerance",
+        type=float,
+        default=0.25,
+        help="Допустимое ухудшение медианы относительно baseline (доля).",
+    )
+    group.addoption(
+        "--bench-save",
+        action="store_true",
+        default=False,
+        help="Сохранить результаты как новый baseline вместо сравнения.",
+    )
+    group.addoption(
+        "--bench-clickhouse",
+        default=os.environ.get("BENCH_CLICKHOUSE", "localhost:8123"),
+        help="host:port локального ClickHouse для бенчмарков поиска.",
+    )
+
+
+def _option(config, name: str, default=None):
+    # Опции регистрируются только если conftest загружен при старте pytest
+    # (pytest tests/benchmarks ...), поэтому читаем их с значением по умолчанию.
+    try:
+        return config.getoption(name)
+    except ValueError:
+        return default
+
+
+def pytest_collection_modifyitems(config, items):
+    if _option(config, "--run-benchmarks", False):
+        return
+
+    skip = pytest.mark.skip(reason="бенчмарки запускаются с --run-benchmarks")
+    for item in items:
+        if "benchmarks" in item.nodeid.split("/"):
+            item.add_marker(skip)
+
+
+def _load_baseline() -> Dict[str, Dict[str, float]]:
+    if not BASELINE_PATH.exists():
+        return {}
+    with BASELINE_PATH.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Benchmark:
+    """
+    Замер времени выполнения функции по нескольким раундам с прогревом.
+
+    Параметры:
+    - name (str): Ключ бенчмарка в baseline.
+    - rounds (int): Количество замеров.
+    - tolerance (float): Допустимое ухудшение медианы относительно baseline.
+    - baseline (Dict[str, float] | None): Сохраненный результат бенчмарка.
+    - save (bool): Сохранять результат вместо сравнения.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rounds: int,
+        tolerance: float,
+        baseline: Dict[str, float] | None,
+        save: bool,
+    ):
+        self.name = name
+        self.rounds = rounds
+        self.tolerance = tolerance
+        self.baseline = baseline
+        self.save = save
+        self.stats: Dict[str, float] = {}
+
+    def __call__(self, func: Callable, *args, warmup: int = 1, **kwargs):
+        for _ in range(warmup):
+            func(*args, **kwargs)
+
+        timings = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        self.stats = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "rounds": self.rounds,
+        }
+        _results[self.name] = self.stats
+
+        if not self.save and self.baseline:
+            limit = self.baseline["median"] * (1 + self.tolerance)
+            if self.stats["median"] > limit:
+                pytest.fail(
+                    f"Регрессия {self.name}: медиана {self.stats['median']:.4f}s, "
+                    f"baseline {self.baseline['median']:.4f}s "
+                    f"(допуск {self.tolerance:.0%})"
+                )
+        return result
+
+
+@pytest.fixture(scope="session")
+def bench_size(pytestconfig) -> int:
+    return _option(pytestconfig, "--bench-size", 200)
+
+
+@pytest.fixture(scope="session")
+def bench_clickhouse(pytestconfig) -> str:
+    return _option(pytestconfig, "--bench-clickhouse", "localhost:8123")
+
+
+@pytest.fixture(scope="session")
+def bench_baseline() -> Dict[str, Dict[str, float]]:
+    return _load_baseline()
+
+
+@pytest.fixture
+def benchmark(request, bench_size, bench_baseline) -> Benchmark:
+    config = request.config
+    name = f"{request.node.nodeid}[size={bench_size}]"
+    return Benchmark(
+        name=name,
+        rounds=_option(config, "--bench-rounds", 5),
+        tolerance=_option(config, "--bench-tolerance", 0.25),
+        baseline=bench_baseline.get(name),
+        save=_option(config, "--bench-save", False),
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results or not _option(session.config, "--bench-save", False):
+        return
+
+    baseline = _load_baseline()
+    baseline.update(_results)
+    BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with BASELINE_PATH.open("w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+
+    terminalreporter.section("benchmarks")
+    width = max(len(name) for name in _results)
+    for name, stats in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name:<{width}}  median {stats['median'] * 1000:10.2f} ms"
+            f"  min {stats['min'] * 1000:10.2f} ms"
+        )
+    if _option(terminalreporter.config, "--bench-save", False):
+        terminalreporter.write_line(f"baseline сохранен в {BASELINE_PATH}")
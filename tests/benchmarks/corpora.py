@@ -0,0 +1,55 @@
+import random
+from typing import List
+
+import numpy as np
+
+_WORDS = (
+    "конфигурация безопасность система пользователь настройка сервер доступ "
+    "политика профиль агент отчет проверка параметр значение раздел таблица "
+    "инструкция компонент модуль сканирование уязвимость журнал событие роль "
+    "администратор интерфейс кнопка окно вкладка список фильтр шаблон версия"
+).split()
+
+
+def make_sentence(rnd: random.Random, min_words: int = 5, max_words: int = 25) -> str:
+    words = [rnd.choice(_WORDS) for _ in range(rnd.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_paragraph(rnd: random.Random) -> str:
+    """
+    Генерирует текст раздела руководства: предложения, списки и подписи к рисункам,
+    разделенные переводами строк, как в тексте, собранном parse_docx.
+    """
+    lines = []
+    for _ in range(rnd.randint(3, 40)):
+        kind = rnd.random()
+        if kind < 0.15:
+            lines.append(f"Рисунок {rnd.randint(1, 200)} - {make_sentence(rnd, 2, 6)}")
+        elif kind < 0.35:
+            lines.append(f"- {make_sentence(rnd, 3, 10)}")
+        else:
+            lines.append(" ".join(make_sentence(rnd) for _ in range(rnd.randint(1, 5))))
+    return "\n".join(lines)
+
+
+def make_corpus(n_paragraphs: int, seed: int = 0) -> List[str]:
+    """
+    Генерирует детерминированный синтетический корпус из n_paragraphs разделов.
+    """
+    rnd = random.Random(seed)
+    return [make_paragraph(rnd) for _ in range(n_paragraphs)]
+
+
+def make_questions(n: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    return [make_sentence(rnd, 4, 12).rstrip(".") + "?" for _ in range(n)]
+
+
+def make_embeddings(n: int, dim: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Генерирует n нормированных эмбеддингов float32.
+    """
+    embeddings = np.random.default_rng(seed).standard_normal((n, dim), np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from ml.chunkers import RecursiveChunker, SentenceChunker
+from ml.constants import CHUNKER_OPTIONS
+from tests.benchmarks.corpora import make_corpus
+
+SENTENCE_MODEL = os.environ.get("BENCH_SENTENCE_MODEL", "ai-forever/sbert_large_nlu_ru")
+
+
+@pytest.fixture(scope="module")
+def corpus(bench_size):
+    return make_corpus(bench_size)
+
+
+@pytest.fixture(scope="module")
+def sentence_chunker():
+    try:
+        return SentenceChunker(model_name=SENTENCE_MODEL, tokens_per_chunk=256)
+    except OSError as e:
+        pytest.skip(f"Токенизатор {SENTENCE_MODEL} недоступен: {e}")
+
+
+@pytest.mark.parametrize("chunk_size", [128, 256, 1024])
+def test_recursive_split(benchmark, corpus, chunk_size):
+    chunker = RecursiveChunker(chunk_size=chunk_size, chunk_overlap=chunk_size // 8)
+    chunks = benchmark(lambda: [chunker.split_text(text) for text in corpus])
+    assert all(chunks)
+
+
+def test_recursive_create_documents(benchmark, corpus):
+    chunker = RecursiveChunker(**dict(CHUNKER_OPTIONS), add_start_index=True)
+    documents = benchmark(chunker.create_documents, corpus)
+    assert documents
+
+
+def test_recursive_iter_split_long_text(benchmark, corpus):
+    chunker = RecursiveChunker(**dict(CHUNKER_OPTIONS))
+    text = "\n\n".join(corpus)
+    count = benchmark(lambda: sum(1 for _ in chunker.iter_split(text)))
+    assert count
+
+
+def test_sentence_split(benchmark, corpus, sentence_chunker):
+    chunks = benchmark(lambda: [sentence_chunker.split_text(text) for text in corpus])
+    assert all(chunks)
+
+
+def test_sentence_create_documents(benchmark, corpus, sentence_chunker):
+    documents = benchmark(sentence_chunker.create_documents, corpus)
+    assert documents
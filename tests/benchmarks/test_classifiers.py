@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from ml.constants import TOXIC_CLF_PATH
+from tests.benchmarks.corpora import make_questions
+
+pytest.importorskip("torch")
+
+QUESTIONS = make_questions(32)
+
+
+@pytest.fixture(scope="module")
+def toxic_clf():
+    if not os.path.isdir(TOXIC_CLF_PATH):
+        pytest.skip(f"Модель {TOXIC_CLF_PATH} не загружена, см. make load-models")
+
+    from ml.classificators.toxic_classifier import load_toxic_model
+
+    return load_toxic_model(TOXIC_CLF_PATH)
+
+
+@pytest.fixture(scope="module")
+def swear_model():
+    pytest.importorskip("check_swear")
+
+    from ml.classificators.swear_classifier import load_swear_model
+
+    return load_swear_model()
+
+
+def test_is_toxic(benchmark, toxic_clf):
+    from ml.classificators.toxic_classifier import is_toxic
+
+    benchmark(lambda: [is_toxic(toxic_clf, question) for question in QUESTIONS])
+
+
+def test_has_swear(benchmark, swear_model):
+    from ml.classificators.swear_classifier import has_swear
+
+    benchmark(lambda: [has_swear(swear_model, question) for question in QUESTIONS])
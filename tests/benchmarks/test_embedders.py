@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from tests.benchmarks.corpora import make_questions
+
+pytest.importorskip("torch")
+pytest.importorskip("open_clip")
+
+from PIL import Image  # noqa: E402
+
+from ml.embedders import EmbeddingGenerator  # noqa: E402
+
+BATCH_SIZES = [1, 8, 32]
+
+
+@pytest.fixture(scope="module")
+def generator():
+    try:
+        return EmbeddingGenerator()
+    except RuntimeError as e:
+        pytest.skip(f"Модель OpenCLIP недоступна: {e}")
+
+
+def make_images(n: int, size: int = 512, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_text_embedding(benchmark, generator, batch_size):
+    texts = make_questions(batch_size)
+    embeddings = benchmark(generator.get_text_embedding, texts)
+    assert embeddings.shape[0] == batch_size
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_image_embedding(benchmark, generator, batch_size):
+    images = make_images(batch_size)
+    embeddings = benchmark(generator.get_image_embedding, images)
+    assert embeddings.shape[0] == batch_size
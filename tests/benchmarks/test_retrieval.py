@@ -0,0 +1,128 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from ml.models import ChunkBatch, uuid4_array
+from ml.pca import PcaProjection
+from tests.benchmarks.corpora import make_embeddings, make_questions
+
+clickhouse_connect = pytest.importorskip("clickhouse_connect")
+
+BENCH_DATABASE = "rag_bench"
+CHUNKS_PER_PARAGRAPH = 50
+PCA_DIM = 96
+
+SCHEMA_PATH = (
+    Path(__file__).resolve().parents[2]
+    / ".docker"
+    / "clickhouse"
+    / "init-clickhouse.sql"
+)
+
+
+def schema_statements() -> List[str]:
+    """
+    Запросы CREATE TABLE из init-clickhouse.sql: бенчмарк работает на той же схеме
+    таблиц, что и сервис.
+    """
+    statements = []
+    for statement in SCHEMA_PATH.read_text(encoding="utf-8").split(";"):
+        lines = [
+            line
+            for line in statement.splitlines()
+            if not line.lstrip().startswith("--")
+        ]
+        statement = "\n".join(lines).strip()
+        if statement.startswith("CREATE TABLE"):
+            statements.append(statement)
+    return statements
+
+
+@pytest.fixture(scope="module")
+def repository(bench_clickhouse, bench_size):
+    """
+    Поднимает отдельную базу в локальном ClickHouse, заполняет таблицу chunk
+    синтетическими эмбеддингами и удаляет базу после бенчмарков.
+    """
+    host, _, port = bench_clickhouse.partition(":")
+    try:
+        client = clickhouse_connect.get_client(host=host, port=int(port or 8123))
+        # База пересоздается, чтобы схема всегда совпадала с init-clickhouse.sql.
+        client.command(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+        client.command(f"CREATE DATABASE {BENCH_DATABASE}")
+        client = clickhouse_connect.get_client(
+            host=host, port=int(port or 8123), database=BENCH_DATABASE
+        )
+    except Exception as e:
+        pytest.skip(f"Локальный ClickHouse недоступен: {e}")
+
+    try:
+        from repositories.clickhouse import ClickhouseRepository
+    except Exception as e:
+        pytest.skip(f"Не удалось импортировать ClickhouseRepository: {e}")
+
+    for statement in schema_statements():
+        client.command(statement)
+
+    repo = ClickhouseRepository()
+    repo._client = client
+
+    n = bench_size * CHUNKS_PER_PARAGRAPH
+    batch = ChunkBatch(
+        texts=make_questions(n),
+        paragraph_ids=np.repeat(uuid4_array(bench_size), CHUNKS_PER_PARAGRAPH),
+        embeddings=make_embeddings(n),
+    )
+    projection = PcaProjection.fit(batch.embeddings, PCA_DIM, version=1)
+    repo.create_projection(projection)
+    repo.create_chunks(batch, projection)
+    repo.create_paragraph_centroids(*batch.paragraph_centroids())
+
+    yield repo
+
+    client.command(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+
+
+@pytest.mark.parametrize("top_k", [5, 20])
+def test_get_chunk_by_emb(benchmark, repository, top_k):
+    query = make_embeddings(1, seed=1)[0].tolist()
+    chunks = benchmark(repository.get_chunk_by_emb, query, top_k)
+    assert len(chunks) == top_k
+
+
+@pytest.mark.parametrize("top_paragraphs", [4, 16])
+def test_get_chunk_by_emb_hierarchical(benchmark, repository, top_paragraphs):
+    query = make_embeddings(1, seed=1)[0].tolist()
+    chunks = benchmark(
+        repository.get_chunk_by_emb_hierarchical, query, 5, top_paragraphs
+    )
+    assert len(chunks) == 5
+
+
+@pytest.mark.parametrize("candidates", [100, 400])
+def test_get_chunk_by_emb_binary(benchmark, repository, candidates):
+    query = make_embeddings(1, seed=1)[0].tolist()
+    chunks = benchmark(repository.get_chunk_by_emb_binary, query, 5, candidates)
+    assert len(chunks) == 5
+
+
+@pytest.mark.parametrize("candidates", [50, 200])
+def test_get_chunk_by_emb_reduced(benchmark, repository, candidates):
+    query = make_embeddings(1, seed=1)[0].tolist()
+    projection = repository.get_latest_projection()
+    chunks = benchmark(
+        repository.get_chunk_by_emb_reduced, query, 5, projection, candidates
+    )
+    assert len(chunks) == 5
+
+
+def test_create_chunks(benchmark, repository, bench_size):
+    n = bench_size
+    batch = ChunkBatch(
+        texts=make_questions(n, seed=2),
+        paragraph_ids=uuid4_array(n),
+        embeddings=make_embeddings(n, seed=2),
+    )
+    benchmark(repository.create_chunks, batch)
@@ -0,0 +1,64 @@
+import pstats
+import time
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.profiling import (
+    PROFILE_ID_HEADER,
+    ProfiledRoute,
+    finish_profile,
+    start_profile,
+)
+from utils.types import ProfilingMode
+
+
+def profiled_handler_work() -> int:
+    # Заметная работа, чтобы семплер успел снять стек обработчика.
+    total = 0
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+def make_client(mode: ProfilingMode, directory) -> TestClient:
+    # Та же схема, что и в app.py: middleware создает профиль, маршрут включает его.
+    app = FastAPI()
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.post("/api/sync")
+    def sync_handler():
+        return {"total": profiled_handler_work()}
+
+    app.include_router(router)
+
+    @app.middleware("http")
+    async def profiling(request: Request, call_next):
+        profile = start_profile(mode, 0.001)
+        try:
+            response = await call_next(request)
+        finally:
+            name = finish_profile(profile, directory, request.url.path, 10)
+        response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+    return TestClient(app)
+
+
+def test_cprofile_records_sync_handler(tmp_path):
+    response = make_client(ProfilingMode.CPROFILE, tmp_path).post("/api/sync")
+
+    assert response.status_code == 200
+    stats = pstats.Stats(str(tmp_path / response.headers[PROFILE_ID_HEADER]))
+    functions = {name for _, _, name in stats.stats}
+    assert "sync_handler" in functions
+    assert "profiled_handler_work" in functions
+
+
+def test_sampling_follows_sync_handler_thread(tmp_path):
+    response = make_client(ProfilingMode.SAMPLING, tmp_path).post("/api/sync")
+
+    assert response.status_code == 200
+    stacks = (tmp_path / response.headers[PROFILE_ID_HEADER]).read_text()
+    assert "profiled_handler_work" in stacks
@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from errors.errors import ErrOverloaded
+from utils import deadline
+from utils.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    stage,
+)
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременных вызовов модели и длину очереди к ней.
+
+    Вызовы сверх concurrency ждут в очереди в порядке поступления. Если очередь
+    заполнена или ожидаемое время ожидания не укладывается в бюджет времени
+    запроса, запрос сразу отклоняется с ErrOverloaded (503 с Retry-After), а не
+    замедляет остальные запросы на тех же ядрах.
+
+    Параметры:
+    - name (str): Название модели для метрик.
+    - concurrency (int): Максимум одновременных вызовов; 0 - без ограничения.
+    - queue_size (int): Максимум ожидающих вызовов.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        # Скользящее среднее длительности вызова, по нему оценивается ожидание.
+        self._service_seconds = 0.0
+
+    def _expected_wait(self, position: int) -> float:
+        return math.ceil(position / self.concurrency) * self._service_seconds
+
+    def _reject(self, reason: str, expected_wait: float):
+        ADMISSION_REJECTED.inc(model=self.name, reason=reason)
+        raise ErrOverloaded(
+            f"Модель {self.name} перегружена, повторите запрос позже.",
+            retry_after=max(math.ceil(expected_wait), 1),
+        )
+
+    @contextmanager
+    def admit(self, shed: bool = True):
+        """
+        Занимает слот модели на время блока.
+
+        Параметры:
+        - shed (bool): Отклонять ли вызов при перегрузке. Без shed вызов ждет своей
+          очереди без ограничений: так стоит вызывать модель, когда основная работа
+          запроса (например, ответ LLM) уже сделана.
+        """
+        if self.concurrency <= 0:
+            yield
+            return
+
+        with self._cond:
+            # Новый вызов не обгоняет уже ожидающих, даже если слот освободился.
+            if self._active >= self.concurrency or self._waiting:
+                expected_wait = self._expected_wait(self._waiting + 1)
+                if shed and self._waiting >= self.queue_size:
+                    self._reject("queue_full", expected_wait)
+                if shed and expected_wait > deadline.remaining():
+                    self._reject("deadline", expected_wait)
+
+                remaining = deadline.remaining() if shed else math.inf
+                self._waiting += 1
+                ADMISSION_QUEUE_DEPTH.set(self._waiting, model=self.name)
+                try:
+                    with stage("admission", f"{self.name}_queue"):
+                        admitted = self._cond.wait_for(
+                            lambda: self._active < self.concurrency,
+                            None if math.isinf(remaining) else remaining,
+                        )
+                finally:
+                    self._waiting -= 1
+                    ADMISSION_QUEUE_DEPTH.set(self._waiting, model=self.name)
+                if not admitted:
+                    self._reject("deadline", self._expected_wait(self._waiting + 1))
+
+            self._active += 1
+            ADMISSION_ACTIVE.set(self._active, model=self.name)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._active -= 1
+                ADMISSION_ACTIVE.set(self._active, model=self.name)
+                self._service_seconds = (
+                    0.8 * self._service_seconds + 0.2 * elapsed
+                    if self._service_seconds
+                    else elapsed
+                )
+                self._cond.notify()
@@ -0,0 +1,78 @@
+import math
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from utils.metrics import COALESCED_REQUESTS, stage
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class Coalescer:
+    """
+    Объединяет одновременные одинаковые вычисления.
+
+    Первый вызов с ключом выполняет функцию, а вызовы с тем же ключом, пришедшие
+    до ее завершения, ждут и получают тот же результат (или то же исключение).
+    Результат не кэшируется: после завершения следующий вызов снова считает.
+
+    Параметры:
+    - name (str): Название для метрик и Server-Timing.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def run(
+        self, key: Hashable, func: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Выполняет func или ждет уже выполняющийся вызов с тем же ключом.
+
+        Параметры:
+        - key (Hashable): Ключ одинаковых вычислений.
+        - func (Callable): Вычисление.
+        - timeout (Optional[float]): Сколько ждать чужой вызов; None или бесконечность -
+          без ограничения. По истечении ожидания выбрасывается TimeoutError, сам
+          вызов продолжает выполняться.
+        """
+        if timeout is not None and math.isinf(timeout):
+            timeout = None
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            COALESCED_REQUESTS.inc(name=self.name)
+            with stage(self.name, "coalesced_wait"):
+                finished = call.done.wait(timeout)
+            if not finished:
+                raise TimeoutError(
+                    f"{self.name}: ожидание результата превысило {timeout} с"
+                )
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
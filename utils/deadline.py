@@ -0,0 +1,92 @@
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.metrics import (
+    DEADLINE_BUDGET_SECONDS,
+    DEADLINE_DEGRADED,
+    DEADLINE_REMAINING_SECONDS,
+)
+
+
+class Deadline:
+    """
+    Крайний срок обработки запроса.
+
+    Параметры:
+    - pipeline (str): Название пайплайна для метрик.
+    - budget (float): Бюджет времени в секундах от момента создания.
+    """
+
+    def __init__(self, pipeline: str, budget: float):
+        self.pipeline = pipeline
+        self.budget = budget
+        self._expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(self._expires_at - time.monotonic(), 0.0)
+
+    def fits(self, seconds: float) -> bool:
+        """
+        Успеет ли операция длительностью seconds завершиться до крайнего срока.
+        """
+        return self.remaining() >= seconds
+
+    def degrade(self, stage: str):
+        """
+        Отмечает, что стадия stage пропущена или урезана из-за нехватки времени.
+        """
+        DEADLINE_DEGRADED.inc(pipeline=self.pipeline, stage=stage)
+
+
+# Крайний срок текущего запроса. Пул потоков FastAPI и пул пачки ответов копируют
+# контекст, поэтому срок виден во всех стадиях запроса.
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def remaining() -> float:
+    """
+    Оставшееся время текущего запроса; без крайнего срока - бесконечность.
+    """
+    deadline = _deadline.get()
+    return deadline.remaining() if deadline is not None else math.inf
+
+
+def fits(seconds: float) -> bool:
+    return remaining() >= seconds
+
+
+def degrade(stage: str):
+    deadline = _deadline.get()
+    if deadline is not None:
+        deadline.degrade(stage)
+
+
+@contextmanager
+def request_deadline(pipeline: str, budget: float):
+    """
+    Устанавливает крайний срок на время обработки запроса. Бюджет 0 отключает
+    ограничение. Бюджет и остаток времени по завершении пишутся в метрики.
+
+    Параметры:
+    - pipeline (str): Название пайплайна (маршрута) для метрик.
+    - budget (float): Бюджет времени в секундах.
+    """
+    if budget <= 0:
+        yield None
+        return
+
+    deadline = Deadline(pipeline, budget)
+    DEADLINE_BUDGET_SECONDS.set(budget, pipeline=pipeline)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+        DEADLINE_REMAINING_SECONDS.observe(deadline.remaining(), pipeline=pipeline)
@@ -0,0 +1,95 @@
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+# Тяжелые зависимости, которые не должны импортироваться при старте приложения:
+# они загружаются вместе с моделями или при первом обращении к клиенту.
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "open_clip",
+    "check_swear",
+    "langchain_core",
+    "yandex_cloud_ml_sdk",
+    "docx",
+    "PIL",
+    "clickhouse_connect",
+)
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Разбирает вывод python -X importtime. Глубина вложенности импорта определяется
+    по отступу имени модуля.
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(
+            ImportRecord(module, int(self_us), int(cumulative_us), max(depth, 0))
+        )
+    return records
+
+
+def measure(module: str) -> List[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Не удалось импортировать {module}:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def report(module: str, records: List[ImportRecord], top: int) -> str:
+    by_name = {record.module: record for record in records}
+    total = sum(record.cumulative_us for record in records if record.depth == 0)
+
+    packages: Dict[str, int] = defaultdict(int)
+    for record in records:
+        packages[record.module.split(".")[0]] += record.self_us
+
+    lines = [
+        f"Импорт {module}: {total / 1000:.1f} ms, модулей {len(records)}",
+        "",
+        f"Пакеты по собственному времени импорта (top {top}):",
+    ]
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {self_us / 1000:9.1f} ms  {package}")
+
+    lines += ["", "Тяжелые зависимости:"]
+    for name in HEAVY_MODULES:
+        record = by_name.get(name)
+        status = (
+            f"импортирован, {record.cumulative_us / 1000:.1f} ms"
+            if record
+            else "не импортирован"
+        )
+        lines.append(f"  {name}: {status}")
+
+    return "\n".join(lines)
+
+
+# Отчет о времени импорта приложения:
+#   python -m utils.importtime --module app --top 20
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m utils.importtime")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    print(report(args.module, measure(args.module), args.top))
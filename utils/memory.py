@@ -0,0 +1,185 @@
+import gc
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, Optional
+
+from loguru import logger
+
+from utils.metrics import (
+    PROCESS_PEAK_RSS_BYTES,
+    STAGE_MEMORY_DELTA_BYTES,
+    STAGE_MEMORY_PEAK_BYTES,
+    STAGE_RSS_BYTES,
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# tracemalloc хранит один счетчик пика на процесс. Для вложенных стадий пик каждой
+# открытой стадии накапливается в стеке: при выходе из вложенной стадии ее пик
+# передается родителю, а счетчик сбрасывается. Параллельные индексации в одном
+# процессе все равно смешиваются, поэтому учет памяти стоит включать на время
+# отдельных прогонов.
+_peaks: List[int] = []
+_peaks_lock = threading.Lock()
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Возвращает текущий RSS процесса (Linux), либо None, если он недоступен.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def current_shared_bytes() -> Optional[int]:
+    """
+    Возвращает резидентную память процесса, отображенную из файлов и разделяемую
+    с другими процессами (Linux), либо None, если она недоступна.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[2]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    """
+    Возвращает пиковый RSS процесса за все время работы.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На Linux ru_maxrss в килобайтах, на macOS - в байтах.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RssSampler:
+    """
+    Фоновый поток, отслеживающий максимальный RSS за время стадии: ru_maxrss
+    хранит пик за всю жизнь процесса и не сбрасывается между стадиями.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.peak = current_rss_bytes() or 0
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rss-sampler", daemon=True
+        )
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+
+def _format_bytes(value: float) -> str:
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def _top_allocations(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int
+) -> List[str]:
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, threading.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    stats = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "lineno"
+    )
+    return [str(stat) for stat in stats[:limit] if stat.size_diff > 0]
+
+
+@contextmanager
+def track_memory(
+    pipeline: str,
+    name: str,
+    enabled: bool,
+    top: int = 10,
+    frames: int = 1,
+    collect: bool = False,
+):
+    """
+    Замеряет память стадии пайплайна: прирост и пик памяти Python по tracemalloc,
+    пиковый RSS за время стадии и основные места аллокаций.
+
+    Результаты пишутся в лог и в метрики rag_stage_memory_*. Без enabled
+    контекстный менеджер ничего не делает.
+
+    Параметры:
+    - pipeline (str): Название пайплайна.
+    - name (str): Название стадии.
+    - enabled (bool): Включен ли учет памяти.
+    - top (int): Количество мест аллокаций в отчете.
+    - frames (int): Глубина стека, сохраняемая tracemalloc для каждой аллокации.
+    - collect (bool): Запустить сборщик мусора перед итоговым снимком, чтобы
+      прирост показывал память, оставшуюся после стадии (поиск утечек).
+    """
+    if not enabled:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+    with _peaks_lock:
+        if _peaks:
+            _peaks[-1] = max(_peaks[-1], tracemalloc.get_traced_memory()[1])
+        _peaks.append(0)
+        tracemalloc.reset_peak()
+
+    before = tracemalloc.take_snapshot()
+    traced_before, _ = tracemalloc.get_traced_memory()
+    rss_before = current_rss_bytes()
+
+    try:
+        with _RssSampler() as rss:
+            yield
+    finally:
+        if collect:
+            gc.collect()
+
+        traced_after, traced_peak = tracemalloc.get_traced_memory()
+        with _peaks_lock:
+            traced_peak = max(traced_peak, _peaks.pop())
+            if _peaks:
+                _peaks[-1] = max(_peaks[-1], traced_peak)
+            tracemalloc.reset_peak()
+
+        after = tracemalloc.take_snapshot()
+        delta = traced_after - traced_before
+
+        STAGE_MEMORY_PEAK_BYTES.set(traced_peak, pipeline=pipeline, stage=name)
+        STAGE_MEMORY_DELTA_BYTES.set(delta, pipeline=pipeline, stage=name)
+        STAGE_RSS_BYTES.set(rss.peak, pipeline=pipeline, stage=name)
+        PROCESS_PEAK_RSS_BYTES.set(peak_rss_bytes())
+
+        rss_delta = (rss.peak - rss_before) if rss_before is not None else 0
+        allocations = "\n".join(_top_allocations(before, after, top))
+        logger.info(
+            f"Память {pipeline}/{name}: прирост {_format_bytes(delta)}, "
+            f"пик Python {_format_bytes(traced_peak)}, "
+            f"пик RSS {_format_bytes(rss.peak)} (+{_format_bytes(rss_delta)}), "
+            f"пиковый RSS процесса {_format_bytes(peak_rss_bytes())}\n"
+            f"Основные места аллокаций:\n{allocations}"
+        )
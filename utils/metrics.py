@@ -0,0 +1,374 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    """
+    Набор метрик процесса, отдаваемый в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована.")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name} ожидает метки {self.labelnames}, "
+                f"получены {tuple(labels)}."
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счетчик.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total", list(zip(self.labelnames, key)), value
+
+
+class Gauge(_Metric):
+    """
+    Значение, которое может как расти, так и уменьшаться.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Для каждого набора меток: счетчики корзин (не накопительные), сумма, количество.
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * len(self.buckets), [0.0])
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            values = {
+                key: (list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            }
+        for key, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    labels + [("le", _format_value(bound))],
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "Длительность обработки HTTP-запросов.",
+    ["method", "route", "status"],
+)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Длительность стадий пайплайнов ответа и индексации.",
+    ["pipeline", "stage"],
+)
+
+STAGE_ERRORS = Counter(
+    "rag_stage_errors",
+    "Количество стадий, завершившихся исключением.",
+    ["pipeline", "stage"],
+)
+
+LLM_CALLS = Counter("rag_llm_calls", "Количество вызовов LLM.")
+
+LLM_RETRIES = Counter(
+    "rag_llm_retries",
+    "Количество повторных вызовов LLM после отклоненного ответа.",
+)
+
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests",
+    "Обращения к кэшам процесса.",
+    ["cache", "result"],
+)
+
+CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens",
+    "Оценка длины контекста промпта в токенах: исходный параграф и собранный контекст.",
+    ["kind"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+
+COALESCED_REQUESTS = Counter(
+    "rag_coalesced_requests",
+    "Запросы, получившие результат уже выполнявшегося идентичного запроса.",
+    ["name"],
+)
+
+DEADLINE_BUDGET_SECONDS = Gauge(
+    "rag_deadline_budget_seconds",
+    "Настроенный бюджет времени запроса.",
+    ["pipeline"],
+)
+
+DEADLINE_REMAINING_SECONDS = Histogram(
+    "rag_deadline_remaining_seconds",
+    "Остаток бюджета времени по завершении запроса.",
+    ["pipeline"],
+)
+
+DEADLINE_DEGRADED = Counter(
+    "rag_deadline_degraded",
+    "Стадии, пропущенные из-за нехватки бюджета времени запроса.",
+    ["pipeline", "stage"],
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "rag_admission_active",
+    "Выполняющиеся вызовы модели.",
+    ["model"],
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "rag_admission_queue_depth",
+    "Вызовы модели, ожидающие в очереди.",
+    ["model"],
+)
+
+ADMISSION_REJECTED = Counter(
+    "rag_admission_rejected",
+    "Запросы, отклоненные контролем нагрузки (503).",
+    ["model", "reason"],
+)
+
+INDEXING_DUPLICATE_CHUNKS = Counter(
+    "rag_indexing_duplicate_chunks",
+    "Чанки, не сохраненные при индексации как дубликаты: точные (exact) и почти "
+    "одинаковые (near).",
+    ["kind"],
+)
+
+INDEXING_DEDUP_RATIO = Gauge(
+    "rag_indexing_dedup_ratio",
+    "Доля чанков последнего проиндексированного документа, удаленных как дубликаты.",
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    "rag_model_load_seconds",
+    "Длительность загрузки модели.",
+    ["model"],
+)
+
+MODEL_LOAD_RSS_BYTES = Gauge(
+    "rag_model_load_rss_bytes",
+    "Прирост RSS процесса при загрузке модели: весь (total) и отображенный из "
+    "файлов весов, разделяемый между процессами (shared).",
+    ["model", "kind"],
+)
+
+STAGE_MEMORY_PEAK_BYTES = Gauge(
+    "rag_stage_memory_peak_bytes",
+    "Пик памяти Python (tracemalloc) во время последнего выполнения стадии.",
+    ["pipeline", "stage"],
+)
+
+STAGE_MEMORY_DELTA_BYTES = Gauge(
+    "rag_stage_memory_delta_bytes",
+    "Прирост памяти Python (tracemalloc) за последнее выполнение стадии.",
+    ["pipeline", "stage"],
+)
+
+STAGE_RSS_BYTES = Gauge(
+    "rag_stage_rss_bytes",
+    "Пиковый RSS процесса за последнее выполнение стадии.",
+    ["pipeline", "stage"],
+)
+
+PROCESS_PEAK_RSS_BYTES = Gauge(
+    "rag_process_peak_rss_bytes",
+    "Пиковый RSS процесса.",
+)
+
+# Длительности стадий текущего запроса для заголовка Server-Timing.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+# Стадии пачки ответов выполняются в нескольких потоках с общим словарем запроса.
+_request_timings_lock = threading.Lock()
+
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Начинает сбор длительностей стадий для текущего запроса.
+
+    Словарь изменяется на месте, поэтому стадии, выполненные в пуле потоков
+    FastAPI (скопированный контекст), тоже попадают в него; обновления идут под
+    блокировкой, так как стадии пачки ответов пишут в него параллельно.
+    """
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(pipeline: str, name: str):
+    """
+    Замеряет стадию пайплайна: наблюдение в STAGE_SECONDS и запись в Server-Timing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(pipeline=pipeline, stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, pipeline=pipeline, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            with _request_timings_lock:
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    )
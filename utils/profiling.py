@@ -0,0 +1,270 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from fastapi.routing import APIRoute
+from loguru import logger
+
+from utils.types import ProfilingMode
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+PROFILE_SUFFIXES = {
+    ProfilingMode.CPROFILE: ".prof",
+    ProfilingMode.SAMPLING: ".collapsed",
+}
+
+# Одновременно профилируется не больше одного запроса: профиль один на процесс, и
+# пересекающиеся запросы смешались бы в нем.
+_active_lock = threading.Lock()
+
+# Профиль текущего запроса: middleware создает его, а ProfiledRoute включает в
+# потоке, который выполняет обработчик маршрута.
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def check_token(value: Optional[str], token: Optional[str]) -> bool:
+    if value is None or token is None:
+        return False
+    return hmac.compare_digest(value.encode(), token.encode())
+
+
+def should_profile(
+    path: str, header: Optional[str], token: Optional[str], sample_rate: float
+) -> bool:
+    """
+    Решает, профилировать ли запрос к /api/: по привилегированному заголовку
+    с токеном или случайно с вероятностью sample_rate.
+    """
+    if not path.startswith("/api/") or path.startswith("/api/v1/admin"):
+        return False
+    if check_token(header, token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class SamplingProfiler:
+    """
+    Статистический профилировщик одного потока.
+
+    Фоновый поток раз в interval секунд снимает стек отслеживаемого потока (follow)
+    и считает одинаковые стеки. Результат сохраняется в формате collapsed stacks
+    ("f1;f2;f3 count"), который принимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def follow(self, thread_id: Optional[int]):
+        """
+        Переключает семплирование на поток thread_id; None - приостановить.
+        """
+        self._thread_id = thread_id
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            thread_id = self._thread_id
+            if thread_id is None:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_qualname} "
+                    f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса: cProfile (.prof, pstats) или семплирование (.collapsed).
+
+    Профиль записывает только поток, к которому подключен через attach: поток пула,
+    выполняющий обычный (def) обработчик, или поток цикла событий для async
+    обработчика. Ограничения:
+    - у async обработчика в профиль попадают и другие корутины, выполнявшиеся на
+      цикле событий во время его await;
+    - работа, переданная обработчиком в другие потоки (пулы вызовов LLM, ожидание
+      объединенного запроса другого потока), в профиль не попадает;
+    - cProfile привязан к потоку в Python 3.11; начиная с 3.12 он включается для
+      всего интерпретатора, и точнее потоку следует режим sampling.
+    """
+
+    def __init__(self, mode: ProfilingMode, interval: float):
+        self.mode = mode
+        self._start = time.perf_counter()
+        if mode == ProfilingMode.CPROFILE:
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = SamplingProfiler(interval)
+            self._profiler.start()
+
+    @contextmanager
+    def attach(self):
+        """
+        Профилирует текущий поток на время блока.
+        """
+        if self.mode == ProfilingMode.CPROFILE:
+            self._profiler.enable()
+            try:
+                yield
+            finally:
+                self._profiler.disable()
+        else:
+            self._profiler.follow(threading.get_ident())
+            try:
+                yield
+            finally:
+                self._profiler.follow(None)
+
+    def stop(self) -> float:
+        if self.mode == ProfilingMode.SAMPLING:
+            self._profiler.stop()
+        return time.perf_counter() - self._start
+
+    def save(self, directory: Path, label: str, elapsed: float) -> str:
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "request"
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            f"-{slug}-{elapsed * 1000:.0f}ms{PROFILE_SUFFIXES[self.mode]}"
+        )
+        path = directory / name
+        if self.mode == ProfilingMode.CPROFILE:
+            self._profiler.dump_stats(str(path))
+        else:
+            self._profiler.dump(path)
+        return name
+
+
+def profiled(endpoint: Callable) -> Callable:
+    """
+    Оборачивает обработчик маршрута: если запрос профилируется, профиль включается
+    в том потоке, где выполняется обработчик. FastAPI вызывает обертку так же, как
+    исходную функцию: сигнатура берется через __wrapped__, а обычная функция
+    остается обычной и выполняется в пуле потоков.
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            with profile.attach():
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with profile.attach():
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Маршрут, обработчик которого профилируется в своем потоке (см. profiled).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+def start_profile(mode: ProfilingMode, interval: float) -> Optional[RequestProfile]:
+    """
+    Создает профиль запроса, если сейчас не профилируется другой запрос. Профиль
+    доступен обработчику через контекст запроса и записывается, пока обработчик
+    маршрута ProfiledRoute выполняется.
+    """
+    if not _active_lock.acquire(blocking=False):
+        logger.debug("Профилирование пропущено: уже профилируется другой запрос")
+        return None
+
+    try:
+        profile = RequestProfile(mode, interval)
+    except Exception:
+        _active_lock.release()
+        raise
+
+    _current_profile.set(profile)
+    return profile
+
+
+def finish_profile(
+    profile: RequestProfile, directory: Path, label: str, max_files: int
+) -> str:
+    """
+    Останавливает профилирование, сохраняет файл и удаляет самые старые профили
+    сверх max_files. Возвращает имя файла профиля.
+    """
+    try:
+        elapsed = profile.stop()
+    finally:
+        _current_profile.set(None)
+        _active_lock.release()
+
+    name = profile.save(directory, label, elapsed)
+    logger.info(f"Профиль запроса {label} сохранен: {name}")
+
+    for path in list_profiles(directory)[max_files:]:
+        path.unlink(missing_ok=True)
+
+    return name
+
+
+def list_profiles(directory: Path) -> List[Path]:
+    """
+    Возвращает файлы профилей, начиная с самых новых.
+    """
+    if not directory.is_dir():
+        return []
+
+    suffixes = set(PROFILE_SUFFIXES.values())
+    paths = [path for path in directory.iterdir() if path.suffix in suffixes]
+    return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
@@ -3,3 +3,27 @@ from enum import Enum
 
 class MinioContentType(Enum):
     PNG = "image/png"
+
+
+class MinioLinkMode(Enum):
+    PRESIGNED = "presigned"
+    PUBLIC = "public"
+
+
+class ProfilingMode(Enum):
+    CPROFILE = "cprofile"
+    SAMPLING = "sampling"
+
+
+class RetrievalMode(Enum):
+    FLAT = "flat"
+    HIERARCHICAL = "hierarchical"
+    REDUCED = "reduced"
+    BINARY = "binary"
+
+
+class DedupMode(Enum):
+    OFF = "off"
+    EXACT = "exact"
+    MINHASH = "minhash"
+    EMBEDDING = "embedding"